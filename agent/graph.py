@@ -1,23 +1,43 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from agent.state import AgentState
-from agent.nodes import database_node, t5_node, orchestrator_node
+from agent.nodes import exact_match_node, database_node, adatabase_node, t5_candidate_node, t5_node, orchestrator_node, aorchestrator_node
 from config import THRESHOLD_DATABASE, THRESHOLD_T5_CONF
+from utils.config_validator import ENABLE_T5_CANDIDATE_SCORING, ENABLE_EXACT_MATCH
 
 def create_app():
     workflow = StateGraph(AgentState)
 
     # 1. Ajout des Nœuds
-    workflow.add_node("check_db", database_node)
+    workflow.add_node("exact_match", exact_match_node)
+    # Sync for invoke(), aiohttp-based for ainvoke()
+    workflow.add_node("check_db", RunnableLambda(database_node, afunc=adatabase_node, name="check_db"))
+    workflow.add_node("t5_score", t5_candidate_node)
     workflow.add_node("t5_gen", t5_node)
-    workflow.add_node("gpt_arbitrator", orchestrator_node)
+    # Sync arbitration blocks its worker thread while rate limited, async yields the loop
+    workflow.add_node("gpt_arbitrator", RunnableLambda(orchestrator_node, afunc=aorchestrator_node, name="gpt_arbitrator"))
 
     # 2. Définition du point d'entrée
-    workflow.set_entry_point("check_db")
+    workflow.set_entry_point("exact_match" if ENABLE_EXACT_MATCH else "check_db")
+
+    # 2b. Routage après la correspondance exacte
+    def router_after_exact_match(state):
+        if state.get("final_label"): # Known designation
+            return "end"
+        return "db"
 
     # 3. Logique de routage après la DB
     def router_after_db(state):
         if state.get("final_label"): # If a perfect match was found
             return "end"
+        if ENABLE_T5_CANDIDATE_SCORING and state.get("api_suggestions"):
+            return "t5_score"
+        return "t5"
+
+    # 3b. Routage après le scoring T5 des suggestions
+    def router_after_t5_score(state):
+        if state.get("final_label"): # If T5 accepted a DB suggestion
+            return "end"
         return "t5"
 
     # 4. Logique de routage après T5
@@ -27,9 +47,21 @@ def create_app():
         return "gpt"
 
     # 5. Liens entre les nœuds
+    workflow.add_conditional_edges(
+        "exact_match",
+        router_after_exact_match,
+        {"end": END, "db": "check_db"}
+    )
+
     workflow.add_conditional_edges(
         "check_db",
         router_after_db,
+        {"end": END, "t5_score": "t5_score", "t5": "t5_gen"}
+    )
+
+    workflow.add_conditional_edges(
+        "t5_score",
+        router_after_t5_score,
         {"end": END, "t5": "t5_gen"}
     )
 
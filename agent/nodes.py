@@ -1,37 +1,164 @@
 # agent/nodes.py
-from services.database_service import get_database_suggestions
+import math
+from typing import List
+from services.database_service import get_database_suggestions, aget_database_suggestions, get_breaker_state
 from services.t5_service import T5ModelService
 from services.llm_service import OrchestratorService
+from services.exact_match_service import ExactMatchIndex
+from services.label_store import LearnedLabelStore
+from services.web_context_service import WebContextService
+from services.speculation_service import SpeculativeArbitrator
+from services.cost_governor import CostBudgetGovernor, NORMAL, RESTRICTED
 from agent.state import AgentState
 from config import THRESHOLD_DATABASE, THRESHOLD_T5_CONF
+from utils.config_validator import (
+    T5_CANDIDATE_TOP_K,
+    THRESHOLD_T5_CANDIDATE_LOGPROB,
+    ENABLE_LABEL_WRITEBACK,
+    ENABLE_WEB_CONTEXT,
+    ENABLE_SPECULATIVE_ARBITRATION,
+    LLM_SPECULATIVE_DB_FLOOR,
+    LLM_BUDGET_RESTRICTED_T5_CONF,
+    LLM_BUDGET_RESTRICTED_DB_CONF,
+    LLM_PACK_SIZE,
+    FUZZY_FAST_PATH_ACCEPT_SCORE,
+)
 
-def database_node(state: AgentState):
-    print("--- ÉTAPE 1 : RECHERCHE BASE DE DONNÉES ---")
-    suggestions = get_database_suggestions(state["description"])
+def exact_match_node(state: AgentState):
+    print("--- ÉTAPE 0 : CORRESPONDANCE EXACTE ---")
+    label = ExactMatchIndex.get_instance().lookup(state["description"])
+    if label:
+        return {
+            "final_label": label,
+            "confidence": 1.0,
+            "step_history": state["step_history"] + ["exact_match_found"]
+        }
+    
+    # Labels previously decided by the LLM for this designation
+    if ENABLE_LABEL_WRITEBACK:
+        try:
+            learned = LearnedLabelStore.get_instance().lookup(state["description"])
+        except Exception as e:
+            print(f"Learned label store unavailable: {e}")
+            learned = None
+        if learned:
+            return {
+                "final_label": learned["label"],
+                # No local evidence for the label (created by the LLM, unreviewed): no confidence
+                "confidence": learned["confidence"] if learned["confidence"] is not None else 0.0,
+                "step_history": state["step_history"] + ["learned_match_found"]
+            }
+    return {}
+
+def _database_update(suggestions, history=None, description=None, speculate=False):
+    """Build the state update of the database stage from its suggestions."""
+    # Make a degraded remote (open / half-open circuit) visible in path_taken
+    breaker_state = get_breaker_state()
+    breaker_steps = [f"db_circuit_{breaker_state}"] if breaker_state != "closed" else []
     
-    # Store database confidence and prediction regardless of threshold
-    database_confidence = suggestions[0]['similarity_score'] if suggestions else 0.0
-    database_prediction = suggestions[0]['nature_product'] if suggestions else None
+    # Store database confidence and prediction regardless of threshold. Suggestions may be
+    # reordered by rerank_score: the threshold applies to the most similar row, not the first
+    best = max(suggestions, key=lambda s: s.get('similarity_score', 0.0)) if suggestions else None
+    database_confidence = best['similarity_score'] if best else 0.0
+    database_prediction = best['nature_product'] if best else None
+    
+    # A fuzzy fast-path hit (no backend queried) has its own threshold and step
+    fast_path = best is not None and best.get("source") == "fuzzy"
+    threshold = FUZZY_FAST_PATH_ACCEPT_SCORE if fast_path else THRESHOLD_DATABASE
     
     # Check the best score
-    if suggestions and suggestions[0]['similarity_score'] >= THRESHOLD_DATABASE:
-        similarity_score = suggestions[0]['similarity_score']
+    if best and database_confidence >= threshold:
+        similarity_score = database_confidence
         return {
-            "final_label": suggestions[0]['nature_product'],
+            "final_label": database_prediction,
             "confidence": similarity_score,  # Confidence = similarity score, not 1
             "database_confidence": database_confidence,
             "database_prediction": database_prediction,
             "api_suggestions": suggestions,
-            "step_history": ["db_match_found"]
+            "step_history": (history or []) + breaker_steps
+                            + ["fuzzy_fast_path_match" if fast_path else "db_match_found"]
         }
     
+    # The arbitration may need web context: search while T5 runs
+    if ENABLE_WEB_CONTEXT and description:
+        WebContextService.get_instance().prefetch(description)
+    
+    # Very weak match: T5 will likely be unsure too, start the LLM now
+    speculation_steps = []
+    if (speculate and ENABLE_SPECULATIVE_ARBITRATION and description
+            and database_confidence < LLM_SPECULATIVE_DB_FLOOR):
+        if SpeculativeArbitrator.get_instance().launch(description, suggestions):
+            speculation_steps = ["gpt_speculation_launched"]
+    
     return {
         "database_confidence": database_confidence,
         "database_prediction": database_prediction,
         "api_suggestions": suggestions,
-        "step_history": ["db_uncertain_calling_t5"]
+        "step_history": (history or []) + breaker_steps + ["db_uncertain_calling_t5"] + speculation_steps
     }
 
+def database_node(state: AgentState):
+    print("--- ÉTAPE 1 : RECHERCHE BASE DE DONNÉES ---")
+    # Suggestions may have been prefetched by a batch path
+    suggestions = state.get("api_suggestions")
+    if suggestions is None:
+        suggestions = get_database_suggestions(state["description"])
+    return _database_update(suggestions, state.get("step_history"), state["description"],
+                            speculate=_may_speculate(state))
+
+async def adatabase_node(state: AgentState):
+    print("--- ÉTAPE 1 : RECHERCHE BASE DE DONNÉES (async) ---")
+    suggestions = state.get("api_suggestions")
+    if suggestions is None:
+        suggestions = await aget_database_suggestions(state["description"])
+    return _database_update(suggestions, state.get("step_history"), state["description"],
+                            speculate=_may_speculate(state))
+
+def _may_speculate(state: AgentState) -> bool:
+    """Early arbitration only for single requests, and only while the LLM budget is not tight."""
+    if state.get("defer_arbitration") or not ENABLE_SPECULATIVE_ARBITRATION:
+        return False
+    return CostBudgetGovernor.get_instance().mode(state.get("client_id")) == NORMAL
+
+def t5_candidate_node(state: AgentState):
+    print("--- ÉTAPE 1b : SCORING T5 DES SUGGESTIONS ---")
+    
+    candidates = [
+        s['nature_product'] for s in (state.get("api_suggestions") or [])[:T5_CANDIDATE_TOP_K]
+        if s.get('nature_product')
+    ]
+    if not candidates:
+        return {"step_history": state["step_history"] + ["t5_candidates_skipped"]}
+    
+    try:
+        t5_service = T5ModelService.get_instance()
+        scores = t5_service.score_candidates(state["description"], candidates)
+    except Exception as e:
+        print(f"T5 candidate scoring failed: {e}")
+        return {"step_history": state["step_history"] + ["t5_candidates_scoring_failed"]}
+    
+    scored = [
+        {"nature_product": label, "log_likelihood": score}
+        for label, score in zip(candidates, scores)
+    ]
+    best = max(scored, key=lambda x: x["log_likelihood"])
+    update = {"t5_candidate_scores": scored}
+    
+    # Accept the best candidate if T5 finds it likely enough
+    if best["log_likelihood"] >= THRESHOLD_T5_CANDIDATE_LOGPROB:
+        discarded = _discard_speculation(state)
+        update["final_label"] = best["nature_product"]
+        update["confidence"] = math.exp(best["log_likelihood"])
+        update["step_history"] = state["step_history"] + [
+            f"t5_candidate_accepted_{best['nature_product']}_ll_{best['log_likelihood']:.2f}"
+        ] + (["gpt_speculation_discarded"] if discarded else [])
+    else:
+        update["step_history"] = state["step_history"] + [
+            f"t5_candidates_rejected_ll_{best['log_likelihood']:.2f}"
+        ]
+    
+    return update
+
 def t5_node(state: AgentState):
     print("--- ÉTAPE 2 : GÉNÉRATION LOCALE T5 ---")
     
@@ -50,55 +177,335 @@ def t5_node(state: AgentState):
     }
     
     if is_confident:
+        if _discard_speculation(state):
+            update["step_history"] = update["step_history"] + ["gpt_speculation_discarded"]
         update["final_label"] = prediction
         update["confidence"] = confidence  # Set general confidence to T5 confidence
         
     return update
 
 
+def _launched_speculation(state: AgentState) -> bool:
+    """
+    This request started an early arbitration. Speculations are keyed by
+    description, so a request that did not launch one must not take another's.
+    """
+    return ENABLE_SPECULATIVE_ARBITRATION and "gpt_speculation_launched" in state.get("step_history", [])
+
+def _discard_speculation(state: AgentState) -> bool:
+    """The request is settled locally: drop its early LLM arbitration, if any."""
+    if not _launched_speculation(state):
+        return False
+    return SpeculativeArbitrator.get_instance().discard(state["description"])
+
+def _write_back_decision(state: AgentState, label: str):
+    """Remember an LLM decision so the local stages answer it next time."""
+    if not ENABLE_LABEL_WRITEBACK or not label or label == "Produit non identifie":
+        return
+    # Confidence of the stages that proposed the label; a label none of them
+    # proposed was created by the LLM: flag it, without a confidence
+    scores = [s.get("similarity_score", 0.0) for s in (state.get("api_suggestions") or [])
+              if s.get("nature_product") == label]
+    if label == state.get("t5_prediction"):
+        scores.append(state.get("t5_confidence") or 0.0)
+    try:
+        LearnedLabelStore.get_instance().add(
+            state["description"],
+            label,
+            confidence=max(scores) if scores else None,
+            needs_review=not scores,
+            source="llm",
+        )
+    except Exception as e:
+        print(f"Learned label write-back failed: {e}")
+
+def _orchestrator_unavailable(state: AgentState):
+    """Local fallback when the orchestrator cannot be created."""
+    # Choice: if API has good suggestion, else T5, else empty
+    fallback_label = None
+    if state.get("api_suggestions"):
+        fallback_label = state["api_suggestions"][0].get("nature_product")
+    if not fallback_label and state.get("t5_prediction"):
+        fallback_label = state["t5_prediction"]
+    return {
+        "final_label": fallback_label or "",
+        "web_context": None,
+        "step_history": state["step_history"] + ["orchestrator_unavailable_fallback"],
+        "cost_info": None
+    }
+
+def _budget_local_answer(state: AgentState):
+    """
+    Local answer when the LLM spend budget does not admit this item, else None.
+    Admission is counted by _count_admitted, once the call has been made.
+    Restricted budget: the LLM only gets items whose T5 and DB answers are both
+    weak; spent budget: every item is answered locally.
+    """
+    governor = CostBudgetGovernor.get_instance()
+    mode = governor.mode(state.get("client_id"))
+    if mode == NORMAL:
+        return None
+    
+    t5 = (state.get("t5_prediction"), state.get("t5_confidence") or 0.0, "t5")
+    db = (state.get("database_prediction"), state.get("database_confidence") or 0.0, "db")
+    if mode == RESTRICTED:
+        local = [c for c, threshold in ((t5, LLM_BUDGET_RESTRICTED_T5_CONF), (db, LLM_BUDGET_RESTRICTED_DB_CONF))
+                 if c[0] and c[1] >= threshold]
+        if not local:
+            return None
+        label, confidence, source = max(local, key=lambda c: c[1])
+        governor.count("restricted_local")
+        step = f"llm_budget_restricted_local_{source}"
+    else:
+        # Same choice as without orchestrator: DB suggestion, else T5
+        label, confidence, _ = db if db[0] else t5
+        governor.count("local_only")
+        step = "llm_budget_exhausted_local"
+    
+    return {
+        "final_label": label or "",
+        "confidence": confidence,
+        "web_context": None,
+        "step_history": state["step_history"] + [step],
+        "cost_info": None
+    }
+
+def _count_admitted(cost_info) -> None:
+    """An LLM call was made and answered (cached and failed arbitrations are not counted)."""
+    if cost_info and not cost_info.get("cached") and not cost_info.get("failed"):
+        CostBudgetGovernor.get_instance().count("admitted")
+
+def _charge_client(state: AgentState, cost_info) -> None:
+    """Book the LLM cost reported to this request on its client's budget."""
+    if cost_info and state.get("client_id"):
+        CostBudgetGovernor.get_instance().charge_client(state["client_id"], cost_info.get("total_cost_usd", 0.0))
+
+def _arbitration_kwargs(state: AgentState, web_info):
+    return dict(
+        description=state["description"],
+        t5_suggestion=state.get("t5_prediction"),
+        t5_confidence=state.get("t5_confidence", 0.0),
+        api_suggestions=state.get("api_suggestions", []),
+        web_context=web_info,
+    )
+
+def _cached_arbitration(service, kwargs):
+    """Cached decision for these inputs, else None (a cache error counts as a miss)."""
+    try:
+        return service.cached_decision(**kwargs)
+    except Exception as e:
+        print(f"Decision cache unavailable: {e}")
+        return None
+
+def _arbitration_step(cost_info) -> str:
+    """path_taken entry of an arbitration: failed, cached, packed or a regular call."""
+    if cost_info and cost_info.get("failed"):
+        return "gpt_arbitration_failed"
+    if cost_info and cost_info.get("cached"):
+        return "gpt_arbitration_cached"
+    if cost_info and cost_info.get("packed_items"):
+        return f"gpt_arbitration_packed_{cost_info['packed_items']}"
+    return "gpt_arbitration_completed"
+
+def _arbitration_failed(state: AgentState, error: Exception) -> str:
+    print(f"Arbitration failed, local fallback: {error}")
+    return (state.get("api_suggestions") or [{}])[0].get("nature_product") or state.get("t5_prediction") or ""
+
+def _speculation_reused(state: AgentState, decision):
+    """State update when the early arbitration answers the request."""
+    final_decision, cost_info = decision
+    _write_back_decision(state, final_decision)
+    _charge_client(state, cost_info)
+    return {
+        "final_label": final_decision,
+        "web_context": None,
+        "step_history": state["step_history"] + ["gpt_speculation_reused", _arbitration_step(cost_info)],
+        "cost_info": cost_info
+    }
+
+def _speculation_steps(outcome) -> List[str]:
+    return [f"gpt_speculation_{outcome}"] if outcome else []
+
+def _with_speculative_cost(cost_info, outcome, speculative):
+    """A re-asked request also paid for its speculative call."""
+    if outcome != "reasked" or not speculative or not speculative[1] or cost_info is None:
+        return cost_info
+    extra = speculative[1].get("total_cost_usd", 0.0)
+    return {
+        **cost_info,
+        "speculative_cost_usd": extra,
+        "total_cost_usd": round(cost_info.get("total_cost_usd", 0.0) + extra, 6),
+    }
+
+def _arbitration_deferred(state: AgentState):
+    """Batch runs arbitrate the remaining items together afterwards."""
+    return {"step_history": state["step_history"] + ["gpt_arbitration_deferred"]}
+
 def orchestrator_node(state: AgentState):
     print("--- ÉTAPE 3 : ARBITRAGE GPT-5 & WEB SEARCH ---")
+    if state.get("defer_arbitration"):
+        return _arbitration_deferred(state)
     
-    # Fallback if orchestrator unavailable (missing API key, etc.)
+    # Fallback if orchestrator unavailable (missing API key, etc.);
+    # the failure itself is logged once by get_instance
     try:
-        service = OrchestratorService()
-    except Exception as e:
-        print(f"Orchestrator indisponible, repli local: {e}")
-        # Choice: if API has good suggestion, else T5, else empty
-        fallback_label = None
-        if state.get("api_suggestions"):
-            fallback_label = state["api_suggestions"][0].get("nature_product")
-        if not fallback_label and state.get("t5_prediction"):
-            fallback_label = state["t5_prediction"]
-        return {
-            "final_label": fallback_label or "",
-            "web_context": None,
-            "step_history": state["step_history"] + ["orchestrator_unavailable_fallback"],
-            "cost_info": None
-        }
+        service = OrchestratorService.get_instance()
+    except Exception:
+        return _orchestrator_unavailable(state)
 
-    web_info = None
+    # Arbitration started early (very low DB score), kept unless T5 changed the picture
+    outcome, speculative = (
+        SpeculativeArbitrator.get_instance().claim(state) if _launched_speculation(state) else (None, None)
+    )
+    if outcome == "reused":
+        return _speculation_reused(state, speculative)
+
+    # Web context prefetched since the DB miss, within its time budget
+    web_info = WebContextService.get_instance().get(state["description"]) if ENABLE_WEB_CONTEXT else None
+    kwargs = _arbitration_kwargs(state, web_info)
+
+    # A cached decision is free: served before the budget gate
+    cached = _cached_arbitration(service, kwargs)
+    if cached is None:
+        # Over budget: no new call, but an answer already paid for beats a local one
+        budget_answer = _budget_local_answer(state)
+        if budget_answer:
+            return _speculation_reused(state, speculative) if outcome == "reasked" else budget_answer
 
     # GPT renders its verdict
     cost_info = None
     try:
-        final_decision, cost_info = service.arbitrate(
-            description=state["description"],
-            t5_suggestion=state.get("t5_prediction"),
-            t5_confidence=state.get("t5_confidence", 0.0),
-            api_suggestions=state.get("api_suggestions", []),
-            web_context=web_info,
-        )
-        
+        final_decision, cost_info = cached or service.arbitrate(**kwargs, use_cache=False)
     except Exception as e:
-        print(f"Arbitration failed, local fallback: {e}")
-        final_decision = (state.get("api_suggestions") or [{}])[0].get("nature_product") or state.get("t5_prediction") or ""
+        final_decision = _arbitration_failed(state, e)
+    else:
+        _write_back_decision(state, final_decision)
+        _count_admitted(cost_info)
+    cost_info = _with_speculative_cost(cost_info, outcome, speculative)
+    _charge_client(state, cost_info)
 
     return {
         "final_label": final_decision,
         "web_context": web_info,
-        "step_history": state["step_history"] + ["gpt_arbitration_completed"],
+        "step_history": state["step_history"] + _speculation_steps(outcome)
+                        + (["web_context_used"] if web_info else []) + [_arbitration_step(cost_info)],
         "cost_info": cost_info
     }
 
+async def aorchestrator_node(state: AgentState):
+    print("--- ÉTAPE 3 : ARBITRAGE GPT-5 & WEB SEARCH (async) ---")
+    if state.get("defer_arbitration"):
+        return _arbitration_deferred(state)
+    
+    try:
+        service = OrchestratorService.get_instance()
+    except Exception:
+        return _orchestrator_unavailable(state)
+
+    outcome, speculative = (
+        await SpeculativeArbitrator.get_instance().aclaim(state) if _launched_speculation(state) else (None, None)
+    )
+    if outcome == "reused":
+        return _speculation_reused(state, speculative)
+
+    web_info = await WebContextService.get_instance().aget(state["description"]) if ENABLE_WEB_CONTEXT else None
+    kwargs = _arbitration_kwargs(state, web_info)
 
+    cached = _cached_arbitration(service, kwargs)
+    if cached is None:
+        # Over budget: no new call, but an answer already paid for beats a local one
+        budget_answer = _budget_local_answer(state)
+        if budget_answer:
+            return _speculation_reused(state, speculative) if outcome == "reasked" else budget_answer
+
+    # Waits on the shared rate limiter without holding a thread
+    cost_info = None
+    try:
+        final_decision, cost_info = cached or await service.aarbitrate(**kwargs, use_cache=False)
+    except Exception as e:
+        final_decision = _arbitration_failed(state, e)
+    else:
+        _write_back_decision(state, final_decision)
+        _count_admitted(cost_info)
+    cost_info = _with_speculative_cost(cost_info, outcome, speculative)
+    _charge_client(state, cost_info)
+
+    return {
+        "final_label": final_decision,
+        "web_context": web_info,
+        "step_history": state["step_history"] + _speculation_steps(outcome)
+                        + (["web_context_used"] if web_info else []) + [_arbitration_step(cost_info)],
+        "cost_info": cost_info
+    }
+
+def resolve_deferred_arbitrations(states: List[dict]) -> List[dict]:
+    """
+    Packed LLM arbitration of the graph results that stopped at
+    `gpt_arbitration_deferred`; other states are returned unchanged.
+    Cached decisions are served first; the spend budget is checked again
+    before each pack, so items left once it drops are answered locally.
+    """
+    pending = [i for i, st in enumerate(states) if "gpt_arbitration_deferred" in st.get("step_history", [])]
+    if not pending:
+        return states
+    print(f"--- ÉTAPE 3 : ARBITRAGE GROUPÉ ({len(pending)} produits) ---")
+    
+    states = list(states)
+    try:
+        service = OrchestratorService.get_instance()
+    except Exception:
+        for i in pending:
+            budget_answer = _budget_local_answer(states[i]) or _orchestrator_unavailable(states[i])
+            states[i] = {**states[i], **budget_answer}
+        return states
+    
+    # Searches were launched at each DB miss, so these waits overlap
+    web_infos = {
+        i: WebContextService.get_instance().get(states[i]["description"]) if ENABLE_WEB_CONTEXT else None
+        for i in pending
+    }
+    kwargs = {i: _arbitration_kwargs(states[i], web_infos[i]) for i in pending}
+    decisions = {i: _cached_arbitration(service, kwargs[i]) for i in pending}
+    uncached = [i for i in pending if decisions[i] is None]
+    
+    pack_size = max(LLM_PACK_SIZE, 1)
+    for start in range(0, len(uncached), pack_size):
+        # Mode read before every pack: the previous packs were recorded
+        admitted = []
+        for i in uncached[start:start + pack_size]:
+            budget_answer = _budget_local_answer(states[i])
+            if budget_answer:
+                states[i] = {**states[i], **budget_answer}
+            else:
+                admitted.append(i)
+        if not admitted:
+            continue
+        try:
+            packed = service.arbitrate_many([kwargs[i] for i in admitted], pack_size=pack_size, use_cache=False)
+        except Exception as e:
+            print(f"Packed arbitration failed, local fallback: {e}")
+            packed = [(None, None) for _ in admitted]
+        decisions.update(zip(admitted, packed))
+    
+    # Items answered locally by the budget gate are already final;
+    # items without an LLM answer fall back one by one
+    for i in pending:
+        if decisions.get(i) is None:
+            continue
+        state = states[i]
+        label, cost_info = decisions[i]
+        web_info = web_infos[i]
+        if label is None:
+            label = _arbitration_failed(state, RuntimeError(f"no arbitration for: {state['description']}"))
+        else:
+            _write_back_decision(state, label)
+            _count_admitted(cost_info)
+        _charge_client(state, cost_info)
+        states[i] = {
+            **state,
+            "final_label": label,
+            "web_context": web_info,
+            "step_history": state["step_history"] + (["web_context_used"] if web_info else []) + [_arbitration_step(cost_info)],
+            "cost_info": cost_info,
+        }
+    return states
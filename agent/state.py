@@ -5,10 +5,13 @@ class AgentState(TypedDict):
     api_suggestions: List[dict]    
     t5_prediction: Optional[str]
     t5_confidence: Optional[float]
+    t5_candidate_scores: Optional[List[dict]]  # Teacher-forced scores of DB suggestions
     database_confidence: Optional[float]  # Database step confidence
     database_prediction: Optional[str]    # Database step prediction
     confidence: Optional[float]    # General confidence score (from database or T5)
     web_context: Optional[str]
     final_label: str                #nature_product_predicted
     step_history: List[str]         #Pour the debug
-    cost_info: Optional[dict]       # Cost tracking information
\ No newline at end of file
+    cost_info: Optional[dict]       # Cost tracking information
+    defer_arbitration: Optional[bool]  # Batch: leave LLM items to resolve_deferred_arbitrations
+    client_id: Optional[str]        # Caller charged for the LLM spend (per-client budgets)
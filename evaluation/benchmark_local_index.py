@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Latency and recall benchmark of the local n-gram index against recorded
+remote find_suggestions responses.
+
+Input is a detailed evaluation CSV (evaluation_detailed_*.csv) containing, per
+product, the description sent and the top remote suggestion that was recorded
+(`database_prediction`, `database_confidence`).
+"""
+
+import sys
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.local_index_service import LocalSuggestionIndex
+
+
+def load_recorded_responses(csv_path: str) -> pd.DataFrame:
+    """Load recorded remote responses, keeping rows with a remote top-1."""
+    df = pd.read_csv(csv_path)
+    required = ["description_cleaned", "database_prediction"]
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns in {csv_path}: {missing}")
+
+    df = df[df["description_cleaned"].notna() & df["database_prediction"].notna()]
+    df = df[df["database_prediction"].astype(str).str.strip() != ""]
+    print(f"Recorded remote responses: {len(df)}")
+    return df
+
+
+def run_benchmark(csv_path: str, top_k: int = 5, batch_size: int = 256):
+    df = load_recorded_responses(csv_path)
+    descriptions = df["description_cleaned"].astype(str).tolist()
+
+    build_start = time.perf_counter()
+    index = LocalSuggestionIndex.get_instance()
+    build_s = time.perf_counter() - build_start
+
+    # Single-query latency (what database_node pays per request)
+    latencies_ms = []
+    local_results = []
+    for description in descriptions:
+        start = time.perf_counter()
+        local_results.append(index.query(description, top_k=top_k))
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    # Batched throughput
+    batch_start = time.perf_counter()
+    for i in range(0, len(descriptions), batch_size):
+        index.query_many(descriptions[i:i + batch_size], top_k=top_k)
+    batch_s = time.perf_counter() - batch_start
+
+    remote_top1 = df["database_prediction"].astype(str).str.lower().str.strip().tolist()
+    local_labels = [[s["nature_product"].lower().strip() for s in r] for r in local_results]
+
+    top1_agreement = np.mean([bool(l) and l[0] == r for l, r in zip(local_labels, remote_top1)])
+    recall_at_k = np.mean([r in l for l, r in zip(local_labels, remote_top1)])
+
+    print(f"\n📊 LOCAL INDEX BENCHMARK ({len(descriptions)} queries, k={top_k})")
+    print(f"   Index build time: {build_s:.2f}s")
+    print(f"   Latency p50: {np.percentile(latencies_ms, 50):.2f} ms")
+    print(f"   Latency p95: {np.percentile(latencies_ms, 95):.2f} ms")
+    print(f"   Latency p99: {np.percentile(latencies_ms, 99):.2f} ms")
+    print(f"   Batched throughput: {len(descriptions) / batch_s:.0f} queries/s")
+    print(f"   Top-1 agreement with remote: {top1_agreement:.3f}")
+    print(f"   Recall@{top_k} of remote top-1: {recall_at_k:.3f}")
+
+    # Against ground truth, when the evaluation recorded it
+    if "expected_nature_product" in df.columns:
+        expected = df["expected_nature_product"].astype(str).str.lower().str.strip().tolist()
+        local_acc = np.mean([bool(l) and l[0] == e for l, e in zip(local_labels, expected)])
+        remote_acc = np.mean([r == e for r, e in zip(remote_top1, expected)])
+        print(f"   Top-1 accuracy - local: {local_acc:.3f} | remote: {remote_acc:.3f}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    details = pd.DataFrame({
+        "description_cleaned": descriptions,
+        "remote_prediction": df["database_prediction"].tolist(),
+        "remote_confidence": df.get("database_confidence", pd.Series([None] * len(df))).tolist(),
+        "local_prediction": [r[0]["nature_product"] if r else None for r in local_results],
+        "local_confidence": [r[0]["similarity_score"] if r else 0.0 for r in local_results],
+        "latency_ms": latencies_ms,
+    })
+    output_file = f"local_index_benchmark_{timestamp}.csv"
+    details.to_csv(output_file, index=False)
+    print(f"💾 Details saved: {output_file}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python evaluation/benchmark_local_index.py <evaluation_detailed.csv> [top_k]")
+        sys.exit(1)
+
+    run_benchmark(sys.argv[1], top_k=int(sys.argv[2]) if len(sys.argv) > 2 else 5)
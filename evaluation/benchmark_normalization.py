@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the shared designation normalization.
+
+Measures the single-string path (cold and memoized), the vectorized pandas
+path, checks that both produce the same keys, and reports how many distinct
+keys remain compared with the former `lower().strip()` keys (fewer keys means
+more cache and exact-match hits).
+"""
+
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text_normalization import normalize_designation, normalize_series, _normalize
+
+
+def run_benchmark(csv_path: str, column: str = "description_cleaned", repeat: int = 3):
+    designations = pd.read_csv(csv_path, usecols=[column])[column].dropna().astype(str)
+    values = designations.tolist()
+    print(f"Designations: {len(values)} ({designations.nunique()} distinct)")
+
+    # Single-string path, cache cleared before each run
+    cold_s = []
+    for _ in range(repeat):
+        _normalize.cache_clear()
+        start = time.perf_counter()
+        single = [normalize_designation(v) for v in values]
+        cold_s.append(time.perf_counter() - start)
+
+    # Same calls again, now answered by the memo
+    start = time.perf_counter()
+    for v in values:
+        normalize_designation(v)
+    warm_s = time.perf_counter() - start
+
+    batch_s = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        batch = normalize_series(designations).tolist()
+        batch_s.append(time.perf_counter() - start)
+
+    mismatches = sum(a != b for a, b in zip(single, batch))
+    legacy_keys = designations.str.lower().str.strip().nunique()
+    normalized_keys = len(set(single))
+
+    print(f"\n📊 NORMALIZATION BENCHMARK ({len(values)} strings, best of {repeat})")
+    print(f"   Single path (cold): {min(cold_s) * 1e6 / len(values):.1f} µs/string")
+    print(f"   Single path (memoized): {warm_s * 1e6 / len(values):.2f} µs/string")
+    print(f"   Vectorized path: {min(batch_s) * 1e6 / len(values):.1f} µs/string")
+    print(f"   Single/batch mismatches: {mismatches}")
+    print(f"   Distinct keys - lower().strip(): {legacy_keys} | normalized: {normalized_keys} "
+          f"({(1 - normalized_keys / max(legacy_keys, 1)) * 100:.1f}% fewer)")
+
+    if mismatches:
+        examples = [(v, a, b) for v, a, b in zip(values, single, batch) if a != b][:5]
+        for value, a, b in examples:
+            print(f"   ⚠️ {value!r}: single={a!r} batch={b!r}")
+
+    changed = np.array([v.lower().strip() != k for v, k in zip(values, single)])
+    print(f"   Strings whose key changed: {changed.mean() * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python evaluation/benchmark_normalization.py <products.csv> [column]")
+        sys.exit(1)
+
+    run_benchmark(sys.argv[1], column=sys.argv[2] if len(sys.argv) > 2 else "description_cleaned")
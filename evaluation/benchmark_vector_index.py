@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Memory / recall / latency trade-off of the quantized vector index.
+
+Embeds the catalog once, then builds the index with each quantization and a
+few nprobe values, and reports recall@k against the exact float search,
+query latency and memory footprint. Queries are held-out catalog
+designations (or the descriptions of an evaluation CSV when given).
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.vector_index_service import QuantizedVectorIndex, TextEmbedder, QUANTIZATIONS
+from utils.config_validator import VECTOR_INDEX_DIM, VECTOR_INDEX_PQ_SUBSPACES, VECTOR_INDEX_RERANK
+
+
+def run_benchmark(catalog_path: str, queries_path: str = None, n_queries: int = 1000, k: int = 10,
+                  nprobes=(1, 4, 8, 16), float_store: str = None):
+    df = pd.read_csv(catalog_path, usecols=["description_cleaned", "nature_product"]).dropna()
+    documents = pd.concat([df["description_cleaned"], df["nature_product"].drop_duplicates()]).tolist()
+    print(f"Catalog: {len(documents)} documents")
+
+    embedder = TextEmbedder(dim=VECTOR_INDEX_DIM).fit(documents)
+    vectors = embedder.transform(documents)
+
+    if queries_path:
+        queries_text = pd.read_csv(queries_path)["description_cleaned"].dropna().astype(str).tolist()[:n_queries]
+    else:
+        rng = np.random.default_rng(0)
+        queries_text = [documents[i] for i in rng.choice(len(documents), min(n_queries, len(documents)), replace=False)]
+    queries = embedder.transform(queries_text)
+    print(f"Queries: {len(queries)} | k={k} | float vectors: {vectors.nbytes / 1e6:.1f} MB")
+
+    rows = []
+    for quantization in QUANTIZATIONS:
+        index = QuantizedVectorIndex(
+            quantization=quantization,
+            pq_subspaces=VECTOR_INDEX_PQ_SUBSPACES,
+            rerank=VECTOR_INDEX_RERANK,
+        ).build(vectors, float_store_path=float_store)
+        for nprobe in nprobes:
+            index.nprobe = nprobe
+            report = index.evaluate(queries, k=k)
+            rows.append(report)
+            print(f"   {quantization:>5} nprobe={nprobe:<3} recall@{k}={report[f'recall_at_{k}']:.3f} "
+                  f"p50={report['latency_p50_ms']:.2f}ms p95={report['latency_p95_ms']:.2f}ms "
+                  f"index={report['index_bytes'] / 1e6:.1f}MB")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = f"vector_index_benchmark_{timestamp}.csv"
+    pd.DataFrame(rows).to_csv(output_file, index=False)
+    print(f"💾 Report saved: {output_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantized vector index benchmark")
+    parser.add_argument("catalog", help="CSV with description_cleaned and nature_product")
+    parser.add_argument("--queries", default=None, help="Optional CSV with description_cleaned queries")
+    parser.add_argument("--n-queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--float-store", default=None, help="Memory-map the float vectors to this .npy file")
+    args = parser.parse_args()
+
+    run_benchmark(args.catalog, args.queries, args.n_queries, args.k, tuple(args.nprobe), args.float_store)
@@ -82,9 +82,33 @@ def extract_decision_node(path_taken):
     else:
         path_str = str(path_taken)
     
+    # Un arbitrage spéculatif lancé puis abandonné n'est pas une décision du LLM
+    # (réutilisé ou redemandé, la suite du chemin contient gpt_arbitration_*)
+    for step in ("gpt_speculation_launched", "gpt_speculation_discarded"):
+        path_str = path_str.replace(step, "")
+    
+    # Si la désignation était connue telle quelle
+    if "exact_match_found" in path_str:
+        return "exact_match"
+    # Si un label appris du LLM a été réutilisé
+    elif "learned_match_found" in path_str:
+        return "learned"
+    # Si le fast path fuzzy a reconnu la désignation (sans appel DB)
+    elif "fuzzy_fast_path_match" in path_str:
+        return "fuzzy"
     # Si DB a trouvé un match direct
-    if "db_match_found" in path_str:
+    elif "db_match_found" in path_str:
         return "database"
+    # Si T5 a validé une suggestion de la DB (scoring teacher-forced)
+    elif "t5_candidate_accepted" in path_str:
+        return "t5_score"
+    # Si le budget LLM a fait répondre localement (avant tout appel)
+    elif "llm_budget_restricted_local_db" in path_str:
+        return "budget_database"
+    elif "llm_budget_restricted_local_t5" in path_str:
+        return "budget_t5"
+    elif "llm_budget_exhausted_local" in path_str:
+        return "budget_local"
     # Si T5 a pris la décision
     elif "t5_pred_" in path_str and "gpt" not in path_str.lower():
         return "t5"
@@ -0,0 +1,231 @@
+# find_suggestions_stub.py
+"""
+Local stand-in for the remote find_suggestions API, for offline and
+repeatable performance tests.
+
+Suggestions are computed with RapidFuzz over a local CSV catalog
+(description_cleaned, nature_product) and returned in the same shape as the
+real endpoint. Latency, errors and timeouts are injected according to the
+configuration, which can also be changed at runtime with POST /config.
+POST /find_suggestions_batch answers several designations in one call (one
+latency draw per batch) and is advertised by GET /capabilities unless the
+stub runs with --no-batch.
+
+Usage:
+    python find_suggestions_stub.py --catalog labeled_products_filtered.csv --port 8012 \\
+        --latency-dist lognormal --latency-mean-ms 80 --latency-std-ms 40 --error-rate 0.02
+    # then point the API at it: API_URL=http://127.0.0.1:8012/find_suggestions
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+from typing import List, Optional
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from rapidfuzz import fuzz, process, utils
+
+
+class StubConfig(BaseModel):
+    latency_dist: str = "constant"    # constant | uniform | normal | lognormal
+    latency_mean_ms: float = 50.0
+    latency_std_ms: float = 0.0       # spread for uniform / normal / lognormal
+    error_rate: float = 0.0           # share of requests answered with HTTP 503
+    timeout_rate: float = 0.0         # share of requests that hang for timeout_seconds
+    timeout_seconds: float = 30.0
+    top_k: int = 3
+    batch_enabled: bool = True
+    max_batch_size: int = 100
+    seed: Optional[int] = None
+
+
+class SuggestionRequest(BaseModel):
+    designation: str
+
+
+class BatchItem(BaseModel):
+    id: int
+    designation: str
+
+
+class BatchSuggestionRequest(BaseModel):
+    items: List[BatchItem]
+
+
+app = FastAPI(title="find_suggestions stub")
+
+stub_config = StubConfig()
+rng = random.Random()
+catalog_choices = []
+catalog_labels = []
+stats = {"requests": 0, "batch_requests": 0, "batch_items": 0, "errors_injected": 0, "timeouts_injected": 0}
+
+
+def load_catalog(csv_path: str) -> None:
+    """Load the catalog used to compute suggestions."""
+    global catalog_choices, catalog_labels
+    df = pd.read_csv(csv_path, usecols=["description_cleaned", "nature_product"]).dropna()
+    choice_to_label = dict(zip(df["description_cleaned"], df["nature_product"]))
+    for label in df["nature_product"].unique():
+        choice_to_label.setdefault(label, label)
+    catalog_choices = [utils.default_process(c) for c in choice_to_label.keys()]
+    catalog_labels = list(choice_to_label.values())
+    print(f"Stub catalog loaded: {len(catalog_choices)} strings from {csv_path}")
+
+
+def apply_config(config: StubConfig) -> None:
+    global stub_config
+    stub_config = config
+    rng.seed(config.seed)
+
+
+def sample_latency_s() -> float:
+    """Draw one response latency from the configured distribution."""
+    mean = stub_config.latency_mean_ms
+    std = stub_config.latency_std_ms
+    dist = stub_config.latency_dist
+    if dist == "uniform":
+        latency = rng.uniform(max(0.0, mean - std), mean + std)
+    elif dist == "normal":
+        latency = rng.gauss(mean, std)
+    elif dist == "lognormal" and mean > 0:
+        # Parameters chosen so the distribution has the requested mean and std
+        sigma2 = math.log(1 + (std / mean) ** 2)
+        mu = math.log(mean) - sigma2 / 2
+        latency = rng.lognormvariate(mu, sigma2 ** 0.5)
+    else:
+        latency = mean
+    return max(0.0, latency) / 1000
+
+
+def compute_suggestions(designation: str, top_k: int) -> list:
+    """Best label matches in the find_suggestions format."""
+    # Over-fetch since several catalog strings may share a label
+    hits = process.extract(
+        utils.default_process(designation),
+        catalog_choices,
+        scorer=fuzz.WRatio,
+        processor=None,
+        limit=top_k * 5,
+    )
+    suggestions = []
+    seen = set()
+    for _, score, index in hits:
+        label = catalog_labels[index]
+        if label in seen:
+            continue
+        seen.add(label)
+        suggestions.append({"nature_product": label, "similarity_score": round(score / 100, 4)})
+        if len(suggestions) == top_k:
+            break
+    return suggestions
+
+
+async def inject_faults() -> Optional[JSONResponse]:
+    """Sleep for the sampled latency; return an error response when one is injected."""
+    stats["requests"] += 1
+    draw = rng.random()
+    if draw < stub_config.timeout_rate:
+        stats["timeouts_injected"] += 1
+        await asyncio.sleep(stub_config.timeout_seconds)
+        return JSONResponse(status_code=504, content={"detail": "injected timeout"})
+    await asyncio.sleep(sample_latency_s())
+    if draw < stub_config.timeout_rate + stub_config.error_rate:
+        stats["errors_injected"] += 1
+        return JSONResponse(status_code=503, content={"detail": "injected error"})
+    return None
+
+
+@app.post("/find_suggestions")
+async def find_suggestions(request: SuggestionRequest):
+    error = await inject_faults()
+    if error is not None:
+        return error
+    return {"nature_product_suggestions": compute_suggestions(request.designation, stub_config.top_k)}
+
+
+@app.post("/find_suggestions_batch")
+async def find_suggestions_batch(request: BatchSuggestionRequest):
+    if not stub_config.batch_enabled:
+        return JSONResponse(status_code=404, content={"detail": "batch lookups disabled"})
+    if len(request.items) > stub_config.max_batch_size:
+        return JSONResponse(status_code=413, content={"detail": f"at most {stub_config.max_batch_size} items"})
+    error = await inject_faults()
+    if error is not None:
+        return error
+    stats["batch_requests"] += 1
+    stats["batch_items"] += len(request.items)
+    return {"results": [
+        {"id": item.id, "nature_product_suggestions": compute_suggestions(item.designation, stub_config.top_k)}
+        for item in request.items
+    ]}
+
+
+@app.get("/capabilities")
+async def capabilities():
+    return {"batch": stub_config.batch_enabled, "max_batch_size": stub_config.max_batch_size}
+
+
+@app.get("/config")
+async def get_config():
+    return stub_config
+
+
+@app.post("/config")
+async def set_config(config: StubConfig):
+    """Change latency / fault injection without restarting the stub."""
+    apply_config(config)
+    return stub_config
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "catalog_size": len(catalog_choices)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="find_suggestions stand-in server")
+    parser.add_argument("--catalog", default=os.getenv("STUB_CATALOG_PATH", "labeled_products_filtered.csv"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8012)
+    parser.add_argument("--latency-dist", default="constant",
+                        choices=["constant", "uniform", "normal", "lognormal"])
+    parser.add_argument("--latency-mean-ms", type=float, default=50.0)
+    parser.add_argument("--latency-std-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-seconds", type=float, default=30.0)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--no-batch", action="store_true", help="Do not offer /find_suggestions_batch")
+    parser.add_argument("--max-batch-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    load_catalog(args.catalog)
+    apply_config(StubConfig(
+        latency_dist=args.latency_dist,
+        latency_mean_ms=args.latency_mean_ms,
+        latency_std_ms=args.latency_std_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        top_k=args.top_k,
+        batch_enabled=not args.no_batch,
+        max_batch_size=args.max_batch_size,
+        seed=args.seed,
+    ))
+    uvicorn.run(app, host=args.host, port=args.port, workers=1)
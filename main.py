@@ -5,6 +5,32 @@ import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import time
 from agent.graph import app_langgraph
+from agent.nodes import resolve_deferred_arbitrations
+from utils.config_validator import (
+    DB_BACKEND,
+    ENABLE_EXACT_MATCH,
+    ENABLE_LABEL_WRITEBACK,
+    LOCAL_INDEX_KIND,
+    SNAPSHOT_POLL_SECONDS,
+    LLM_PACKED_ARBITRATION,
+    ENABLE_WEB_CONTEXT,
+    ENABLE_SPECULATIVE_ARBITRATION,
+    ENABLE_FUZZY_FAST_PATH,
+)
+from services.web_context_service import WebContextService
+from services.speculation_service import SpeculativeArbitrator
+from services.cost_governor import CostBudgetGovernor
+from services.database_service import (
+    get_client_metrics,
+    aget_database_suggestions_many,
+    close_async_client,
+)
+from services.llm_service import (
+    get_rate_limiter_stats,
+    get_decision_cache_stats,
+    get_prompt_stats,
+    get_streaming_stats,
+)
 
 app = FastAPI(title="Product Classification API")
 
@@ -14,6 +40,7 @@ thread_pool = ThreadPoolExecutor(max_workers=4)
 class ClassificationRequest(BaseModel):
     designation: str
     product_id: Optional[str] = None
+    client_id: Optional[str] = None
 
 class ClassificationResponse(BaseModel):
     final_label: str
@@ -29,14 +56,20 @@ class ClassificationResponse(BaseModel):
 
 class BatchClassificationRequest(BaseModel):
     products: List[ClassificationRequest]
+    client_id: Optional[str] = None  # default for products without their own
+
+class LearnedLabelApproval(BaseModel):
+    designation: str
+    label: Optional[str] = None  # corrected label, else the learned one is kept
 
 class BatchClassificationResponse(BaseModel):
     results: List[ClassificationResponse]
     total_processing_time_ms: float
     total_cost_usd: float
 
-def classify_single_item(designation: str, product_id: Optional[str] = None):
-    """Process one product at a time"""
+def _run_graph(designation: str, api_suggestions: Optional[list] = None,
+               defer_arbitration: bool = False, client_id: Optional[str] = None):
+    """Graph result of one designation and its processing time in ms"""
     start = time.time()  # track timing
     
     # setup initial state for the graph
@@ -44,11 +77,20 @@ def classify_single_item(designation: str, product_id: Optional[str] = None):
         "description": designation,
         "step_history": []
     }
+    # DB suggestions prefetched by the batch endpoint skip the lookup
+    if api_suggestions is not None:
+        initial_state["api_suggestions"] = api_suggestions
+    # Batch: items needing the LLM are arbitrated together afterwards
+    if defer_arbitration:
+        initial_state["defer_arbitration"] = True
+    # LLM spend is also charged to the client's budget
+    if client_id:
+        initial_state["client_id"] = client_id
     
     result = app_langgraph.invoke(initial_state)
-    
-    proc_time = (time.time() - start) * 1000  # ms
-    
+    return result, (time.time() - start) * 1000
+
+def _to_response(result: dict, proc_time: float, product_id: Optional[str] = None):
     # Extract cost if available from the result
     total_cost = None
     if result.get("cost_info"):
@@ -67,6 +109,12 @@ def classify_single_item(designation: str, product_id: Optional[str] = None):
         "product_id": product_id
     }
 
+def classify_single_item(designation: str, product_id: Optional[str] = None,
+                         api_suggestions: Optional[list] = None, client_id: Optional[str] = None):
+    """Process one product at a time"""
+    result, proc_time = _run_graph(designation, api_suggestions, client_id=client_id)
+    return _to_response(result, proc_time, product_id)
+
 @app.post("/classify", response_model=ClassificationResponse)
 async def classify_product(request: ClassificationRequest):
     """Single product classification"""
@@ -77,32 +125,77 @@ async def classify_product(request: ClassificationRequest):
             thread_pool, 
             classify_single_item, 
             request.designation, 
-            request.product_id
+            request.product_id,
+            None,
+            request.client_id
         )
         return ClassificationResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _answered_before_db(designation: str) -> bool:
+    """Whether the exact-match stage (exact or learned label) settles the designation."""
+    if not ENABLE_EXACT_MATCH:
+        return False
+    from services.exact_match_service import ExactMatchIndex
+    if ExactMatchIndex.get_instance().lookup(designation):
+        return True
+    if ENABLE_LABEL_WRITEBACK:
+        from services.label_store import LearnedLabelStore
+        try:
+            return LearnedLabelStore.get_instance().lookup(designation) is not None
+        except Exception:
+            return False
+    return False
+
 @app.post("/classify/batch", response_model=BatchClassificationResponse)
 async def classify_products_batch(request: BatchClassificationRequest):
     """Batch classification - runs multiple products in parallel"""
     try:
         batch_start = time.time()
         
+        # Fetch the DB suggestions of the items the exact-match stage cannot answer,
+        # concurrently on the event loop (no threads); the others never reach the DB stage
+        misses = [i for i, prod in enumerate(request.products) if not _answered_before_db(prod.designation)]
+        fetched = await aget_database_suggestions_many([request.products[i].designation for i in misses])
+        all_suggestions = [None] * len(request.products)
+        for i, suggestions in zip(misses, fetched):
+            all_suggestions[i] = suggestions
+        
         # Create tasks for parallel execution
         loop = asyncio.get_event_loop()
         task_list = [
             loop.run_in_executor(
                 thread_pool,
-                classify_single_item,
+                _run_graph,
                 prod.designation,
-                prod.product_id
+                suggestions,
+                LLM_PACKED_ARBITRATION,
+                prod.client_id or request.client_id
             )
-            for prod in request.products
+            for prod, suggestions in zip(request.products, all_suggestions)
         ]
         
         # Execute all tasks in parallel
-        batch_results = await asyncio.gather(*task_list)
+        graph_results = await asyncio.gather(*task_list)
+        states = [result for result, _ in graph_results]
+        proc_times = [proc_time for _, proc_time in graph_results]
+        
+        # Items T5 could not settle share packed LLM calls
+        if LLM_PACKED_ARBITRATION:
+            packed_start = time.time()
+            resolved = await loop.run_in_executor(thread_pool, resolve_deferred_arbitrations, states)
+            packed_time = (time.time() - packed_start) * 1000
+            proc_times = [
+                t + packed_time if resolved_state is not state else t
+                for t, state, resolved_state in zip(proc_times, states, resolved)
+            ]
+            states = resolved
+        
+        batch_results = [
+            _to_response(state, proc_time, prod.product_id)
+            for state, proc_time, prod in zip(states, proc_times, request.products)
+        ]
         
         batch_time = (time.time() - batch_start) * 1000
         batch_cost = sum(r.get("cost_usd", 0) or 0 for r in batch_results)
@@ -123,13 +216,121 @@ async def startup_stuff():
     
     # Load T5 model 
     model_service = T5ModelService.get_instance()
+    
+    # Create the LLM client once so the first arbitration doesn't pay for it
+    from services.llm_service import OrchestratorService
+    try:
+        OrchestratorService.get_instance()
+    except Exception as e:
+        print(f"LLM orchestrator not available, local fallback will be used: {e}")
+    
+    # Load the exact-match map (first graph stage)
+    if ENABLE_EXACT_MATCH:
+        from services.exact_match_service import ExactMatchIndex
+        ExactMatchIndex.get_instance()
+    
+    # Build the fuzzy fast-path catalog (first lookup of the DB stage)
+    if ENABLE_FUZZY_FAST_PATH:
+        from services.fuzzy_service import FuzzyLabelMatcher
+        try:
+            FuzzyLabelMatcher.get_instance()
+        except Exception as e:
+            print(f"Fuzzy matcher not available, the fast path will be skipped: {e}")
+    
+    # Build the local suggestion index when the DB stage uses it
+    if DB_BACKEND != "remote":
+        if LOCAL_INDEX_KIND == "vector":
+            from services.vector_index_service import VectorSuggestionIndex
+            VectorSuggestionIndex.get_instance()
+        else:
+            from services.local_index_service import LocalSuggestionIndex
+            LocalSuggestionIndex.get_instance()
+    
+    # Indexes above came from the current snapshot, if any
+    from services.snapshot_service import current_version, mark_active
+    mark_active(current_version())
+    if SNAPSHOT_POLL_SECONDS > 0:
+        asyncio.create_task(poll_snapshots())
     print("All set!")
 
+async def poll_snapshots():
+    """Switch to a newer snapshot as soon as CURRENT points to it"""
+    from services.snapshot_service import switch_to_current
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(SNAPSHOT_POLL_SECONDS)
+        try:
+            await loop.run_in_executor(thread_pool, switch_to_current)
+        except Exception as e:
+            print(f"Snapshot switch failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_stuff():
+    """Close shared HTTP clients"""
+    await close_async_client()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Product classifier is running"}
 
+@app.post("/admin/exact-match/reload")
+async def reload_exact_match():
+    """Rebuild the exact-match map from the labeled dataset without restarting"""
+    from services.exact_match_service import ExactMatchIndex
+    loop = asyncio.get_event_loop()
+    size = await loop.run_in_executor(thread_pool, ExactMatchIndex.get_instance().reload)
+    return {"status": "reloaded", "keys": size}
+
+@app.get("/admin/snapshot")
+async def snapshot_info():
+    """Snapshot CURRENT points to and snapshot being served"""
+    from services.snapshot_service import snapshot_status
+    return snapshot_status()
+
+@app.post("/admin/snapshot/reload")
+async def reload_snapshot():
+    """Switch the local indexes to the snapshot CURRENT points to"""
+    from services.snapshot_service import switch_to_current
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(thread_pool, switch_to_current)
+
+@app.get("/admin/learned-labels")
+async def learned_labels(pending: bool = True):
+    """Learned labels waiting for review (pending=false: every learned label)"""
+    from services.label_store import LearnedLabelStore
+    store = LearnedLabelStore.get_instance()
+    entries = store.pending() if pending else store.entries()
+    return {"count": len(entries), "entries": entries}
+
+@app.post("/admin/learned-labels/approve")
+async def approve_learned_label(approval: LearnedLabelApproval):
+    """Mark a learned label as reviewed so the local stages serve it"""
+    from services.label_store import LearnedLabelStore
+    entry = LearnedLabelStore.get_instance().approve(approval.designation, approval.label)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No learned label for: {approval.designation}")
+    return entry
+
+@app.get("/admin/budget")
+async def budget_status(client_id: Optional[str] = None):
+    """LLM spend mode, burn rate and remaining budget per window (and for one client)"""
+    return CostBudgetGovernor.get_instance().status(client_id)
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics of the classification stages"""
+    return {
+        "database_client": get_client_metrics(),
+        "llm_rate_limiter": get_rate_limiter_stats(),
+        "llm_streaming": get_streaming_stats(),
+        "llm_decision_cache": get_decision_cache_stats(),
+        "llm_prompt": get_prompt_stats(),
+        "web_context": WebContextService.get_instance().stats() if ENABLE_WEB_CONTEXT else None,
+        "llm_budget": CostBudgetGovernor.get_instance().status(),
+        "llm_speculation": SpeculativeArbitrator.get_instance().stats() if ENABLE_SPECULATIVE_ARBITRATION else None,
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, workers=1)  # Single worker for thread safety
\ No newline at end of file
@@ -1,13 +1,16 @@
 # performance_monitor.py
+# For offline, repeatable runs start find_suggestions_stub.py and launch the API
+# with API_URL=http://127.0.0.1:8012/find_suggestions
 import asyncio
 import aiohttp
+import os
 import time
 import statistics
 from datetime import datetime
 
 class PerformanceMonitor:
-    def __init__(self, api_base_url: str = "http://127.0.0.1:8000"):
-        self.api_base_url = api_base_url
+    def __init__(self, api_base_url: str = None):
+        self.api_base_url = api_base_url or os.getenv("PERF_API_BASE_URL", "http://127.0.0.1:8000")
         
     async def measure_latency(self, session: aiohttp.ClientSession, product: str, iterations: int = 10):
         """Measure API latency for a specific product"""
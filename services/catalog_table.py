@@ -0,0 +1,260 @@
+"""
+Compact, memory-mapped catalog string tables.
+
+A string table on disk is:
+    <name>.bin          UTF-8 strings concatenated (no separators)
+    <name>.offsets.npy  uint64[n + 1], string i is bin[offsets[i]:offsets[i + 1]]
+    <name>.hashes.npy   uint64[n], sorted 64-bit hashes of the normalized strings
+    <name>.order.npy    uint32[n], row of the string owning hashes[j]
+                        (hash index optional: tables only read by row skip it)
+    <name>.values.npy   optional int32[n] payload per string (e.g. a label id)
+
+Everything is opened read-only with mmap, so the OS page cache holds a single
+copy shared by every worker process, and a lookup only decodes the strings it
+actually compares.
+
+Build from the CSVs:
+    python -m services.catalog_table --labeled labeled_products_filtered.csv \\
+        --nature data/nature_product.csv --out catalog
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from utils.config_validator import EXACT_MATCH_MIN_AGREEMENT
+from utils.text_normalization import normalize_designation, normalize_series
+
+# 2: keys produced by utils.text_normalization
+# 3: pack formats split ("6x33cl"), single-letter articles kept
+FORMAT_VERSION = 3
+
+
+def key_hash(key: str) -> int:
+    """Stable 64-bit hash of a normalized key."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class StringTableWriter:
+    """
+    Incremental writer of a string table: strings are appended chunk by chunk
+    and only offsets, hashes and values (a few bytes per string) stay in memory.
+    """
+
+    def __init__(self, directory: str, name: str, index: bool = True):
+        self.base = os.path.join(directory, name)
+        self.index = index
+        self._file = open(self.base + ".bin", "wb")
+        self._lengths: List[np.ndarray] = []
+        self._hashes: List[np.ndarray] = []
+        self._values: List[np.ndarray] = []
+
+    def append(self, strings: List[str], values: Optional[List[int]] = None) -> None:
+        encoded = [s.encode("utf-8") for s in strings]
+        for b in encoded:
+            self._file.write(b)
+        self._lengths.append(np.array([len(b) for b in encoded], dtype=np.uint64))
+        if self.index:
+            self._hashes.append(np.array([key_hash(key) for key in normalize_series(strings)], dtype=np.uint64))
+        if values is not None:
+            self._values.append(np.asarray(values, dtype=np.int32))
+
+    def close(self) -> int:
+        """Write offsets / hash index / values. Returns the number of strings."""
+        self._file.close()
+        lengths = np.concatenate(self._lengths) if self._lengths else np.zeros(0, dtype=np.uint64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum(lengths, dtype=np.uint64)
+        np.save(self.base + ".offsets.npy", offsets)
+
+        if self.index:
+            hashes = np.concatenate(self._hashes) if self._hashes else np.zeros(0, dtype=np.uint64)
+            order = np.argsort(hashes, kind="stable").astype(np.uint32)
+            np.save(self.base + ".hashes.npy", hashes[order])
+            np.save(self.base + ".order.npy", order)
+        if self._values:
+            np.save(self.base + ".values.npy", np.concatenate(self._values))
+        return len(lengths)
+
+
+def write_string_table(directory: str, name: str, strings: List[str], values: Optional[List[int]] = None) -> None:
+    """Write a string table (see module docstring) to directory."""
+    writer = StringTableWriter(directory, name)
+    writer.append(strings, values)
+    writer.close()
+
+
+class StringTable:
+    """Read-only, memory-mapped view of a string table."""
+
+    def __init__(self, directory: str, name: str):
+        base = os.path.join(directory, name)
+        self._file = open(base + ".bin", "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.offsets = np.load(base + ".offsets.npy", mmap_mode="r")
+        indexed = os.path.exists(base + ".hashes.npy")
+        self.hashes = np.load(base + ".hashes.npy", mmap_mode="r") if indexed else None
+        self.order = np.load(base + ".order.npy", mmap_mode="r") if indexed else None
+        values_path = base + ".values.npy"
+        self.values = np.load(values_path, mmap_mode="r") if os.path.exists(values_path) else None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self.get(index)
+
+    def get(self, index: int) -> str:
+        """Decode string `index` (the only place a Python str is created)."""
+        return self._blob[int(self.offsets[index]):int(self.offsets[index + 1])].decode("utf-8")
+
+    def find(self, designation: str) -> int:
+        """Row whose normalized string equals normalize_designation(designation), or -1."""
+        if self.hashes is None:
+            raise ValueError(f"String table {self._file.name} has no hash index")
+        key = normalize_designation(designation)
+        target = np.uint64(key_hash(key))
+        position = int(np.searchsorted(self.hashes, target, side="left"))
+        # Hash collisions are resolved by comparing the decoded strings
+        while position < len(self.hashes) and self.hashes[position] == target:
+            index = int(self.order[position])
+            if normalize_designation(self.get(index)) == key:
+                return index
+            position += 1
+        return -1
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self.get(index)
+
+    def close(self) -> None:
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+
+class CatalogTables:
+    """
+    The catalog as two string tables:
+    - `labels`: every known nature_product
+    - `keys`: unambiguous normalized designations, with the id of their label as value
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, "catalog_meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog format in {directory}: {self.meta.get('format_version')}")
+        self.directory = directory
+        self.labels = StringTable(directory, "labels")
+        self.keys = StringTable(directory, "keys")
+
+    def lookup_label(self, designation: str) -> Optional[str]:
+        """Label of a known designation (or of a label itself), or None."""
+        index = self.keys.find(designation)
+        if index >= 0:
+            return self.labels.get(int(self.keys.values[index]))
+        index = self.labels.find(designation)
+        return self.labels.get(index) if index >= 0 else None
+
+    def close(self) -> None:
+        self.labels.close()
+        self.keys.close()
+
+
+class LabeledColumn:
+    """Per-row label read through label ids: `column[i] == labels.get(ids[i])`."""
+
+    def __init__(self, labels: StringTable, ids: np.ndarray):
+        self.labels = labels
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> str:
+        return self.labels.get(int(self.ids[index]))
+
+
+def add_key_votes(votes: Dict[str, Counter], keys: Iterable[str], labels: Iterable[str]) -> None:
+    """Count one vote for each label under its (already normalized) key."""
+    for key, label in zip(keys, labels):
+        if key:
+            votes[key][label] += 1
+
+
+def add_votes(votes: Dict[str, Counter], descriptions: Iterable[str], labels: Iterable[str]) -> None:
+    """Count one vote for each label under the normalized key of its description."""
+    add_key_votes(votes, normalize_series(descriptions), labels)
+
+
+def add_label_votes(votes: Dict[str, Counter], labels: Iterable[str]) -> None:
+    """Labels are keys of themselves: one self-vote each."""
+    labels = list(labels)
+    add_votes(votes, labels, labels)
+
+
+def agreed_labels(votes: Dict[str, Counter]) -> Iterator[tuple]:
+    """(key, majority label) of the keys whose majority reaches EXACT_MATCH_MIN_AGREEMENT."""
+    for key, counter in votes.items():
+        label, count = counter.most_common(1)[0]
+        if count / sum(counter.values()) >= EXACT_MATCH_MIN_AGREEMENT:
+            yield key, label
+
+
+def build_catalog_tables(pairs: Iterable[tuple], extra_labels: Iterable[str], out_dir: str) -> dict:
+    """
+    Build the tables from (description, label) pairs plus labels without descriptions.
+    Votes are those of the dict build and the snapshot builder: descriptions,
+    then one self-vote per label.
+    """
+    pairs = pd.DataFrame(list(pairs), columns=["description", "label"])
+    labels = set(extra_labels) | set(pairs["label"])
+    votes = defaultdict(Counter)
+    add_votes(votes, pairs["description"], pairs["label"])
+    add_label_votes(votes, sorted(labels))
+    return write_catalog_tables(votes, labels, out_dir)
+
+
+def write_catalog_tables(votes: Dict[str, Counter], labels: Iterable[str], out_dir: str) -> dict:
+    """Write the tables from label votes per normalized key and the set of known labels."""
+    os.makedirs(out_dir, exist_ok=True)
+    label_list = sorted(labels)
+    label_ids = {label: i for i, label in enumerate(label_list)}
+    keys, values = [], []
+    for key, label in agreed_labels(votes):
+        keys.append(key)
+        values.append(label_ids[label])
+
+    write_string_table(out_dir, "labels", label_list)
+    write_string_table(out_dir, "keys", keys, values)
+    meta = {"format_version": FORMAT_VERSION, "labels": len(label_list), "keys": len(keys)}
+    with open(os.path.join(out_dir, "catalog_meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped catalog string tables")
+    parser.add_argument("--labeled", default="labeled_products_filtered.csv")
+    parser.add_argument("--nature", default=None, help="Optional nature_product.csv with extra labels")
+    parser.add_argument("--out", default="catalog")
+    args = parser.parse_args()
+
+    labeled = pd.read_csv(args.labeled, usecols=["description_cleaned", "nature_product"]).dropna()
+    extra = []
+    if args.nature:
+        extra = pd.read_csv(args.nature, usecols=["nature_product"])["nature_product"].dropna().tolist()
+    meta = build_catalog_tables(
+        zip(labeled["description_cleaned"], labeled["nature_product"]), extra, args.out
+    )
+    print(f"Catalog written to {args.out}: {meta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import threading
+import time
+from typing import Dict, Optional
+from utils.config_validator import (
+    LLM_BUDGET_PER_MINUTE_USD,
+    LLM_BUDGET_PER_HOUR_USD,
+    LLM_BUDGET_PER_DAY_USD,
+    LLM_CLIENT_BUDGET_PER_MINUTE_USD,
+    LLM_CLIENT_BUDGET_PER_HOUR_USD,
+    LLM_CLIENT_BUDGET_PER_DAY_USD,
+    LLM_BUDGET_SOFT_RATIO,
+    LLM_BUDGET_MAX_CLIENTS,
+)
+
+NORMAL = "normal"
+RESTRICTED = "restricted"
+LOCAL_ONLY = "local_only"
+
+# Rolling windows: name -> length in seconds
+_WINDOWS = (("minute", 60), ("hour", 3600), ("day", 86400))
+
+
+class RollingSpend:
+    """
+    Spend over the last `window_s` seconds, kept in `slots` fixed slots: a slot
+    older than the window expires whole, so the total is exact to one slot.
+    Not thread-safe (the governor holds its lock).
+    """
+
+    def __init__(self, window_s: float, slots: int = 60):
+        self.window_s = window_s
+        self._slot_s = window_s / slots
+        self._amounts = [0.0] * slots
+        self._ids = [-1] * slots
+
+    def add(self, amount: float, now: float) -> None:
+        slot = int(now // self._slot_s)
+        i = slot % len(self._amounts)
+        if self._ids[i] != slot:
+            self._ids[i] = slot
+            self._amounts[i] = 0.0
+        self._amounts[i] += amount
+
+    def total(self, now: float) -> float:
+        current = int(now // self._slot_s)
+        n = len(self._amounts)
+        return sum(amount for amount, slot in zip(self._amounts, self._ids) if current - slot < n)
+
+
+class _Budget:
+    """Minute / hour / day spend of one payer against its limits (0 = no limit)."""
+
+    def __init__(self, limits: Dict[str, float]):
+        self.limits = limits
+        self.windows = {name: RollingSpend(seconds) for name, seconds in _WINDOWS}
+
+    def add(self, amount: float, now: float) -> None:
+        for window in self.windows.values():
+            window.add(amount, now)
+
+    def usage(self, now: float) -> float:
+        """Highest spent / budget ratio over the limited windows."""
+        return max(
+            (self.windows[name].total(now) / limit for name, limit in self.limits.items() if limit > 0),
+            default=0.0,
+        )
+
+    def status(self, now: float) -> Dict:
+        windows = {}
+        for name, window in self.windows.items():
+            spent = window.total(now)
+            limit = self.limits.get(name, 0.0)
+            windows[name] = {
+                "budget_usd": limit or None,
+                "spent_usd": round(spent, 6),
+                "remaining_usd": round(max(limit - spent, 0.0), 6) if limit > 0 else None,
+                "used": round(spent / limit, 4) if limit > 0 else None,
+            }
+        return {
+            "burn_rate_usd_per_minute": windows["minute"]["spent_usd"],
+            "burn_rate_usd_per_hour": windows["hour"]["spent_usd"],
+            "windows": windows,
+        }
+
+
+class CostBudgetGovernor:
+    """
+    Rolling LLM spend limits, for the process and per client.
+
+    Every billed LLM call is `record`ed against the process budgets; the cost
+    reported to a request carrying a client id is also `charge_client`ed to
+    that client. `mode` tells the cascade how much LLM it may still use:
+    NORMAL, RESTRICTED once any budget (process or client) passes
+    LLM_BUDGET_SOFT_RATIO, LOCAL_ONLY once one is spent.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self,
+                 limits: Optional[Dict[str, float]] = None,
+                 client_limits: Optional[Dict[str, float]] = None,
+                 soft_ratio: float = LLM_BUDGET_SOFT_RATIO,
+                 max_clients: int = LLM_BUDGET_MAX_CLIENTS):
+        self.limits = limits or {
+            "minute": LLM_BUDGET_PER_MINUTE_USD,
+            "hour": LLM_BUDGET_PER_HOUR_USD,
+            "day": LLM_BUDGET_PER_DAY_USD,
+        }
+        self.client_limits = client_limits or {
+            "minute": LLM_CLIENT_BUDGET_PER_MINUTE_USD,
+            "hour": LLM_CLIENT_BUDGET_PER_HOUR_USD,
+            "day": LLM_CLIENT_BUDGET_PER_DAY_USD,
+        }
+        self.soft_ratio = soft_ratio
+        self.max_clients = max_clients
+        self._budget = _Budget(self.limits)
+        self._clients: Dict[str, _Budget] = {}
+        self._state_lock = threading.Lock()
+        self._counters = {
+            "admitted": 0,
+            "restricted_local": 0,
+            "local_only": 0,
+        }
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def record(self, cost_usd: float) -> None:
+        """Spend of one billed LLM call (process budgets)."""
+        if cost_usd <= 0:
+            return
+        with self._state_lock:
+            self._budget.add(cost_usd, time.time())
+
+    def charge_client(self, client_id: Optional[str], cost_usd: float) -> None:
+        """Spend reported to a request of this client (client budgets)."""
+        if not client_id or cost_usd <= 0 or not any(limit > 0 for limit in self.client_limits.values()):
+            return
+        now = time.time()
+        with self._state_lock:
+            budget = self._clients.get(client_id)
+            if budget is None:
+                if len(self._clients) >= self.max_clients:
+                    self._drop_idle_clients(now)
+                budget = self._clients[client_id] = _Budget(self.client_limits)
+            budget.add(cost_usd, now)
+
+    def _drop_idle_clients(self, now: float) -> None:
+        """Forget clients with no spend in the last day (caller holds the lock)."""
+        for client_id in [c for c, b in self._clients.items() if b.windows["day"].total(now) <= 0]:
+            del self._clients[client_id]
+
+    def _mode_for(self, usage: float) -> str:
+        if usage >= 1.0:
+            return LOCAL_ONLY
+        if usage >= self.soft_ratio:
+            return RESTRICTED
+        return NORMAL
+
+    def mode(self, client_id: Optional[str] = None) -> str:
+        """NORMAL, RESTRICTED or LOCAL_ONLY for a request of this client."""
+        now = time.time()
+        with self._state_lock:
+            usage = self._budget.usage(now)
+            client = self._clients.get(client_id) if client_id else None
+            if client is not None:
+                usage = max(usage, client.usage(now))
+        return self._mode_for(usage)
+
+    def count(self, name: str) -> None:
+        with self._state_lock:
+            self._counters[name] += 1
+
+    def status(self, client_id: Optional[str] = None) -> Dict:
+        """Mode, burn rate and remaining budget per window (and for client_id, if given)."""
+        now = time.time()
+        with self._state_lock:
+            status = {
+                "mode": self._mode_for(self._budget.usage(now)),
+                "soft_ratio": self.soft_ratio,
+                **self._budget.status(now),
+                "clients_tracked": len(self._clients),
+                **self._counters,
+            }
+            if client_id:
+                client = self._clients.get(client_id) or _Budget(self.client_limits)
+                status["client"] = {
+                    "client_id": client_id,
+                    # Effective mode of its requests: the process budget applies too
+                    "mode": self._mode_for(max(self._budget.usage(now), client.usage(now))),
+                    **client.status(now),
+                }
+        return status
@@ -1,6 +1,253 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import aiohttp
 import requests
-from typing import List, Dict
-import config as _cfg
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Optional
+from utils.config_validator import (
+    API_URL,
+    DB_POOL_SIZE,
+    DB_CONNECT_TIMEOUT,
+    DB_READ_TIMEOUT,
+    DB_MAX_RETRIES,
+    DB_RETRY_BACKOFF,
+    DB_RETRY_MAX_BACKOFF,
+    DB_ASYNC_MAX_CONCURRENCY,
+    DB_ASYNC_LIMIT_PER_HOST,
+    DB_BACKEND,
+    LOCAL_INDEX_ACCEPT_SCORE,
+    LOCAL_INDEX_KIND,
+    ENABLE_FUZZY_FAST_PATH,
+    ENABLE_FUZZY_RERANK,
+    SUGGESTION_CACHE_ENABLED,
+    SUGGESTION_CACHE_SIZE,
+    SUGGESTION_CACHE_TTL,
+    SUGGESTION_CACHE_NEGATIVE_TTL,
+    SUGGESTION_CACHE_STALE_TTL,
+    DB_BREAKER_FAILURE_THRESHOLD,
+    DB_BREAKER_SLOW_CALL_MS,
+    DB_BREAKER_SLOW_CALL_THRESHOLD,
+    DB_BREAKER_OPEN_SECONDS,
+    DB_DEGRADED_POLICY,
+    DB_HEDGE_ENABLED,
+    DB_HEDGE_PERCENTILE,
+    DB_HEDGE_MIN_DELAY_MS,
+    DB_HEDGE_MIN_SAMPLES,
+    DB_HEDGE_POOL_SIZE,
+    DB_BATCH_MODE,
+    DB_BATCH_URL,
+    DB_CAPABILITIES_URL,
+    DB_CAPABILITIES_TTL,
+    DB_BATCH_SIZE,
+    DB_BATCH_FALLBACK_CONCURRENCY,
+)
+from utils.ttl_cache import TTLCache, FRESH, STALE
+from utils.circuit_breaker import CircuitBreaker, LatencyTracker
+from utils.exceptions import CircuitOpenError
+from utils.text_normalization import normalize_designation
+
+# Status codes worth retrying: find_suggestions is a read-only lookup
+_RETRYABLE_STATUS = {502, 503, 504}
+
+_session: Optional[requests.Session] = None
+# Hedge attempts get their own pool: a losing one never holds a primary connection
+_hedge_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# aiohttp sessions and semaphores are bound to an event loop: one of each per live loop
+_async_clients: Dict[asyncio.AbstractEventLoop, tuple] = {}
+_async_clients_lock = threading.Lock()
+
+# Remote answers by normalized designation (the catalog changes slowly)
+_suggestion_cache: Optional[TTLCache] = (
+    TTLCache(
+        maxsize=SUGGESTION_CACHE_SIZE,
+        ttl=SUGGESTION_CACHE_TTL,
+        negative_ttl=SUGGESTION_CACHE_NEGATIVE_TTL,
+        stale_ttl=SUGGESTION_CACHE_STALE_TTL,
+        name="suggestion_cache",
+    )
+    if SUGGESTION_CACHE_ENABLED else None
+)
+
+# Breaker and latency window over logical lookups (retries included)
+_breaker = CircuitBreaker(
+    "find_suggestions",
+    failure_threshold=DB_BREAKER_FAILURE_THRESHOLD,
+    slow_call_ms=DB_BREAKER_SLOW_CALL_MS,
+    slow_call_threshold=DB_BREAKER_SLOW_CALL_THRESHOLD,
+    open_duration_s=DB_BREAKER_OPEN_SECONDS,
+)
+_latency = LatencyTracker()
+_hedge_executor = (
+    ThreadPoolExecutor(max_workers=2 * DB_POOL_SIZE, thread_name_prefix="find_suggestions_hedge")
+    if DB_HEDGE_ENABLED else None
+)
+
+# Batch support advertised by the server: chunk size (0 = none) and when it was asked
+_batch_capability = {"max_batch_size": 0, "checked_at": None}
+
+# Fuzzy matcher, loaded on first use; a load failure disables the fast path
+_fuzzy_unavailable = False
+_fuzzy_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "requests_total": 0,
+    "errors_total": 0,
+    "retries_total": 0,
+    "latency_ms_total": 0.0,
+    "async_in_flight": 0,
+    "async_waiting": 0,
+    "fuzzy_fast_path_hits": 0,
+    "breaker_short_circuits": 0,
+    "degraded_lookups": 0,
+    "hedges_fired": 0,
+    "hedges_won": 0,
+    "batch_requests": 0,
+    "batch_items": 0,
+    "batch_fallback_singles": 0,
+}
+
+
+def _new_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        pool_block=True,
+        max_retries=0,  # retries are handled in get_database_suggestions
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _get_session() -> requests.Session:
+    """Shared keep-alive session, created once (double-checked locking)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _new_session(DB_POOL_SIZE)
+    return _session
+
+
+def _get_hedge_session() -> requests.Session:
+    """Session of the hedge attempts (DB_HEDGE_POOL_SIZE connections)."""
+    global _hedge_session
+    if _hedge_session is None:
+        with _session_lock:
+            if _hedge_session is None:
+                _hedge_session = _new_session(DB_HEDGE_POOL_SIZE)
+    return _hedge_session
+
+
+def _get_async_client() -> tuple:
+    """Shared aiohttp session and concurrency semaphore for the running loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client[0].closed:
+        with _async_clients_lock:
+            _evict_closed_loops()
+            client = _async_clients.get(loop)
+            if client is None or client[0].closed:
+                connector = aiohttp.TCPConnector(
+                    limit=DB_ASYNC_LIMIT_PER_HOST,
+                    limit_per_host=DB_ASYNC_LIMIT_PER_HOST,
+                    keepalive_timeout=30,
+                )
+                session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(
+                        sock_connect=DB_CONNECT_TIMEOUT,
+                        sock_read=DB_READ_TIMEOUT,
+                    ),
+                )
+                client = (session, asyncio.Semaphore(DB_ASYNC_MAX_CONCURRENCY))
+                _async_clients[loop] = client
+    return client
+
+
+def _evict_closed_loops() -> None:
+    """Drop the clients of loops that are closed (caller holds _async_clients_lock)."""
+    for loop in [l for l in _async_clients if l.is_closed()]:
+        session, _ = _async_clients.pop(loop)
+        if not session.closed:
+            # The loop is gone, so the session cannot be awaited: close its sockets directly
+            connector = session.connector
+            session.detach()
+            if connector is not None:
+                try:
+                    connector.close()
+                except Exception as e:
+                    print(f"⚠️ Could not close connector of a closed loop: {e}")
+
+
+async def close_async_client() -> None:
+    """Close the aiohttp session of the running loop (call on shutdown)."""
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client[0].close()
+
+
+def _cache_key(designation: str) -> str:
+    return normalize_designation(designation)
+
+
+def _record(name: str, value: float = 1) -> None:
+    with _metrics_lock:
+        _metrics[name] += value
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(DB_RETRY_MAX_BACKOFF, DB_RETRY_BACKOFF * (2 ** attempt)))
+
+
+def get_client_metrics() -> Dict:
+    """
+    Request counters and connection pool usage of the find_suggestions client.
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    requests_total = metrics["requests_total"]
+    metrics["avg_latency_ms"] = (
+        round(metrics["latency_ms_total"] / requests_total, 2) if requests_total else 0.0
+    )
+
+    pools = []
+    if _session is not None:
+        adapter = _session.get_adapter(API_URL)
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": f"{pool.host}:{pool.port}",
+                "maxsize": pool.pool.maxsize if pool.pool else 0,
+                "idle_connections": pool.pool.qsize() if pool.pool else 0,
+                "connections_opened": pool.num_connections,
+                "requests_sent": pool.num_requests,
+            })
+    metrics["pools"] = pools
+    if _suggestion_cache is not None:
+        metrics["suggestion_cache"] = _suggestion_cache.stats()
+    metrics["breaker"] = _breaker.stats()
+    metrics["batch_max_size"] = _batch_capability["max_batch_size"]
+    metrics["latency_p50_ms"] = round(_latency.percentile(50), 2)
+    metrics["latency_p95_ms"] = round(_latency.percentile(95), 2)
+    return metrics
+
+
+def get_breaker_state() -> str:
+    """Current state of the find_suggestions circuit breaker."""
+    return _breaker.state
 
 
 def _normalize_suggestions(payload) -> List[Dict]:
@@ -18,26 +265,528 @@ def _normalize_suggestions(payload) -> List[Dict]:
     # Filter and sort by descending similarity_score
     valid_suggestions = [s for s in suggestions if isinstance(s, dict) and s.get("similarity_score", 0) > 0]
     valid_suggestions.sort(key=lambda x: x.get("similarity_score", 0.0), reverse=True)
-    
+
     return valid_suggestions
 
 
+def _get_local_index():
+    """In-process index selected by LOCAL_INDEX_KIND (built on first use)."""
+    if LOCAL_INDEX_KIND == "vector":
+        from services.vector_index_service import VectorSuggestionIndex
+        return VectorSuggestionIndex.get_instance()
+    from services.local_index_service import LocalSuggestionIndex
+    return LocalSuggestionIndex.get_instance()
+
+
+def _get_local_suggestions(designation: str) -> List[Dict]:
+    """Query the in-process index."""
+    try:
+        return _get_local_index().query(designation)
+    except Exception as e:
+        print(f"Local index error: {e}")
+        return []
+
+
+def _get_local_suggestions_many(designations: List[str]) -> List[List[Dict]]:
+    """Batch variant of _get_local_suggestions."""
+    try:
+        return _get_local_index().query_many(designations)
+    except Exception as e:
+        print(f"Local index error: {e}")
+        return [[] for _ in designations]
+
+
+def _local_is_enough(suggestions: List[Dict]) -> bool:
+    return bool(suggestions) and suggestions[0]["similarity_score"] >= LOCAL_INDEX_ACCEPT_SCORE
+
+
+def _get_fuzzy_matcher():
+    """
+    FuzzyLabelMatcher singleton, or None when the catalog cannot be loaded.
+    Read on every call: a snapshot switch replaces the instance.
+    """
+    global _fuzzy_unavailable
+    from services.fuzzy_service import FuzzyLabelMatcher
+    if FuzzyLabelMatcher._instance is None and not _fuzzy_unavailable:
+        with _fuzzy_lock:
+            if not _fuzzy_unavailable:
+                try:
+                    FuzzyLabelMatcher.get_instance()
+                except Exception as e:
+                    _fuzzy_unavailable = True
+                    print(f"Fuzzy fast path disabled: {e}")
+    return FuzzyLabelMatcher._instance
+
+
+def _fuzzy_fast_path(designations: List[str]) -> List[List[Dict]]:
+    """Local fuzzy hits for each designation ([] when there is none)."""
+    matcher = _get_fuzzy_matcher() if ENABLE_FUZZY_FAST_PATH else None
+    if matcher is None:
+        return [[] for _ in designations]
+    if len(designations) == 1:
+        hits = [matcher.match(designations[0])]
+    else:
+        hits = matcher.match_many(designations)
+    _record("fuzzy_fast_path_hits", sum(1 for h in hits if h))
+    return hits
+
+
+def _rerank(designations: List[str], suggestions_list: List[List[Dict]]) -> List[List[Dict]]:
+    if not ENABLE_FUZZY_RERANK:
+        return suggestions_list
+    from services.fuzzy_service import FuzzyLabelMatcher
+    return FuzzyLabelMatcher.rerank_many(designations, suggestions_list)
+
+
 def get_database_suggestions(designation: str) -> List[Dict]:
     """
-    Call the find_suggestions endpoint with simplified structure.
+    Database stage lookup: fuzzy fast path first, then the DB_BACKEND route.
+    """
+    fast = _fuzzy_fast_path([designation])[0]
+    if fast:
+        return fast
+    if DB_BACKEND == "local":
+        return _get_local_suggestions(designation)
+    if DB_BACKEND == "local_then_remote":
+        local = _get_local_suggestions(designation)
+        if _local_is_enough(local):
+            return local
+        return _rerank([designation], [get_remote_suggestions(designation)])[0] or local
+    return _rerank([designation], [get_remote_suggestions(designation)])[0]
+
+
+async def aget_database_suggestions(designation: str, skip_fast_path: bool = False) -> List[Dict]:
+    """
+    Async variant of get_database_suggestions.
+    """
+    if not skip_fast_path:
+        fast = _fuzzy_fast_path([designation])[0]
+        if fast:
+            return fast
+    if DB_BACKEND == "local":
+        return _get_local_suggestions(designation)
+    if DB_BACKEND == "local_then_remote":
+        local = _get_local_suggestions(designation)
+        if _local_is_enough(local):
+            return local
+        return _rerank([designation], [await aget_remote_suggestions(designation)])[0] or local
+    return _rerank([designation], [await aget_remote_suggestions(designation)])[0]
+
+
+def _fetch_remote(designation: str,
+                  session: Optional[requests.Session] = None,
+                  cancelled: Optional[threading.Event] = None) -> List[Dict]:
+    """
+    POST to find_suggestions. Connection errors, timeouts and 502-504
+    responses are retried with jittered backoff; the last error is raised.
+    Once `cancelled` is set (hedge decided), the attempt stops retrying.
+    """
+    payload = {
+        "designation": designation
+    }
+    session = session or _get_session()
+
+    for attempt in range(DB_MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            response = session.post(
+                API_URL,
+                json=payload,
+                timeout=(DB_CONNECT_TIMEOUT, DB_READ_TIMEOUT),
+            )
+            if response.status_code in _RETRYABLE_STATUS and attempt < DB_MAX_RETRIES:
+                raise requests.HTTPError(f"{response.status_code} from find_suggestions", response=response)
+            response.raise_for_status()
+            return _normalize_suggestions(response.json())
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            retryable = not isinstance(e, requests.HTTPError) or (
+                e.response is not None and e.response.status_code in _RETRYABLE_STATUS
+            )
+            if retryable and attempt < DB_MAX_RETRIES and not (cancelled and cancelled.is_set()):
+                _record("retries_total")
+                time.sleep(_backoff_delay(attempt))
+                continue
+            raise
+        finally:
+            _record("requests_total")
+            _record("latency_ms_total", (time.perf_counter() - start) * 1000)
+
+
+async def _afetch_remote(designation: str) -> List[Dict]:
+    """
+    Async variant of _fetch_remote.
+    Lookups share one aiohttp session per event loop; the semaphore bounds how
+    many run at once and the connector bounds the sockets opened to API_URL.
+    """
+    payload = {
+        "designation": designation
+    }
+    return _normalize_suggestions(await _apost(API_URL, payload))
+
+
+async def _apost(url: str, payload: Dict):
+    """POST with the shared async client and retries; returns the decoded JSON body."""
+    session, semaphore = _get_async_client()
+
+    _record("async_waiting")
+    async with semaphore:
+        _record("async_waiting", -1)
+        _record("async_in_flight")
+        try:
+            for attempt in range(DB_MAX_RETRIES + 1):
+                start = time.perf_counter()
+                try:
+                    async with session.post(url, json=payload) as response:
+                        if response.status in _RETRYABLE_STATUS and attempt < DB_MAX_RETRIES:
+                            _record("retries_total")
+                            await asyncio.sleep(_backoff_delay(attempt))
+                            continue
+                        response.raise_for_status()
+                        return await response.json()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt < DB_MAX_RETRIES:
+                        _record("retries_total")
+                        await asyncio.sleep(_backoff_delay(attempt))
+                        continue
+                    raise
+                finally:
+                    _record("requests_total")
+                    _record("latency_ms_total", (time.perf_counter() - start) * 1000)
+        finally:
+            _record("async_in_flight", -1)
+
+
+def _hedge_delay_s() -> Optional[float]:
+    """Delay before a hedged attempt, or None when hedging is off or not warmed up."""
+    if not DB_HEDGE_ENABLED or len(_latency) < DB_HEDGE_MIN_SAMPLES:
+        return None
+    return max(DB_HEDGE_MIN_DELAY_MS, _latency.percentile(DB_HEDGE_PERCENTILE)) / 1000
+
+
+def _hedged_fetch(designation: str) -> List[Dict]:
+    """
+    _fetch_remote, plus a second attempt when the first exceeds the p95 delay.
+    The hedge uses its own session; once one attempt has answered, the other
+    is cancelled if still queued, and otherwise stops after its current try.
+    """
+    delay = _hedge_delay_s()
+    if delay is None:
+        return _fetch_remote(designation)
+
+    cancelled = threading.Event()
+    primary = _hedge_executor.submit(_fetch_remote, designation, None, cancelled)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    _record("hedges_fired")
+    hedge = _hedge_executor.submit(_fetch_remote, designation, _get_hedge_session(), cancelled)
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        _record("hedges_won")
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        cancelled.set()
+        for future in pending:
+            future.cancel()
+
+
+async def _ahedged_fetch(designation: str) -> List[Dict]:
+    """Async variant of _hedged_fetch; the losing attempt is cancelled."""
+    delay = _hedge_delay_s()
+    primary = asyncio.ensure_future(_afetch_remote(designation))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    _record("hedges_fired")
+    hedge = asyncio.ensure_future(_afetch_remote(designation))
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _record("hedges_won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _guarded_fetch(designation: str) -> List[Dict]:
+    """Remote lookup through the circuit breaker."""
+    permit = _breaker.allow_request()
+    if not permit:
+        raise CircuitOpenError("find_suggestions circuit is open", api_name="find_suggestions")
+    start = time.perf_counter()
+    try:
+        suggestions = _hedged_fetch(designation)
+    except Exception:
+        _breaker.record_failure(permit)
+        raise
+    except BaseException:
+        # Cancelled (client gone, hedge lost...): no verdict, but never keep the probe slot
+        _breaker.release(permit)
+        raise
+    latency_ms = (time.perf_counter() - start) * 1000
+    _breaker.record_success(latency_ms, permit)
+    _latency.add(latency_ms)
+    return suggestions
+
+
+async def _aguarded_fetch(designation: str) -> List[Dict]:
+    """Async variant of _guarded_fetch."""
+    permit = _breaker.allow_request()
+    if not permit:
+        raise CircuitOpenError("find_suggestions circuit is open", api_name="find_suggestions")
+    start = time.perf_counter()
+    try:
+        suggestions = await _ahedged_fetch(designation)
+    except Exception:
+        _breaker.record_failure(permit)
+        raise
+    except BaseException:
+        # Cancelled (client gone, hedge lost...): no verdict, but never keep the probe slot
+        _breaker.release(permit)
+        raise
+    latency_ms = (time.perf_counter() - start) * 1000
+    _breaker.record_success(latency_ms, permit)
+    _latency.add(latency_ms)
+    return suggestions
+
+
+def _degraded_suggestions(designation: str) -> List[Dict]:
+    """Answer used while the breaker rejects remote calls (DB_DEGRADED_POLICY)."""
+    _record("degraded_lookups")
+    if DB_DEGRADED_POLICY == "local":
+        return _get_local_suggestions(designation)
+    return []
+
+
+def get_remote_suggestions(designation: str) -> List[Dict]:
+    """
+    Call the find_suggestions endpoint, through the suggestion cache when enabled.
+    Errors are logged and return [] (they are never cached); while the circuit
+    breaker is open the degraded policy answers instead.
     """
     try:
-        payload = {
-            "designation": designation
-        }
-        
-        response = requests.post(
-            _cfg.API_URL,
-            json=payload,
-            timeout=10,
+        if _suggestion_cache is None:
+            return _guarded_fetch(designation)
+        return _suggestion_cache.get_or_load(
+            _cache_key(designation),
+            lambda: _guarded_fetch(designation)
         )
-        response.raise_for_status()
-        return _normalize_suggestions(response.json())
+    except CircuitOpenError:
+        _record("breaker_short_circuits")
+        return _degraded_suggestions(designation)
+    except Exception as e:
+        _record("errors_total")
+        print(f"API Error (find_suggestions): {e}")
+        return []
+
+
+async def aget_remote_suggestions(designation: str) -> List[Dict]:
+    """
+    Async variant of get_remote_suggestions. Stale entries are refreshed by
+    the cache's background worker with the sync client.
+    """
+    key = _cache_key(designation)
+    try:
+        if _suggestion_cache is not None:
+            state, value = _suggestion_cache.lookup(key)
+            if state == FRESH:
+                return value
+            if state == STALE:
+                _suggestion_cache.refresh_in_background(key, lambda: _guarded_fetch(designation))
+                return value
+        suggestions = await _aguarded_fetch(designation)
+        if _suggestion_cache is not None:
+            _suggestion_cache.set(key, suggestions)
+        return suggestions
     except Exception as e:
+        expired = _suggestion_cache.peek(key) if _suggestion_cache is not None else None
+        if expired is not None:
+            return expired
+        if isinstance(e, CircuitOpenError):
+            _record("breaker_short_circuits")
+            return _degraded_suggestions(designation)
+        _record("errors_total")
         print(f"API Error (find_suggestions): {e}")
         return []
+
+
+async def _abatch_size() -> int:
+    """Designations per batch request, or 0 when the server has no batch endpoint."""
+    if DB_BATCH_MODE == "off":
+        return 0
+    if DB_BATCH_MODE == "on":
+        return DB_BATCH_SIZE
+    checked_at = _batch_capability["checked_at"]
+    if checked_at is not None and time.monotonic() - checked_at < DB_CAPABILITIES_TTL:
+        return _batch_capability["max_batch_size"]
+
+    size = 0
+    session, _ = _get_async_client()
+    try:
+        async with session.get(DB_CAPABILITIES_URL) as response:
+            if response.status == 200:
+                capabilities = await response.json()
+                if capabilities.get("batch"):
+                    size = min(DB_BATCH_SIZE, int(capabilities.get("max_batch_size") or DB_BATCH_SIZE))
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, AttributeError) as e:
+        print(f"find_suggestions capabilities unavailable, using single calls: {e}")
+    _batch_capability.update(max_batch_size=size, checked_at=time.monotonic())
+    return size
+
+
+async def _afetch_remote_batch(designations: List[str]) -> Dict[int, List[Dict]]:
+    """
+    One batch request. Items carry their position as id and answers are mapped
+    back by id, so a partial or reordered response is still attributed correctly.
+    """
+    payload = {
+        "items": [{"id": i, "designation": d} for i, d in enumerate(designations)]
+    }
+    body = await _apost(DB_BATCH_URL, payload)
+    results = body.get("results", []) if isinstance(body, dict) else []
+    by_id = {}
+    for item in results:
+        if isinstance(item, dict) and isinstance(item.get("id"), int) and 0 <= item["id"] < len(designations):
+            by_id[item["id"]] = _normalize_suggestions(item)
+    _record("batch_requests")
+    _record("batch_items", len(by_id))
+    return by_id
+
+
+async def _aguarded_fetch_batch(designations: List[str]) -> Dict[int, List[Dict]]:
+    """Batch request through the circuit breaker."""
+    permit = _breaker.allow_request()
+    if not permit:
+        raise CircuitOpenError("find_suggestions circuit is open", api_name="find_suggestions")
+    start = time.perf_counter()
+    try:
+        by_id = await _afetch_remote_batch(designations)
+    except Exception:
+        _breaker.record_failure(permit)
+        raise
+    except BaseException:
+        # Cancelled (client gone, hedge lost...): no verdict, but never keep the probe slot
+        _breaker.release(permit)
+        raise
+    # A batch is slow by design: judge it on its per-item latency. It stays out
+    # of the latency window used for hedging single calls.
+    _breaker.record_success((time.perf_counter() - start) * 1000 / max(len(designations), 1), permit)
+    return by_id
+
+
+async def _afetch_batched(designations: List[str], batch_size: int) -> List[Optional[List[Dict]]]:
+    """Chunks sent concurrently; None for every item a chunk did not answer."""
+    chunks = [designations[i:i + batch_size] for i in range(0, len(designations), batch_size)]
+    answers = await asyncio.gather(*(_aguarded_fetch_batch(c) for c in chunks), return_exceptions=True)
+
+    results: List[Optional[List[Dict]]] = []
+    for chunk, answer in zip(chunks, answers):
+        if isinstance(answer, BaseException):
+            if isinstance(answer, aiohttp.ClientResponseError) and answer.status in (404, 405):
+                # Batch endpoint gone: ask the capabilities again next time
+                _batch_capability["checked_at"] = None
+            elif not isinstance(answer, CircuitOpenError):
+                _record("errors_total")
+                print(f"API Error (find_suggestions batch): {answer}")
+            answer = {}
+        results.extend(answer.get(i) for i in range(len(chunk)))
+    return results
+
+
+async def _aremote_suggestions_many(designations: List[str]) -> List[List[Dict]]:
+    """
+    Remote suggestions for many designations, in input order.
+    Entries sharing a normalized key are looked up once, cached keys are served
+    from the cache, the rest go out in batch requests when the server supports
+    them. Whatever a batch did not answer falls back to single calls, at most
+    DB_BATCH_FALLBACK_CONCURRENCY at a time.
+    """
+    positions: Dict[str, List[int]] = {}
+    for i, designation in enumerate(designations):
+        positions.setdefault(_cache_key(designation), []).append(i)
+
+    results: List[List[Dict]] = [[] for _ in designations]
+    pending_keys = []
+    for key, indices in positions.items():
+        if _suggestion_cache is not None:
+            state, value = _suggestion_cache.lookup(key)
+            if state in (FRESH, STALE):
+                if state == STALE:
+                    designation = designations[indices[0]]
+                    _suggestion_cache.refresh_in_background(key, lambda d=designation: _guarded_fetch(d))
+                for i in indices:
+                    results[i] = value
+                continue
+        pending_keys.append(key)
+    pending = [designations[positions[key][0]] for key in pending_keys]
+
+    batch_size = await _abatch_size() if pending else 0
+    fetched = await _afetch_batched(pending, batch_size) if batch_size else [None] * len(pending)
+    for key, suggestions in zip(pending_keys, fetched):
+        if suggestions is not None and _suggestion_cache is not None:
+            _suggestion_cache.set(key, suggestions)
+
+    missing = [j for j, suggestions in enumerate(fetched) if suggestions is None]
+    if missing:
+        _record("batch_fallback_singles", len(missing))
+        semaphore = asyncio.Semaphore(DB_BATCH_FALLBACK_CONCURRENCY)
+
+        async def single(designation: str) -> List[Dict]:
+            async with semaphore:
+                return await aget_remote_suggestions(designation)
+
+        singles = await asyncio.gather(*(single(pending[j]) for j in missing))
+        for j, suggestions in zip(missing, singles):
+            fetched[j] = suggestions
+
+    for key, suggestions in zip(pending_keys, fetched):
+        for i in positions[key]:
+            results[i] = suggestions
+    return results
+
+
+async def aget_database_suggestions_many(designations: List[str]) -> List[List[Dict]]:
+    """
+    Database stage lookups for many designations; results keep the input order.
+    The fuzzy fast path is scored for the whole batch at once and only the
+    misses go to the backend, batched (see _aremote_suggestions_many).
+    """
+    results = _fuzzy_fast_path(designations)
+    misses = [i for i, hit in enumerate(results) if not hit]
+    if not misses:
+        return results
+    miss_designations = [designations[i] for i in misses]
+
+    if DB_BACKEND == "local":
+        fetched = _get_local_suggestions_many(miss_designations)
+    elif DB_BACKEND == "local_then_remote":
+        fetched = _get_local_suggestions_many(miss_designations)
+        unsure = [j for j, local in enumerate(fetched) if not _local_is_enough(local)]
+        unsure_designations = [miss_designations[j] for j in unsure]
+        remote = _rerank(unsure_designations, await _aremote_suggestions_many(unsure_designations))
+        for j, suggestions in zip(unsure, remote):
+            fetched[j] = suggestions or fetched[j]
+    else:
+        fetched = _rerank(miss_designations, await _aremote_suggestions_many(miss_designations))
+
+    for i, suggestions in zip(misses, fetched):
+        results[i] = suggestions
+    return results
@@ -0,0 +1,120 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from utils.config_validator import LLM_DECISION_CACHE_PATH, LLM_DECISION_CACHE_MAX_ENTRIES
+
+
+def prompt_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def decision_key(model_name: str, system_prompt: str, user_content: str) -> str:
+    """
+    Cache key of one arbitration: the model, the system prompt (hashed) and the
+    user content (description, top suggestions, T5 guess) with only case and
+    whitespace folded. Changing the prompt or the model therefore never serves
+    an old decision. The content is not run through normalize_designation: it
+    drops articles and rewrites units, which would merge different prompts.
+    """
+    content = " ".join(user_content.split()).casefold()
+    material = "\x1f".join((model_name, prompt_hash(system_prompt), content))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMDecisionCache:
+    """
+    Persistent cache of LLM arbitration decisions.
+
+    Arbitration runs at temperature 0, so the same inputs give the same label:
+    decisions are stored in SQLite (WAL mode, survives restarts) by
+    `decision_key`. The table is bounded to `max_entries`; beyond it the least
+    recently used tenth is evicted in one statement.
+    """
+
+    def __init__(self,
+                 db_path: str = LLM_DECISION_CACHE_PATH,
+                 max_entries: int = LLM_DECISION_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_decisions (
+                key TEXT PRIMARY KEY,
+                label TEXT NOT NULL,
+                model TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_decisions_used ON llm_decisions(last_used_at)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_decisions").fetchone()[0]
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+        print(f"✅ LLM decision cache ready: {self._size} entries ({db_path})")
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached label for the key (and mark it recently used), None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT label FROM llm_decisions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_decisions SET last_used_at = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self._counters["hits"] += 1
+            return row[0]
+
+    def set(self, key: str, label: str, model: str) -> None:
+        if not label:
+            return
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO llm_decisions (key, label, model, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, label, model, now, now),
+            )
+            if cursor.rowcount:
+                self._size += 1
+            else:
+                self._conn.execute(
+                    "UPDATE llm_decisions SET label = ?, last_used_at = ? WHERE key = ?",
+                    (label, now, key),
+                )
+            self._counters["stores"] += 1
+            if self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop the least recently used tenth (caller holds the lock)."""
+        target = max(int(self.max_entries * 0.9), 0)
+        cursor = self._conn.execute(
+            "DELETE FROM llm_decisions WHERE key IN ("
+            "SELECT key FROM llm_decisions ORDER BY last_used_at LIMIT ?)",
+            (self._size - target,),
+        )
+        self._counters["evicted"] += max(cursor.rowcount, 0)
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_decisions").fetchone()[0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                **self._counters,
+            }
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,88 @@
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Optional
+import pandas as pd
+from utils.config_validator import EXACT_MATCH_DATA_PATH, EXACT_MATCH_MIN_AGREEMENT, CATALOG_TABLE_DIR
+from utils.text_normalization import normalize_designation
+from services.catalog_table import add_label_votes, add_votes, agreed_labels
+from services.snapshot_service import current_snapshot_dir
+
+
+class ExactMatchIndex:
+    """
+    Normalized designation -> nature_product hash map built from the labeled dataset.
+
+    Keys whose descriptions were labeled inconsistently (majority label below
+    EXACT_MATCH_MIN_AGREEMENT) are left out, so a hit is always unambiguous.
+    `reload()` rebuilds the map and swaps it in one assignment: readers see
+    either the old or the new map, never a partial one.
+
+    With CATALOG_TABLE_DIR set, or a current snapshot, the memory-mapped
+    catalog tables are used instead of a Python dict (shared by all workers,
+    nothing materialized).
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, data_path: str = EXACT_MATCH_DATA_PATH, catalog_dir: str = CATALOG_TABLE_DIR):
+        self.data_path = data_path
+        self.catalog_dir = catalog_dir
+        self._reload_lock = threading.Lock()
+        self._map: Dict[str, str] = {}
+        self._catalog = None
+        self.reload()
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _build(self) -> Dict[str, str]:
+        df = pd.read_csv(self.data_path, usecols=["description_cleaned", "nature_product"]).dropna()
+
+        votes = defaultdict(Counter)
+        add_votes(votes, df["description_cleaned"], df["nature_product"])
+        add_label_votes(votes, df["nature_product"].unique())
+        mapping = dict(agreed_labels(votes))
+        return mapping
+
+    def reload(self) -> int:
+        """Rebuild the map from the dataset and swap it in. Returns the number of keys."""
+        with self._reload_lock:
+            snapshot_dir = current_snapshot_dir("exact")
+            catalog_dir = os.path.join(snapshot_dir, "exact") if snapshot_dir else self.catalog_dir
+            if catalog_dir:
+                from services.catalog_table import CatalogTables
+                try:
+                    # Old tables are left to the GC: running lookups may still use them
+                    self._catalog = CatalogTables(catalog_dir)
+                except Exception as e:
+                    print(f"⚠️ Catalog tables not (re)loaded: {e}")
+                    return len(self)
+                print(f"✅ Exact-match catalog mapped: {len(self)} keys")
+                return len(self)
+            try:
+                mapping = self._build()
+            except Exception as e:
+                print(f"⚠️ Exact-match index not (re)loaded: {e}")
+                return len(self._map)
+            self._map = mapping
+        print(f"✅ Exact-match index loaded: {len(mapping)} keys")
+        return len(mapping)
+
+    def lookup(self, designation: str) -> Optional[str]:
+        """Label for the designation, or None (O(1) dict / O(log n) catalog)."""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog.lookup_label(designation)
+        return self._map.get(normalize_designation(designation))
+
+    def __len__(self) -> int:
+        catalog = self._catalog
+        return len(catalog.keys) if catalog is not None else len(self._map)
@@ -0,0 +1,250 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+from typing import List, Dict, Optional, Tuple
+from services.snapshot_service import current_snapshot_dir
+from utils.config_validator import (
+    ENABLE_LABEL_WRITEBACK,
+    FUZZY_DATA_PATH,
+    FUZZY_FAST_PATH_CUTOFF,
+    FUZZY_RERANK_WEIGHT,
+)
+from utils.text_normalization import normalize_designation, normalize_many
+
+
+class FuzzyLabelMatcher:
+    """
+    RapidFuzz matching against the known catalog.
+
+    - Fast path: a designation (almost) identical to a labeled description or
+      to a nature_product label is answered locally, before any remote call.
+    - Reranking: suggestions are reordered by a blend of their similarity_score
+      and the token-set ratio between the designation and the label.
+    Batch variants go through cdist/cpdist so the scoring runs in native code.
+    Learned labels live in separate append-only lists, scored alongside the
+    catalog arrays, so adding one never copies the catalog. With a snapshot,
+    the catalog is read from its documents tables instead of the CSV.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, data_path: str = FUZZY_DATA_PATH, snapshot_dir: Optional[str] = None):
+        if snapshot_dir:
+            self._load_snapshot(snapshot_dir)
+        else:
+            self._load_csv(data_path)
+        # Learned strings: appended only; processed last, so its length bounds valid indexes
+        self.learned_choices: List[str] = []
+        self.learned_labels: List[str] = []
+        self.learned_processed: List[str] = []
+        self._add_lock = threading.Lock()
+        self._learned_callback = None
+        if ENABLE_LABEL_WRITEBACK:
+            self._attach_learned_labels()
+        print(f"✅ Fuzzy matcher ready: {len(self.choices)} known strings")
+
+    def _load_csv(self, data_path: str) -> None:
+        df = pd.read_csv(data_path, usecols=["description_cleaned", "nature_product"]).dropna()
+
+        # Every known string maps to its label; labels map to themselves
+        choice_to_label = dict(zip(df["description_cleaned"], df["nature_product"]))
+        for label in df["nature_product"].unique():
+            choice_to_label.setdefault(label, label)
+
+        self.choices = list(choice_to_label.keys())
+        self.labels = list(choice_to_label.values())
+        # Preprocess once instead of on every query
+        self.processed_choices = normalize_many(self.choices)
+
+    def _load_snapshot(self, snapshot_dir: str) -> None:
+        """
+        Choices and labels read through the snapshot's documents tables (labels
+        are documents of their own there); only the processed strings are held.
+        """
+        from services.catalog_table import LabeledColumn, StringTable
+
+        labels_table = StringTable(os.path.join(snapshot_dir, "documents"), "labels")
+        descriptions_table = StringTable(os.path.join(snapshot_dir, "documents"), "descriptions")
+        self.choices = descriptions_table
+        self.labels = LabeledColumn(labels_table, descriptions_table.values)
+        self.processed_choices = normalize_many(list(descriptions_table))
+        print(f"📦 Fuzzy matcher choices read from snapshot {snapshot_dir}")
+
+    def _attach_learned_labels(self) -> None:
+        """Match stored LLM decisions and follow new ones."""
+        from services.label_store import LearnedLabelStore
+
+        try:
+            store = LearnedLabelStore.get_instance()
+        except Exception as e:
+            print(f"⚠️ Learned labels unavailable for the fuzzy matcher: {e}")
+            return
+        self.add_many([
+            (entry["designation"], entry["label"]) for entry in store.entries() if store.is_servable(entry)
+        ])
+        self._learned_callback = (
+            lambda e: self.add(e["designation"], e["label"]) if store.is_servable(e) else None
+        )
+        store.subscribe(self._learned_callback)
+
+    def close(self) -> None:
+        """Stop following learned labels (the matcher is being replaced)."""
+        if self._learned_callback is not None:
+            from services.label_store import LearnedLabelStore
+            LearnedLabelStore.get_instance().unsubscribe(self._learned_callback)
+            self._learned_callback = None
+
+    def add_many(self, pairs: List[Tuple[str, str]]) -> None:
+        """Add learned (designation, label) pairs in one extension of the learned lists."""
+        if not pairs:
+            return
+        designations = [designation for designation, _ in pairs]
+        processed = normalize_many(designations)
+        with self._add_lock:
+            self.learned_choices.extend(designations)
+            self.learned_labels.extend(label for _, label in pairs)
+            self.learned_processed.extend(processed)
+
+    def add(self, designation: str, label: str) -> None:
+        """Add one learned string (O(1); the catalog arrays are untouched)."""
+        self.add_many([(designation, label)])
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(snapshot_dir=current_snapshot_dir("documents"))
+        return cls._instance
+
+    @staticmethod
+    def _as_suggestion(label: str, choice: str, score: float) -> List[Dict]:
+        return [{
+            "nature_product": label,
+            "similarity_score": round(score / 100, 4),
+            "matched_description": choice,
+            "source": "fuzzy",
+        }]
+
+    def _learned(self) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Learned choices, labels and processed strings, without copying: the
+        processed list is extended last, so any index it yields is valid in
+        the other two.
+        """
+        return self.learned_choices, self.learned_labels, self.learned_processed
+
+    def match(self, designation: str) -> List[Dict]:
+        """Fast-path suggestion for one designation, or [] below the cutoff."""
+        query = normalize_designation(designation)
+        best: Optional[Tuple[float, str, str]] = None
+        learned_choices, learned_labels, learned_processed = self._learned()
+        for choices, labels, processed in (
+            (self.choices, self.labels, self.processed_choices),
+            (learned_choices, learned_labels, learned_processed),
+        ):
+            if not processed:
+                continue
+            hit = process.extractOne(
+                query,
+                processed,
+                scorer=fuzz.ratio,
+                processor=None,
+                score_cutoff=FUZZY_FAST_PATH_CUTOFF,
+            )
+            # Ties go to the catalog, scored first
+            if hit is not None and (best is None or hit[1] > best[0]):
+                best = (hit[1], labels[hit[2]], choices[hit[2]])
+        if best is None:
+            return []
+        score, label, choice = best
+        return self._as_suggestion(label, choice, score)
+
+    def match_many(self, designations: List[str], chunk_size: int = 256) -> List[List[Dict]]:
+        """Fast-path suggestions for a batch, scored with cdist (chunked to bound memory)."""
+        learned_choices, learned_labels, learned_processed = self._learned()
+        # cdist over an empty source gives (n, 0) scores, which argmax rejects
+        sources = [
+            source for source in (
+                (self.choices, self.labels, self.processed_choices),
+                (learned_choices, learned_labels, learned_processed),
+            ) if source[2]
+        ]
+        if not sources:
+            return [[] for _ in designations]
+        results = []
+        for start in range(0, len(designations), chunk_size):
+            queries = normalize_many(designations[start:start + chunk_size])
+            # Best (score, label, choice) per query over the catalog, then the learned strings
+            best: List[Optional[Tuple[float, str, str]]] = [None] * len(queries)
+            for choices, labels, processed in sources:
+                scores = process.cdist(
+                    queries,
+                    processed,
+                    scorer=fuzz.ratio,
+                    processor=None,
+                    score_cutoff=FUZZY_FAST_PATH_CUTOFF,
+                    dtype=np.uint8,
+                    workers=-1,
+                )
+                for row, idx in enumerate(scores.argmax(axis=1)):
+                    score = float(scores[row, idx])
+                    if score and (best[row] is None or score > best[row][0]):
+                        best[row] = (score, labels[idx], choices[idx])
+            results.extend(
+                self._as_suggestion(hit[1], hit[2], hit[0]) if hit else []
+                for hit in best
+            )
+        return results
+
+    @staticmethod
+    def rerank_many(designations: List[str], suggestions_list: List[List[Dict]]) -> List[List[Dict]]:
+        """
+        Reorder each suggestion list by
+        (1 - w) * similarity_score + w * token_set_ratio / 100.
+        All (designation, label) pairs are scored with a single cpdist call.
+        """
+        queries, labels = [], []
+        for designation, suggestions in zip(designations, suggestions_list):
+            for s in suggestions:
+                queries.append(designation)
+                labels.append(s.get("nature_product", ""))
+        if not queries:
+            return suggestions_list
+
+        ratios = process.cpdist(
+            queries,
+            labels,
+            scorer=fuzz.token_set_ratio,
+            processor=normalize_designation,
+            workers=-1,
+        )
+
+        reranked = []
+        position = 0
+        for suggestions in suggestions_list:
+            items = []
+            for s in suggestions:
+                ratio = float(ratios[position]) / 100
+                position += 1
+                items.append({
+                    **s,
+                    "token_set_ratio": round(ratio, 4),
+                    "rerank_score": round(
+                        (1 - FUZZY_RERANK_WEIGHT) * s.get("similarity_score", 0.0)
+                        + FUZZY_RERANK_WEIGHT * ratio,
+                        4,
+                    ),
+                })
+            items.sort(key=lambda x: x["rerank_score"], reverse=True)
+            reranked.append(items)
+        return reranked
+
+    @classmethod
+    def rerank(cls, designation: str, suggestions: List[Dict]) -> List[Dict]:
+        """Reorder the suggestions of one designation."""
+        return cls.rerank_many([designation], [suggestions])[0]
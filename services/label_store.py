@@ -0,0 +1,160 @@
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from utils.text_normalization import normalize_designation
+from utils.config_validator import LEARNED_LABELS_DB_PATH, LEARNED_LABELS_SERVE_UNREVIEWED
+
+
+class LearnedLabelStore:
+    """
+    Persistent store of labels decided by the LLM arbitrator.
+
+    Each accepted decision is appended to a SQLite table (WAL mode, committed
+    on write, so it survives restarts) and kept in memory by normalized
+    designation. Local lookup layers subscribe to new entries and index them
+    incrementally instead of being rebuilt.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, db_path: str = LEARNED_LABELS_DB_PATH):
+        self.db_path = db_path
+        self._write_lock = threading.Lock()
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS learned_labels (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                designation TEXT NOT NULL,
+                label TEXT NOT NULL,
+                confidence REAL,
+                needs_review INTEGER NOT NULL DEFAULT 0,
+                source TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_learned_labels_key ON learned_labels(key)")
+        self._conn.commit()
+
+        # Latest decision per key wins
+        self._entries: Dict[str, Dict] = {}
+        rows = self._conn.execute(
+            "SELECT key, designation, label, confidence, needs_review, source, created_at "
+            "FROM learned_labels ORDER BY id"
+        )
+        for row in rows:
+            entry = self._row_to_entry(row)
+            # Re-key on load so rows written under an older normalization still match
+            entry["key"] = normalize_designation(entry["designation"])
+            self._entries[entry["key"]] = entry
+        print(f"✅ Learned label store ready: {len(self._entries)} entries ({db_path})")
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def _row_to_entry(row) -> Dict:
+        key, designation, label, confidence, needs_review, source, created_at = row
+        return {
+            "key": key,
+            "designation": designation,
+            "label": label,
+            "confidence": confidence,
+            "needs_review": bool(needs_review),
+            "source": source,
+            "created_at": created_at,
+        }
+
+    def add(self,
+            designation: str,
+            label: str,
+            confidence: Optional[float] = None,
+            needs_review: bool = False,
+            source: str = "llm") -> Optional[Dict]:
+        """Persist a decision and notify subscribers. Returns the entry, or None if skipped."""
+        key = normalize_designation(designation)
+        if not key or not label:
+            return None
+        existing = self._entries.get(key)
+        if existing and existing["label"] == label and existing["needs_review"] == needs_review:
+            return existing
+
+        entry = {
+            "key": key,
+            "designation": designation,
+            "label": label,
+            "confidence": confidence,
+            "needs_review": needs_review,
+            "source": source,
+            "created_at": time.time(),
+        }
+        with self._write_lock:
+            self._conn.execute(
+                "INSERT INTO learned_labels (key, designation, label, confidence, needs_review, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, designation, label, confidence, int(needs_review), source, entry["created_at"]),
+            )
+            self._conn.commit()
+            self._entries[key] = entry
+
+        for callback in list(self._subscribers):
+            try:
+                callback(entry)
+            except Exception as e:
+                print(f"Learned label subscriber failed: {e}")
+        return entry
+
+    @staticmethod
+    def is_servable(entry: Dict) -> bool:
+        """Whether an entry may answer requests (unreviewed ones only if allowed)."""
+        return not entry["needs_review"] or LEARNED_LABELS_SERVE_UNREVIEWED
+
+    def lookup(self, designation: str) -> Optional[Dict]:
+        """Learned entry for the designation, if it may be served."""
+        entry = self._entries.get(normalize_designation(designation))
+        if entry is None or not self.is_servable(entry):
+            return None
+        return entry
+
+    def entries(self) -> List[Dict]:
+        """Current entry of every learned key."""
+        return list(self._entries.values())
+
+    def pending(self) -> List[Dict]:
+        """Entries waiting for review, oldest first."""
+        return sorted((e for e in self._entries.values() if e["needs_review"]), key=lambda e: e["created_at"])
+
+    def approve(self, designation: str, label: Optional[str] = None) -> Optional[Dict]:
+        """
+        Mark the entry of a designation as reviewed, optionally correcting its
+        label. Subscribers are notified, so the lookup layers start serving it.
+        Returns the new entry, or None when the designation is unknown.
+        """
+        entry = self._entries.get(normalize_designation(designation))
+        if entry is None:
+            return None
+        return self.add(entry["designation"], label or entry["label"],
+                        confidence=1.0, needs_review=False, source="review")
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> None:
+        """Call `callback(entry)` for every entry added from now on."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict], None]) -> None:
+        """Stop calling `callback` (no-op if it is not subscribed)."""
+        if callback in self._subscribers:
+            self._subscribers = [c for c in self._subscribers if c is not callback]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,15 +2,73 @@ from langchain_groq import ChatGroq
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import SystemMessage, HumanMessage
 from typing import Optional, Dict, List, Tuple
+import json
 import logging
+import threading
+import time
 import config as _cfg
+from utils.config_validator import (
+    ORCHESTRATOR_INIT_RETRY_SECONDS,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_RATE_LIMIT_BURST,
+    LLM_RATE_LIMIT_MAX_RETRIES,
+    LLM_CHARS_PER_TOKEN,
+    LLM_COMPLETION_TOKENS_ESTIMATE,
+    LLM_STREAMING,
+    LLM_MAX_TOKENS,
+    LLM_REASONING_EFFORT,
+    LLM_PACKED_MAX_TOKENS_PER_ITEM,
+    LLM_PACK_SIZE,
+    LLM_DECISION_CACHE_ENABLED,
+    ENABLE_DYNAMIC_PROMPT,
+    LLM_BACKEND,
+)
+from utils.exceptions import ServiceInitializationError
+from utils.rate_limiter import RateLimiter
+from services.decision_cache import LLMDecisionCache, decision_key
+from services.simulated_llm import SimulatedChatModel
+from services.cost_governor import CostBudgetGovernor
+from services.llm_streaming import StreamCollector, StreamingStats, label_line, packed_object
+from services.prompt_builder import PromptBuilder, PromptTokenAccountant, estimate_tokens
+
+# One limiter per process: every arbitration (sync or async) shares the provider quota
+_rate_limiter = RateLimiter(
+    "groq",
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    burst_fraction=LLM_RATE_LIMIT_BURST,
+)
+
+# Category-sliced system prompts and the prompt size of every call
+_prompt_builder = PromptBuilder()
+_prompt_accountant = PromptTokenAccountant(estimate_tokens(_prompt_builder.full_prompt()))
+
+# Time to first token / generation time of the streamed calls
+_streaming_stats = StreamingStats()
+
+
+def system_prompt(queries: List[str], packed: bool = False) -> str:
+    """Arbitration system prompt for these items (full prompt when ENABLE_DYNAMIC_PROMPT is off)."""
+    if ENABLE_DYNAMIC_PROMPT:
+        return _prompt_builder.build(queries, packed=packed)
+    return _prompt_builder.full_prompt(packed=packed)
 
 
 class OrchestratorService:
     """
     Simplified LLM service focused on orchestrating product classification.
+
+    Use `get_instance()`: the Groq client (and its HTTP connection pool) and
+    the search tool are created once per process and reused by every call.
     """
     
+    _instance = None
+    _lock = threading.Lock()
+    # Last initialization failure, re-raised without retrying until the cooldown ends
+    _init_error: Optional[ServiceInitializationError] = None
+    _init_failed_at = 0.0
+    
     def __init__(self, enable_prompt_logging: Optional[bool] = None):
         """Initialize the orchestrator service."""
         self.service_name = "llm_orchestrator"
@@ -28,6 +86,32 @@ class OrchestratorService:
         # Initialize components
         self._initialize()
     
+    @classmethod
+    def get_instance(cls):
+        """
+        Double-checked locking pattern pour thread-safety.
+        A failed initialization is logged once and the same error is raised to
+        later callers until ORCHESTRATOR_INIT_RETRY_SECONDS have passed.
+        """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    if cls._init_error is not None and (
+                        time.monotonic() - cls._init_failed_at < ORCHESTRATOR_INIT_RETRY_SECONDS
+                    ):
+                        raise cls._init_error
+                    try:
+                        cls._instance = cls()
+                    except Exception as e:
+                        cls._init_error = ServiceInitializationError(
+                            message=f"LLM orchestrator unavailable: {e}",
+                            service_name="llm_orchestrator",
+                        )
+                        cls._init_failed_at = time.monotonic()
+                        raise cls._init_error from e
+                    cls._init_error = None
+        return cls._instance
+    
     def _setup_logger(self) -> logging.Logger:
         """Setup logger for this service"""
         logger = logging.getLogger(f'{self.service_name}_service')
@@ -48,17 +132,29 @@ class OrchestratorService:
         try:
             self.logger.info("Starting up LLM service")
             
-            # check if we have the groq key
-            if not _cfg.GROQ_API_KEY:
-                raise RuntimeError("Need GROQ_API_KEY for this to work")
+            if LLM_BACKEND == "simulated":
+                # Offline stand-in; its own model name keeps its answers apart in the decision cache
+                self.model_name = "simulated"
+                self.llm = SimulatedChatModel(model_name=self.model_name)
+                self.call_params = {}
+                self.logger.warning("Using the simulated LLM backend (no provider calls)")
             
-            # setup groq client
-            self.llm = ChatGroq(
-                model=self.model_name,
-                temperature=0,
-                api_key=_cfg.GROQ_API_KEY
-            )
-            self.logger.info(f"Groq LLM ready with: {self.model_name}")
+            else:
+                # check if we have the groq key
+                if not _cfg.GROQ_API_KEY:
+                    raise RuntimeError("Need GROQ_API_KEY for this to work")
+                
+                # setup groq client
+                self.llm = ChatGroq(
+                    model=self.model_name,
+                    temperature=0,
+                    api_key=_cfg.GROQ_API_KEY,
+                    # 429s are retried by the shared rate limiter, not per call
+                    max_retries=0
+                )
+                # Per call: short reasoning traces leave the token cap to the answer
+                self.call_params = {"reasoning_effort": LLM_REASONING_EFFORT} if LLM_REASONING_EFFORT else {}
+                self.logger.info(f"Groq LLM ready with: {self.model_name}")
             
             # setup web search if we have the key
             if _cfg.TAVILY_API_KEY:
@@ -68,6 +164,14 @@ class OrchestratorService:
                 self.search_tool = None
                 self.logger.warning("No TAVILY_API_KEY - web search disabled")
             
+            # Decisions already paid for (SQLite, survives restarts)
+            self.decision_cache = None
+            if LLM_DECISION_CACHE_ENABLED:
+                try:
+                    self.decision_cache = LLMDecisionCache()
+                except Exception as e:
+                    self.logger.warning(f"LLM decision cache disabled: {e}")
+            
             self.logger.info("LLM service initialization done")
             
         except Exception as e:
@@ -104,170 +208,440 @@ class OrchestratorService:
             "total_cost_usd": round(total_cost, 6)
         }
     
+    @staticmethod
+    def _user_content(description: str,
+                      t5_suggestion: str,
+                      t5_confidence: float,
+                      api_suggestions: List[Dict],
+                      web_context: Optional[str] = None) -> str:
+        """Description, top-3 suggestions, T5 guess and web context (if any) of one item."""
+        # Format suggestions
+        top_suggestions = api_suggestions[:3] if api_suggestions else []
+        suggestions_text = ""
+        if top_suggestions:
+            suggestions_text = " | ".join([
+                f"{s.get('nature_product', '')} ({s.get('similarity_score', 0):.2f})" 
+                for s in top_suggestions
+            ])
+        
+        content = f"Description: {description}\nSuggestions: {suggestions_text}\nT5: {t5_suggestion} ({(t5_confidence or 0.0):.2f})"
+        if web_context:
+            content += f"\nWeb: {web_context}"
+        return content
+    
+    @staticmethod
+    def _prompt_query(description: str, t5_suggestion: str, api_suggestions: List[Dict]) -> str:
+        """Text the prompt sections and examples are selected on."""
+        candidates = [s.get("nature_product") or "" for s in (api_suggestions or [])[:3]]
+        return " ".join([description or "", t5_suggestion or "", *candidates])
+    
+    def _build_messages(self,
+                        description: str,
+                        t5_suggestion: str,
+                        t5_confidence: float,
+                        api_suggestions: List[Dict],
+                        web_context: Optional[str] = None) -> list:
+        """System prompt (sliced for this item) + user content of one arbitration."""
+        return [
+            SystemMessage(content=system_prompt([self._prompt_query(description, t5_suggestion, api_suggestions)])),
+            HumanMessage(content=self._user_content(
+                description, t5_suggestion, t5_confidence, api_suggestions, web_context
+            ))
+        ]
+    
+    @staticmethod
+    def estimate_tokens(messages: list, completion_tokens: int = LLM_COMPLETION_TOKENS_ESTIMATE) -> int:
+        """Prompt tokens (~LLM_CHARS_PER_TOKEN characters each) plus the expected completion."""
+        chars = sum(len(m.content) for m in messages)
+        return int(chars / LLM_CHARS_PER_TOKEN) + completion_tokens
+    
+    @staticmethod
+    def _rate_limit_delay(error: Exception) -> Optional[float]:
+        """Seconds to wait before retrying a 429, None if error is not a rate limit."""
+        response = getattr(error, "response", None)
+        status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+        if status != 429:
+            return None
+        headers = getattr(response, "headers", None)
+        delay = _rate_limiter.observe_headers(headers) if headers is not None else None
+        if delay is None:
+            # No retry-after: wait for one token-bucket refill step
+            delay = 60.0 / max(LLM_REQUESTS_PER_MINUTE, 1)
+            _rate_limiter.pause(delay)
+        return delay
+    
+    def _call(self, messages: list, max_tokens: int, complete):
+        """
+        One provider call, streamed and closed as soon as `complete` finds the
+        answer in the text received (plain invoke when LLM_STREAMING is off).
+        """
+        if not LLM_STREAMING:
+            return self.llm.invoke(messages, max_tokens=max_tokens, **self.call_params)
+        collector = StreamCollector(complete)
+        stream = self.llm.stream(messages, max_tokens=max_tokens, **self.call_params)
+        try:
+            for chunk in stream:
+                if collector.feed(chunk):
+                    break
+        finally:
+            # Closes the HTTP response: the rest of the completion is not read
+            stream.close()
+        response = collector.response(messages, self.model_name)
+        _streaming_stats.record(response)
+        return response
+    
+    async def _acall(self, messages: list, max_tokens: int, complete):
+        """Async _call."""
+        if not LLM_STREAMING:
+            return await self.llm.ainvoke(messages, max_tokens=max_tokens, **self.call_params)
+        collector = StreamCollector(complete)
+        stream = self.llm.astream(messages, max_tokens=max_tokens, **self.call_params)
+        try:
+            async for chunk in stream:
+                if collector.feed(chunk):
+                    break
+        finally:
+            await stream.aclose()
+        response = collector.response(messages, self.model_name)
+        _streaming_stats.record(response)
+        return response
+    
+    def _invoke(self, messages: list, estimated_tokens: int,
+                max_tokens: int = LLM_MAX_TOKENS, complete=label_line):
+        """LLM call through the shared rate limiter, retrying 429s (blocking)."""
+        for attempt in range(LLM_RATE_LIMIT_MAX_RETRIES + 1):
+            _rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self._call(messages, max_tokens, complete)
+            except Exception as e:
+                _rate_limiter.settle(estimated_tokens, 0)
+                delay = self._rate_limit_delay(e)
+                if delay is None or attempt == LLM_RATE_LIMIT_MAX_RETRIES:
+                    raise
+                self.logger.warning(f"Rate limited, retrying after {delay:.1f}s")
+                continue
+            return self._settle(response, estimated_tokens, messages)
+    
+    async def _ainvoke(self, messages: list, estimated_tokens: int,
+                       max_tokens: int = LLM_MAX_TOKENS, complete=label_line):
+        """Async _invoke: queued calls sleep on the event loop, not in a thread."""
+        for attempt in range(LLM_RATE_LIMIT_MAX_RETRIES + 1):
+            await _rate_limiter.aacquire(estimated_tokens)
+            try:
+                response = await self._acall(messages, max_tokens, complete)
+            except Exception as e:
+                _rate_limiter.settle(estimated_tokens, 0)
+                delay = self._rate_limit_delay(e)
+                if delay is None or attempt == LLM_RATE_LIMIT_MAX_RETRIES:
+                    raise
+                self.logger.warning(f"Rate limited, retrying after {delay:.1f}s")
+                continue
+            return self._settle(response, estimated_tokens, messages)
+    
+    def _settle(self, response, estimated_tokens: int, messages: list):
+        """
+        Correct the token reservation with the real usage and headers, record
+        the prompt size and charge the call to the spend budgets.
+        """
+        usage = response.response_metadata.get("token_usage", {})
+        _prompt_accountant.record(messages[0].content, messages[1].content, usage)
+        _rate_limiter.settle(estimated_tokens, usage.get("total_tokens")
+                             or usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+        _rate_limiter.observe_headers(response.response_metadata.get("headers"))
+        CostBudgetGovernor.get_instance().record(self.calculate_cost(
+            usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        )["total_cost_usd"])
+        return response
+    
+    def _finish(self, response, description: str) -> Tuple[str, dict]:
+        """
+        Compute the cost and clean the label. A completion stopped by the token
+        cap before any answer (the reasoning used it all) raises, so the caller
+        falls back instead of returning "Produit non identifie".
+        """
+        usage = response.response_metadata.get("token_usage", {})
+        cost = self.calculate_cost(
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0)
+        )
+        if usage.get("estimated"):
+            # Stream closed early: no provider usage, the cost is estimated from the text
+            cost["estimated"] = True
+        
+        # The label is the first line; anything the model adds after it is dropped
+        final_response = label_line(response.content + "\n") or ""
+        if not final_response and response.response_metadata.get("finish_reason") == "length":
+            raise RuntimeError(f"Token cap ({LLM_MAX_TOKENS}) reached before any answer for: {description}")
+        if not final_response:
+            final_response = "Produit non identifie"
+            self.logger.warning(f"Empty response from LLM for: {description}")
+        
+        self.logger.info(f"Arbitration completed: {final_response}")
+        return final_response, cost
+    
+    def _cache_key(self, messages: list) -> str:
+        return decision_key(self.model_name, messages[0].content, messages[1].content)
+    
+    def _cached_decision(self, messages: list) -> Optional[Tuple[str, dict]]:
+        """Cached label of this exact arbitration, at zero cost."""
+        if self.decision_cache is None:
+            return None
+        label = self.decision_cache.get(self._cache_key(messages))
+        if label is None:
+            return None
+        self.logger.info(f"Arbitration served from cache: {label}")
+        return label, {**self.calculate_cost(0, 0), "cached": True}
+    
+    def cached_decision(self,
+                        description: str,
+                        t5_suggestion: str,
+                        t5_confidence: float,
+                        api_suggestions: List[Dict],
+                        web_context: Optional[str] = None) -> Optional[Tuple[str, dict]]:
+        """Cached label of this arbitration (no LLM call, so no budget needed), else None."""
+        return self._cached_decision(
+            self._build_messages(description, t5_suggestion, t5_confidence, api_suggestions, web_context)
+        )
+    
+    def _remember(self, messages: list, label: str) -> None:
+        if self.decision_cache is not None and label != "Produit non identifie":
+            self.decision_cache.set(self._cache_key(messages), label, self.model_name)
+    
+    def _arbitrate_uncached(self, messages: list, description: str) -> Tuple[str, dict]:
+        response = self._invoke(messages, self.estimate_tokens(messages))
+        final_response, cost = self._finish(response, description)
+        self._remember(messages, final_response)
+        return final_response, cost
+    
+    def _arbitrate_alone(self, messages: list, description: str) -> Tuple[Optional[str], dict]:
+        """
+        One item of `arbitrate_many` on its own call. A failure stays with the
+        item: label None and a zero cost flagged `failed`.
+        """
+        try:
+            return self._arbitrate_uncached(messages, description)
+        except Exception as e:
+            self.logger.error(f"LLM arbitration failed for: {description}: {e}")
+            return None, {**self.calculate_cost(0, 0), "failed": True}
+    
     def arbitrate(self, 
                  description: str, 
                  t5_suggestion: str, 
                  t5_confidence: float, 
                  api_suggestions: List[Dict], 
-                 web_context: Optional[str] = None) -> Tuple[str, dict]:
+                 web_context: Optional[str] = None,
+                 use_cache: bool = True) -> Tuple[str, dict]:
         """
         Orchestrate product classification using LLM with API suggestions and T5 input.
+        Waits for rate-limit capacity instead of failing (blocking, for worker threads).
+        use_cache=False skips the cache lookup (the caller already missed it).
         """
         try:
             self.logger.info(f"Starting arbitration for: {description[:50]}...")
+            messages = self._build_messages(description, t5_suggestion, t5_confidence, api_suggestions, web_context)
+            cached = self._cached_decision(messages) if use_cache else None
+            if cached:
+                return cached
+            return self._arbitrate_uncached(messages, description)
             
-            # Prepare the system prompt
-            system_prompt = """You are an expert in Logistics Data Normalization (Master Data Management). Your mission is to convert raw invoice descriptions into standardized "nature_product" names: canonical, generic, precise names ALWAYS IN FRENCH.
-
-DECISION LOGIC:
-1. HIGH CONFIDENCE MATCH (API suggestion ≥ 0.82): Give it a chance ,if it perfectly matches the product type, brand, and unit specifications use the EXACT API suggestion .
-2. LOW CONFIDENCE MATCH (< 0.82): Create a new standardized nature_product following normalization rules
-
-NORMALIZATION RULES:
-• Language: French only, no articles (le/la/les/des)
-• Volume/Size: Remove standard volumes (33cl beer, 75cl wine) EXCEPT special formats
-• Brand: Keep brand names when they're the primary identifier
-• Product type: Always include the core product category
-• Specifications: Keep important characteristics (organic, aged, size variants)
-• Format: Shortest meaningful canonical name
-
-CATEGORY-SPECIFIC RULES:
-
-BEVERAGES:
-- Remove standard volumes: 33cl (beer), 75cl (wine), 25cl, 50cl
-- Keep special formats: 150cl, 300cl, 5L, etc.
-- Examples: "heineken 33cl" → "heineken" | "champagne dom perignon 150cl" → "champagne dom perignon 150cl"
-
-MEAT/CHARCUTERIE:
-- Specify cut/type + characteristics
-- Keep aging/preparation method
-- Examples: "jambon cru 24 mois" → "jambon cru 24 mois" | "saucisson sec" → "saucisson sec"
-
-CHEESE/DAIRY:
-- Include aging when relevant (12 mois, 24 mois)
-- Specify format when important (bloc, râpé, tranches)
-- Examples: "comte 24 mois" → "comte 24 mois" | "emmental rapes" → "emmental râpé"
-
-CLEANING/HOUSEHOLD:
-- Include product type + brand + key characteristics
-- Examples: "liquide vaisselle citron" → "liquide vaisselle citron"
-
-FOOD ITEMS:
-- Keep preparation method (cuit, cru, fumé, bio)
-- Include packaging when it affects usage (conserve, frais, surgelé)
-
-TRANSFORMATION EXAMPLES:
-
-KITCHEN EQUIPMENT:
-"couteau doffice 11 cm acier plastique unie" → "couteau office 11cm"
-"araignee de buyer 16cm" → "araignee buyer"
-"spatule bois" → "spatule bois"
-"pince feuille de chene inox 23cm" → "pince feuille chene inox 23cm"
-"planche a decouper bar poly 35x25 cm" → "planche polyethylene"
-"balance 10kg 10g a sect dbl affich" → "balance inox"
+        except Exception as e:
+            error_msg = f"LLM arbitration failed for: {description}"
+            self.logger.error(f"{error_msg}: {e}")
+            raise RuntimeError(error_msg)
+    
+    async def aarbitrate(self, 
+                         description: str, 
+                         t5_suggestion: str, 
+                         t5_confidence: float, 
+                         api_suggestions: List[Dict], 
+                         web_context: Optional[str] = None,
+                         use_cache: bool = True) -> Tuple[str, dict]:
+        """Async arbitrate: queued calls sleep on the event loop, not in a thread."""
+        try:
+            self.logger.info(f"Starting arbitration for: {description[:50]}...")
+            messages = self._build_messages(description, t5_suggestion, t5_confidence, api_suggestions, web_context)
+            cached = self._cached_decision(messages) if use_cache else None
+            if cached:
+                return cached
+            
+            response = await self._ainvoke(messages, self.estimate_tokens(messages))
+            final_response, cost = self._finish(response, description)
+            self._remember(messages, final_response)
+            return final_response, cost
+            
+        except Exception as e:
+            error_msg = f"LLM arbitration failed for: {description}"
+            self.logger.error(f"{error_msg}: {e}")
+            raise RuntimeError(error_msg)
 
-COOKING VESSELS:
-"moule alu tartes t1" → "moule tarte t1"
-"casserole inox o18 cm moyenne" → "casserole"
-"braisiere ix d28x185cm 11l ecoplus" → "braisiere inox"
-"poele alu a ad 4 couches0280" → "poele aluminium"
-"cocotte ovale 31cm signature meringue" → "cocotte"
+    
+    def arbitrate_many(self, items: List[Dict], pack_size: int = LLM_PACK_SIZE,
+                       use_cache: bool = True) -> List[Tuple[str, dict]]:
+        """
+        Arbitrate many items with one LLM call per `pack_size` items.
+        Each item holds the `arbitrate` keyword arguments. The system prompt is
+        sent once per pack and the model answers a JSON object keyed by item id;
+        items missing or malformed in that answer go through `arbitrate` alone.
+        Results keep the input order; each cost dict is the item's share of its
+        pack (plus its own retry, if any) and carries `packed_items`. Cached
+        decisions are answered first (unless use_cache=False) and packed
+        answers are cached per item. An item whose own call fails gets label None and `failed` in its cost
+        dict; the other items keep their answers.
+        """
+        results: List[Optional[Tuple[str, dict]]] = [None] * len(items)
+        single_messages = [self._build_messages(
+            item["description"], item.get("t5_suggestion"),
+            item.get("t5_confidence", 0.0), item.get("api_suggestions") or [], item.get("web_context"),
+        ) for item in items]
+        pending = []
+        for i, messages in enumerate(single_messages):
+            results[i] = self._cached_decision(messages) if use_cache else None
+            if results[i] is None:
+                pending.append(i)
+        
+        for start in range(0, len(pending), max(pack_size, 1)):
+            chunk = pending[start:start + max(pack_size, 1)]
+            if len(chunk) == 1:
+                results[chunk[0]] = self._arbitrate_alone(single_messages[chunk[0]], items[chunk[0]]["description"])
+                continue
+            
+            contents = [single_messages[i][1].content for i in chunk]
+            labels: Dict[str, str] = {}
+            shares = [self.calculate_cost(0, 0)] * len(chunk)
+            try:
+                self.logger.info(f"Starting packed arbitration of {len(chunk)} items")
+                packed_prompt = system_prompt([
+                    self._prompt_query(
+                        items[i]["description"], items[i].get("t5_suggestion"), items[i].get("api_suggestions")
+                    ) for i in chunk
+                ], packed=True)
+                messages = [
+                    SystemMessage(content=packed_prompt),
+                    HumanMessage(content="\n\n".join(
+                        f"[{n}]\n{content}" for n, content in enumerate(contents, 1)
+                    )),
+                ]
+                response = self._invoke(
+                    messages,
+                    self.estimate_tokens(messages, LLM_COMPLETION_TOKENS_ESTIMATE + 16 * len(chunk)),
+                    max_tokens=LLM_MAX_TOKENS + LLM_PACKED_MAX_TOKENS_PER_ITEM * len(chunk),
+                    complete=packed_object,
+                )
+                labels = self._parse_packed(response.content)
+                usage = response.response_metadata.get("token_usage", {})
+                shares = self._split_cost(
+                    usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                    [len(content) for content in contents], estimate_tokens(packed_prompt),
+                )
+                if usage.get("estimated"):
+                    shares = [{**share, "estimated": True} for share in shares]
+            except Exception as e:
+                self.logger.error(f"Packed arbitration failed, arbitrating {len(chunk)} items one by one: {e}")
+            
+            for n, (i, share) in enumerate(zip(chunk, shares), 1):
+                label = labels.get(str(n))
+                if label:
+                    self._remember(single_messages[i], label)
+                    results[i] = (label, {**share, "packed_items": len(chunk)})
+                    continue
+                self.logger.warning(f"No packed answer for item {n}, arbitrating alone")
+                single_label, single_cost = self._arbitrate_alone(single_messages[i], items[i]["description"])
+                results[i] = (single_label, {
+                    **share,
+                    **single_cost,
+                    # Token counts and costs add up; flags (estimated, failed) are kept
+                    **{k: share[k] + single_cost[k] for k in share
+                       if k in single_cost and not isinstance(share[k], bool)},
+                    "packed_items": len(chunk),
+                    "packed_retry": True,
+                })
+            
+            packed = sum(1 for i in chunk if not results[i][1].get("packed_retry"))
+            self.logger.info(f"Packed arbitration completed: {packed}/{len(chunk)} items answered in the pack")
+        return results
+    
+    @staticmethod
+    def _parse_packed(content: str) -> Dict[str, str]:
+        """{"<id>": "<label>"} from the model answer; unusable entries are dropped."""
+        text = (content or "").strip()
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            return {}
+        try:
+            parsed = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(parsed, dict):
+            return {}
+        labels = {}
+        for key, value in parsed.items():
+            if isinstance(value, dict):
+                value = value.get("label")
+            if isinstance(value, str) and value.strip():
+                labels[str(key).strip("[] ")] = value.strip()
+        return labels
+    
+    def _split_cost(self, prompt_tokens: int, completion_tokens: int, weights: List[int],
+                    system_tokens: int) -> List[dict]:
+        """
+        Per-item share of a packed call: the system prompt and the completion
+        are split evenly, the rest of the prompt in proportion to each item's text.
+        Token counts are whole (largest remainder, so they sum to the billed
+        totals); the cost is that of the exact fractional share.
+        """
+        n = len(weights)
+        shared_prompt = min(prompt_tokens, system_tokens)
+        item_prompt = prompt_tokens - shared_prompt
+        total_weight = sum(weights) or 1
+        prompt_shares = [shared_prompt / n + item_prompt * weight / total_weight for weight in weights]
+        completion_shares = [completion_tokens / n] * n
+        return [
+            {
+                **self.calculate_cost(prompt_share, completion_share),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+            }
+            for prompt_share, completion_share, input_tokens, output_tokens in zip(
+                prompt_shares,
+                completion_shares,
+                _whole_shares(prompt_tokens, prompt_shares),
+                _whole_shares(completion_tokens, completion_shares),
+            )
+        ]
 
-STORAGE & CONTAINERS:
-"bac allibert ra 1120" → "bac plastique"
-"bocal weck 200 ml bigarrade dapple betteravepopotte du chef 120g" → "bocal weck"
-"bac inox gn1 4 p 15cm 41l" → "bac inox/blanc"
-"godet aluminium 75 x 40 90 ml x 100" → "godet aluminium"
 
-PASTRY EQUIPMENT:
-"poche jetable gm chaude 30x54cm x100" → "poche patissiere 30x54"
-"plaque souple flexipan 24 cakes all 120x40mm prof20mm 585x385mm pour plaques 600x400" → "plaque souple flexipan cakes all"
-"toile patissiere fiberlux dim 400x300 mm" → "toile cuisson"
-"bte 9 decoupoirs ix ronds canneles" → "decoupoir rond cannele"
+def _whole_shares(total: int, shares: List[float]) -> List[int]:
+    """Integer shares summing to total: floors, then +1 to the largest remainders."""
+    whole = [int(share) for share in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: shares[i] - whole[i], reverse=True)
+    for i in by_remainder[:max(total - sum(whole), 0)]:
+        whole[i] += 1
+    return whole
 
-BEVERAGE EQUIPMENT:
-"saupoudreuse parmesan inox" → "saupoudreuse parmesan"
-"shaker 50cl inox 2 pieces hypinox" → "shaker"
-"machine espresso sage the dual boiler unite" → "machine a cafe"
-"moulin comandante noir unite" → "moulin a cafe"
 
-SPECIALTY ITEMS:
-"archibaltic porter 30 l key kegbiere de type baltic porter 75pcent alc au poivre long de javafut 30 l a usage unique" → "keykeg"
-"2bouchon nikele champagne a vi" → "bouchon champagne"
-"tube naturco2 10kg l2pi orange" → "co2"
-"distributeur pressable transp 709cl" → "distributeur sauce"
+def get_rate_limiter_stats() -> dict:
+    """Queueing and quota counters of the LLM rate limiter."""
+    return _rate_limiter.stats()
 
-CLEANING & MAINTENANCE:
-"pulverisateur d epaule pulsen pour produit chimique" → "pulverisateur"
-"colle instant loctite 401 20gr" → "colle instantanee"
-"distributeur de savon blanc 245x11x99" → "distributeur de savon ou gel hydroalcoolique"
 
-PLUMBING & HARDWARE:
-"mamelon laiton m m 20 27 15 21" → "mamelon"
-"mitigeur evier premier" → "mitigeur"
-"presse etoupe pg 16" → "presse etoupe"
-"raccord gaz mm20x150" → "raccord"
+def get_prompt_stats() -> dict:
+    """Prompt tokens per call and how often each category section was included."""
+    return {**_prompt_accountant.stats(), "section_uses": _prompt_builder.section_uses()}
 
-WHAT NOT TO DO:
-- Don't add articles: "le jambon" → "jambon"
-- Don't keep redundant info: "fromage comte fromage" → "comté"
-- Don't over-specify common items: "eau plate 1.5L evian" → "eau evian 1.5L"
-- Don't translate brand names: "Coca-Cola" stays "coca cola"
 
-QUALITY CHECKS:
-1. Is it in French?
-2. No articles?
-3. Essential info preserved?
-4. Shortest meaningful form?
-5. Category-appropriate normalization?
+def get_streaming_stats() -> dict:
+    """Time to first token, generation time and early cutoffs of the streamed calls."""
+    return {
+        "enabled": LLM_STREAMING,
+        "max_tokens": LLM_MAX_TOKENS,
+        "reasoning_effort": LLM_REASONING_EFFORT or None,
+        **_streaming_stats.stats(),
+    }
 
-PROCESS:
-1. Check API suggestion confidence (≥0.82 = use exact match if appropriate)
-2. Identify product category
-3. Apply category-specific rules
-4. Verify normalization quality
-5. Output final canonical name
 
-RESPOND ONLY WITH THE FINAL STANDARDIZED LABEL."""
-            
-            # Format suggestions
-            top_suggestions = api_suggestions[:3] if api_suggestions else []
-            suggestions_text = ""
-            if top_suggestions:
-                suggestions_text = " | ".join([
-                    f"{s.get('nature_product', '')} ({s.get('similarity_score', 0):.2f})" 
-                    for s in top_suggestions
-                ])
-            
-            # Create user content
-            user_content = f"Description: {description}\nSuggestions: {suggestions_text}\nT5: {t5_suggestion} ({t5_confidence:.2f})"
-            
-            # Prepare messages
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_content)
-            ]
-            
-            # Make LLM call
-            response = self.llm.invoke(messages)
-            
-            # Extract usage and calculate cost
-            usage = response.response_metadata.get("token_usage", {})
-            cost = self.calculate_cost(
-                usage.get("prompt_tokens", 0),
-                usage.get("completion_tokens", 0)
-            )
-            
-            # Process response
-            final_response = response.content.strip()
-            if not final_response:
-                final_response = "Produit non identifie"
-                self.logger.warning(f"Empty response from LLM for: {description}")
-            
-            self.logger.info(f"Arbitration completed: {final_response}")
-            return final_response, cost
-            
-        except Exception as e:
-            error_msg = f"LLM arbitration failed for: {description}"
-            self.logger.error(f"{error_msg}: {e}")
-            raise RuntimeError(error_msg)
\ No newline at end of file
+def get_decision_cache_stats() -> Optional[dict]:
+    """Decision cache counters, None until the orchestrator is up (or when disabled)."""
+    service = OrchestratorService._instance
+    if service is None or service.decision_cache is None:
+        return None
+    return service.decision_cache.stats()
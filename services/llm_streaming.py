@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from langchain_core.messages import AIMessage
+from services.prompt_builder import estimate_tokens
+
+
+def label_line(text: str) -> Optional[str]:
+    """The label once its line is complete (first non-empty line followed by a newline), else None."""
+    stripped = text.lstrip()
+    end = stripped.find("\n")
+    if end < 0:
+        return None
+    return stripped[:end].strip() or None
+
+
+def packed_object(text: str) -> Optional[str]:
+    """The JSON object of a packed answer once it has closed, else None."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        json.loads(text[start:end + 1])
+    except ValueError:
+        # A "}" inside a label, or the object is still open
+        return None
+    return text[start:end + 1]
+
+
+class StreamCollector:
+    """
+    One streamed answer: `feed` each chunk and stop reading as soon as it
+    returns True (`complete` found the answer in the text so far). Answer and
+    reasoning text are kept for the usage estimate; the time to first token
+    and the generation time that follows are measured separately.
+    """
+
+    def __init__(self, complete: Callable[[str], Optional[str]]):
+        self.complete = complete
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.text = ""
+        self.reasoning = ""
+        self.usage: Optional[Dict] = None
+        self.finish_reason: Optional[str] = None
+        self.answer: Optional[str] = None
+
+    def feed(self, chunk) -> bool:
+        content = chunk.content if isinstance(chunk.content, str) else ""
+        reasoning = chunk.additional_kwargs.get("reasoning_content") or ""
+        self.reasoning += reasoning
+        if (content or reasoning) and self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        # The provider's usage and finish reason come with the last chunks
+        self.usage = getattr(chunk, "usage_metadata", None) or self.usage
+        self.finish_reason = chunk.response_metadata.get("finish_reason") or self.finish_reason
+        if content:
+            self.text += content
+            self.answer = self.complete(self.text)
+        return self.answer is not None
+
+    def response(self, messages: list, model_name: str) -> AIMessage:
+        """
+        The answer shaped like an `invoke` response. A stream closed early has
+        no provider usage: prompt and completion tokens (answer plus reasoning
+        received) are estimated from their text, and the usage is flagged
+        `estimated` so that its cost is reported as an estimate.
+        """
+        ended = time.perf_counter()
+        first = self.first_token_at or ended
+        cut = self.answer is not None
+        estimated = cut or not self.usage
+        if not estimated:
+            prompt_tokens = self.usage.get("input_tokens", 0)
+            completion_tokens = self.usage.get("output_tokens", 0)
+        else:
+            prompt_tokens = sum(estimate_tokens(m.content) for m in messages)
+            completion_tokens = estimate_tokens(self.text + self.reasoning)
+        return AIMessage(
+            content=self.answer if cut else self.text,
+            response_metadata={
+                "token_usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "estimated": estimated,
+                    "time_to_first_token": round(first - self.started, 4),
+                    "generation_time": round(ended - first, 4),
+                },
+                "model_name": model_name,
+                "finish_reason": "cutoff" if cut else (self.finish_reason or "stop"),
+            },
+        )
+
+
+class StreamingStats:
+    """Time to first token, generation time, stop reason and estimated usage of the streamed calls."""
+
+    def __init__(self, window: int = 1000):
+        self._ttft_ms: deque = deque(maxlen=window)
+        self._generation_ms: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "cutoff": 0,
+            "length": 0,
+            "estimated_usage": 0,
+            "completion_tokens": 0,
+        }
+
+    def record(self, response: AIMessage) -> None:
+        usage = response.response_metadata.get("token_usage", {})
+        finish_reason = response.response_metadata.get("finish_reason")
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["completion_tokens"] += usage.get("completion_tokens", 0)
+            if finish_reason in ("cutoff", "length"):
+                self._counters[finish_reason] += 1
+            if usage.get("estimated"):
+                self._counters["estimated_usage"] += 1
+            self._ttft_ms.append(usage.get("time_to_first_token", 0.0) * 1000)
+            self._generation_ms.append(usage.get("generation_time", 0.0) * 1000)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            ttft = sorted(self._ttft_ms)
+            generation = sorted(self._generation_ms)
+            counters = dict(self._counters)
+
+        def pct(values: list, p: float) -> float:
+            return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))], 1) if values else 0.0
+
+        calls = counters["calls"] or 1
+        return {
+            **counters,
+            "mean_completion_tokens": round(counters["completion_tokens"] / calls, 1),
+            "time_to_first_token_ms_p50": pct(ttft, 50),
+            "time_to_first_token_ms_p95": pct(ttft, 95),
+            "generation_ms_p50": pct(generation, 50),
+            "generation_ms_p95": pct(generation, 95),
+        }
@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from typing import List, Dict, Optional
+from utils.config_validator import LOCAL_INDEX_DATA_PATH, LOCAL_INDEX_TOP_K, ENABLE_LABEL_WRITEBACK
+from utils.text_normalization import normalize_many, normalize_series
+from services.snapshot_service import current_snapshot_dir
+
+
+class LocalSuggestionIndex:
+    """
+    In-process replacement for the find_suggestions endpoint.
+
+    Descriptions from the labeled dataset and the nature_product labels
+    themselves are indexed as TF-IDF weighted character n-grams. A query is a
+    single sparse-matrix product against the whole index, and the best
+    score per nature_product is returned in the find_suggestions format.
+
+    Learned labels are appended to a small delta matrix (idf kept frozen),
+    so new decisions become searchable without rebuilding the index.
+
+    With a snapshot (see snapshot_service) nothing is rebuilt: the matrix and
+    the document tables are memory-mapped from disk.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    N_FEATURES = 2 ** 20
+
+    def __init__(self, data_path: str = LOCAL_INDEX_DATA_PATH, snapshot_dir: Optional[str] = None):
+        self.vectorizer = self.make_vectorizer()
+        if snapshot_dir:
+            self._load_snapshot(snapshot_dir)
+        else:
+            self._build(data_path)
+
+        self._delta_lock = threading.Lock()
+        self.delta_matrix = sparse.csr_matrix((0, self.N_FEATURES), dtype=np.float32)
+        self.delta_labels: List[str] = []
+        self.delta_descriptions: List[str] = []
+        self._learned_callback = None
+        if ENABLE_LABEL_WRITEBACK:
+            self._attach_learned_labels()
+        print(f"✅ Local suggestion index ready: {self.matrix.shape[0]} documents")
+
+    @classmethod
+    def make_vectorizer(cls) -> HashingVectorizer:
+        # Hashing keeps the vectorizer stateless: only the idf vector must be kept.
+        # Text is normalized beforehand (shared pipeline), hence lowercase=False
+        return HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=(2, 4),
+            n_features=cls.N_FEATURES,
+            alternate_sign=False,
+            norm=None,
+            lowercase=False,
+        )
+
+    def _build(self, data_path: str) -> None:
+        print(f"🔄 Building local suggestion index from {data_path}...")
+        df = pd.read_csv(data_path, usecols=["description_cleaned", "nature_product"])
+        df = df.dropna()
+        df = df[(df["description_cleaned"].str.strip() != "") & (df["nature_product"].str.strip() != "")]
+
+        # Labels are indexed as documents too, so a query equal to a label matches it
+        labels = df["nature_product"].drop_duplicates()
+        documents = pd.concat([df["description_cleaned"], labels], ignore_index=True)
+        document_labels = pd.concat([df["nature_product"], labels], ignore_index=True)
+
+        counts = self.vectorizer.transform(normalize_series(documents))
+        n_documents = counts.shape[0]
+        document_frequency = np.bincount(counts.indices, minlength=self.N_FEATURES)
+        self.idf = (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        self.matrix = self._weight(counts)
+        self.labels = np.asarray(document_labels.tolist(), dtype=object)
+        self.descriptions = np.asarray(documents.tolist(), dtype=object)
+
+    def _load_snapshot(self, snapshot_dir: str) -> None:
+        """Open the ngram component of a snapshot; arrays stay memory-mapped."""
+        from services.catalog_table import LabeledColumn, StringTable
+
+        ngram_dir = os.path.join(snapshot_dir, "ngram")
+        with open(os.path.join(ngram_dir, "ngram.json")) as f:
+            meta = json.load(f)
+        if meta["n_features"] != self.N_FEATURES:
+            raise ValueError(f"Snapshot {snapshot_dir} uses {meta['n_features']} features, expected {self.N_FEATURES}")
+        raw = {
+            name: np.memmap(os.path.join(ngram_dir, meta[name]["file"]), dtype=meta[name]["dtype"],
+                            mode="r", shape=(meta[name]["length"],))
+            for name in ("data", "indices")
+        }
+        indptr = np.load(os.path.join(ngram_dir, "indptr.npy"), mmap_mode="r")
+        self.idf = np.load(os.path.join(ngram_dir, "idf.npy"))
+        self.matrix = sparse.csr_matrix(
+            (raw["data"], raw["indices"], indptr), shape=(meta["documents"], self.N_FEATURES), copy=False
+        )
+        labels_table = StringTable(os.path.join(snapshot_dir, "documents"), "labels")
+        descriptions_table = StringTable(os.path.join(snapshot_dir, "documents"), "descriptions")
+        self.labels = LabeledColumn(labels_table, descriptions_table.values)
+        self.descriptions = descriptions_table
+        print(f"📦 Local suggestion index mapped from snapshot {snapshot_dir}")
+
+    def _attach_learned_labels(self) -> None:
+        """Index stored LLM decisions and follow new ones."""
+        from services.label_store import LearnedLabelStore
+
+        try:
+            store = LearnedLabelStore.get_instance()
+        except Exception as e:
+            print(f"⚠️ Learned labels unavailable for the local index: {e}")
+            return
+        entries = [e for e in store.entries() if store.is_servable(e)]
+        if entries:
+            self.add_documents([e["designation"] for e in entries], [e["label"] for e in entries])
+        self._learned_callback = (
+            lambda e: self.add_documents([e["designation"]], [e["label"]]) if store.is_servable(e) else None
+        )
+        store.subscribe(self._learned_callback)
+
+    def close(self) -> None:
+        """Stop following learned labels (the index is being replaced)."""
+        if self._learned_callback is not None:
+            from services.label_store import LearnedLabelStore
+            LearnedLabelStore.get_instance().unsubscribe(self._learned_callback)
+            self._learned_callback = None
+
+    def add_documents(self, descriptions: List[str], labels: List[str]) -> None:
+        """Make new (description, label) pairs searchable without a rebuild."""
+        rows = self._weight(self.vectorizer.transform(normalize_many(descriptions)))
+        with self._delta_lock:
+            self.delta_matrix = sparse.vstack([self.delta_matrix, rows]).tocsr()
+            self.delta_labels = self.delta_labels + list(labels)
+            self.delta_descriptions = self.delta_descriptions + list(descriptions)
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(snapshot_dir=current_snapshot_dir("ngram"))
+        return cls._instance
+
+    @staticmethod
+    def weight_counts(counts: sparse.csr_matrix, idf: np.ndarray) -> sparse.csr_matrix:
+        """Apply idf weights and L2-normalize rows."""
+        weighted = counts.multiply(idf).tocsr().astype(np.float32)
+        return normalize(weighted, norm="l2", copy=False)
+
+    def _weight(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        return self.weight_counts(counts, self.idf)
+
+    def _top_labels(self, indices: np.ndarray, scores: np.ndarray, top_k: int,
+                    delta_labels: List[str], delta_descriptions: List[str]) -> List[Dict]:
+        """Best score per nature_product among the highest scoring documents."""
+        # Several documents can share a label: look a bit deeper than top_k
+        depth = min(len(scores), top_k * 10)
+        if depth == 0:
+            return []
+        best = np.argpartition(-scores, depth - 1)[:depth]
+        best = best[np.argsort(-scores[best])]
+
+        suggestions = []
+        seen = set()
+        for pos in best:
+            score = float(scores[pos])
+            if score <= 0:
+                break
+            idx = indices[pos]
+            # Indices past the base matrix point into the learned delta
+            if idx < len(self.labels):
+                label, description = self.labels[idx], self.descriptions[idx]
+            else:
+                label = delta_labels[idx - len(self.labels)]
+                description = delta_descriptions[idx - len(self.labels)]
+            if label in seen:
+                continue
+            seen.add(label)
+            suggestions.append({
+                "nature_product": label,
+                "similarity_score": round(score, 4),
+                "matched_description": description,
+            })
+            if len(suggestions) == top_k:
+                break
+        return suggestions
+
+    def query_many(self, designations: List[str], top_k: Optional[int] = None) -> List[List[Dict]]:
+        """Top-k suggestions for each designation, with one sparse product for the batch."""
+        top_k = top_k or LOCAL_INDEX_TOP_K
+        if not designations:
+            return []
+        queries = self._weight(self.vectorizer.transform(normalize_many(designations)))
+        with self._delta_lock:
+            delta_matrix = self.delta_matrix
+            delta_labels = self.delta_labels
+            delta_descriptions = self.delta_descriptions
+        # Result stays sparse: only documents sharing an n-gram get a score
+        scores = queries @ self.matrix.T
+        if delta_matrix.shape[0]:
+            scores = sparse.hstack([scores, queries @ delta_matrix.T])
+        scores = scores.tocsr()
+        return [
+            self._top_labels(
+                scores.indices[scores.indptr[i]:scores.indptr[i + 1]],
+                scores.data[scores.indptr[i]:scores.indptr[i + 1]],
+                top_k,
+                delta_labels,
+                delta_descriptions,
+            )
+            for i in range(len(designations))
+        ]
+
+    def query(self, designation: str, top_k: Optional[int] = None) -> List[Dict]:
+        """Top-k suggestions for a single designation."""
+        return self.query_many([designation], top_k)[0]
@@ -0,0 +1,298 @@
+"""
+Arbitration system prompt, built per call.
+
+The prompt is a core instruction block plus the category sections and
+few-shot examples closest to the items being arbitrated. Closeness is a
+character-trigram cosine between the normalized query (description, T5 guess
+and suggestions) and each example of the bank, plus a keyword check for the
+category sections: no model, a few microseconds per example. The same
+inputs always give the same prompt, so decision cache keys stay stable.
+"""
+import math
+import threading
+from collections import Counter, deque
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+from utils.text_normalization import normalize_designation
+from utils.config_validator import (
+    PROMPT_FEW_SHOT_K,
+    PROMPT_MIN_EXAMPLES,
+    PROMPT_MAX_SECTIONS,
+    PROMPT_MIN_SIMILARITY,
+    LLM_CHARS_PER_TOKEN,
+)
+
+PROMPT_HEAD = """You are an expert in Logistics Data Normalization (Master Data Management). Your mission is to convert raw invoice descriptions into standardized "nature_product" names: canonical, generic, precise names ALWAYS IN FRENCH.
+
+DECISION LOGIC:
+1. HIGH CONFIDENCE MATCH (API suggestion ≥ 0.82): Give it a chance ,if it perfectly matches the product type, brand, and unit specifications use the EXACT API suggestion .
+2. LOW CONFIDENCE MATCH (< 0.82): Create a new standardized nature_product following normalization rules
+
+NORMALIZATION RULES:
+• Language: French only, no articles (le/la/les/des)
+• Volume/Size: Remove standard volumes (33cl beer, 75cl wine) EXCEPT special formats
+• Brand: Keep brand names when they're the primary identifier
+• Product type: Always include the core product category
+• Specifications: Keep important characteristics (organic, aged, size variants)
+• Format: Shortest meaningful canonical name"""
+
+PROMPT_TAIL = """WHAT NOT TO DO:
+- Don't add articles: "le jambon" → "jambon"
+- Don't keep redundant info: "fromage comte fromage" → "comté"
+- Don't over-specify common items: "eau plate 1.5L evian" → "eau evian 1.5L"
+- Don't translate brand names: "Coca-Cola" stays "coca cola"
+
+QUALITY CHECKS:
+1. Is it in French?
+2. No articles?
+3. Essential info preserved?
+4. Shortest meaningful form?
+5. Category-appropriate normalization?
+
+PROCESS:
+1. Check API suggestion confidence (≥0.82 = use exact match if appropriate)
+2. Identify product category
+3. Apply category-specific rules
+4. Verify normalization quality
+5. Output final canonical name"""
+
+SINGLE_ANSWER = "RESPOND ONLY WITH THE FINAL STANDARDIZED LABEL."
+
+PACKED_ANSWER = """MULTIPLE ITEMS:
+You receive several items, each introduced by its id in brackets ([1], [2], ...). Decide each item independently.
+RESPOND ONLY WITH A JSON OBJECT mapping every item id to its final standardized label, for example:
+{"1": "heineken", "2": "comte 24 mois"}"""
+
+# name -> (rules, keywords); keywords are matched against normalized query words
+CATEGORY_SECTIONS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "BEVERAGES": (
+        "- Remove standard volumes: 33cl (beer), 75cl (wine), 25cl, 50cl\n"
+        "- Keep special formats: 150cl, 300cl, 5L, etc.",
+        ("biere", "vin", "champagne", "cremant", "prosecco", "whisky", "rhum", "vodka", "gin",
+         "cognac", "liqueur", "aperitif", "cidre", "jus", "soda", "limonade", "sirop", "eau",
+         "cola", "tonic", "nectar", "fut"),
+    ),
+    "MEAT/CHARCUTERIE": (
+        "- Specify cut/type + characteristics\n"
+        "- Keep aging/preparation method",
+        ("jambon", "saucisson", "saucisse", "chorizo", "lardons", "bacon", "pate", "terrine",
+         "rillettes", "boeuf", "veau", "porc", "agneau", "poulet", "volaille", "canard",
+         "dinde", "magret", "filet", "entrecote", "steak", "merguez"),
+    ),
+    "CHEESE/DAIRY": (
+        "- Include aging when relevant (12 mois, 24 mois)\n"
+        "- Specify format when important (bloc, râpé, tranches)",
+        ("fromage", "comte", "emmental", "gruyere", "parmesan", "mozzarella", "chevre",
+         "brie", "camembert", "roquefort", "raclette", "reblochon", "beurre", "creme",
+         "lait", "yaourt", "mascarpone", "ricotta", "feta"),
+    ),
+    "CLEANING/HOUSEHOLD": (
+        "- Include product type + brand + key characteristics",
+        ("liquide", "vaisselle", "nettoyant", "detergent", "degraissant", "desinfectant",
+         "javel", "lessive", "savon", "eponge", "poubelle", "essuie", "papier", "gant",
+         "detartrant", "lingettes"),
+    ),
+    "FOOD ITEMS": (
+        "- Keep preparation method (cuit, cru, fumé, bio)\n"
+        "- Include packaging when it affects usage (conserve, frais, surgelé)",
+        ("conserve", "surgele", "frais", "bio", "fume", "cuit", "cru", "farine", "sucre",
+         "huile", "vinaigre", "riz", "pates", "sauce", "epices", "chocolat", "legumes",
+         "fruits", "tomate", "poisson", "saumon", "thon", "oeufs", "pain"),
+    ),
+}
+
+# (group, raw description, label); groups are rendered as headers
+EXAMPLE_BANK: Tuple[Tuple[str, str, str], ...] = (
+    ("BEVERAGES", "heineken 33cl", "heineken"),
+    ("BEVERAGES", "champagne dom perignon 150cl", "champagne dom perignon 150cl"),
+    ("MEAT/CHARCUTERIE", "jambon cru 24 mois", "jambon cru 24 mois"),
+    ("MEAT/CHARCUTERIE", "saucisson sec", "saucisson sec"),
+    ("CHEESE/DAIRY", "comte 24 mois", "comte 24 mois"),
+    ("CHEESE/DAIRY", "emmental rapes", "emmental râpé"),
+    ("CLEANING/HOUSEHOLD", "liquide vaisselle citron", "liquide vaisselle citron"),
+    ("KITCHEN EQUIPMENT", "couteau doffice 11 cm acier plastique unie", "couteau office 11cm"),
+    ("KITCHEN EQUIPMENT", "araignee de buyer 16cm", "araignee buyer"),
+    ("KITCHEN EQUIPMENT", "spatule bois", "spatule bois"),
+    ("KITCHEN EQUIPMENT", "pince feuille de chene inox 23cm", "pince feuille chene inox 23cm"),
+    ("KITCHEN EQUIPMENT", "planche a decouper bar poly 35x25 cm", "planche polyethylene"),
+    ("KITCHEN EQUIPMENT", "balance 10kg 10g a sect dbl affich", "balance inox"),
+    ("COOKING VESSELS", "moule alu tartes t1", "moule tarte t1"),
+    ("COOKING VESSELS", "casserole inox o18 cm moyenne", "casserole"),
+    ("COOKING VESSELS", "braisiere ix d28x185cm 11l ecoplus", "braisiere inox"),
+    ("COOKING VESSELS", "poele alu a ad 4 couches0280", "poele aluminium"),
+    ("COOKING VESSELS", "cocotte ovale 31cm signature meringue", "cocotte"),
+    ("STORAGE & CONTAINERS", "bac allibert ra 1120", "bac plastique"),
+    ("STORAGE & CONTAINERS", "bocal weck 200 ml bigarrade dapple betteravepopotte du chef 120g", "bocal weck"),
+    ("STORAGE & CONTAINERS", "bac inox gn1 4 p 15cm 41l", "bac inox/blanc"),
+    ("STORAGE & CONTAINERS", "godet aluminium 75 x 40 90 ml x 100", "godet aluminium"),
+    ("PASTRY EQUIPMENT", "poche jetable gm chaude 30x54cm x100", "poche patissiere 30x54"),
+    ("PASTRY EQUIPMENT", "plaque souple flexipan 24 cakes all 120x40mm prof20mm 585x385mm pour plaques 600x400",
+     "plaque souple flexipan cakes all"),
+    ("PASTRY EQUIPMENT", "toile patissiere fiberlux dim 400x300 mm", "toile cuisson"),
+    ("PASTRY EQUIPMENT", "bte 9 decoupoirs ix ronds canneles", "decoupoir rond cannele"),
+    ("BEVERAGE EQUIPMENT", "saupoudreuse parmesan inox", "saupoudreuse parmesan"),
+    ("BEVERAGE EQUIPMENT", "shaker 50cl inox 2 pieces hypinox", "shaker"),
+    ("BEVERAGE EQUIPMENT", "machine espresso sage the dual boiler unite", "machine a cafe"),
+    ("BEVERAGE EQUIPMENT", "moulin comandante noir unite", "moulin a cafe"),
+    ("SPECIALTY ITEMS", "archibaltic porter 30 l key kegbiere de type baltic porter 75pcent alc au poivre "
+     "long de javafut 30 l a usage unique", "keykeg"),
+    ("SPECIALTY ITEMS", "2bouchon nikele champagne a vi", "bouchon champagne"),
+    ("SPECIALTY ITEMS", "tube naturco2 10kg l2pi orange", "co2"),
+    ("SPECIALTY ITEMS", "distributeur pressable transp 709cl", "distributeur sauce"),
+    ("CLEANING & MAINTENANCE", "pulverisateur d epaule pulsen pour produit chimique", "pulverisateur"),
+    ("CLEANING & MAINTENANCE", "colle instant loctite 401 20gr", "colle instantanee"),
+    ("CLEANING & MAINTENANCE", "distributeur de savon blanc 245x11x99", "distributeur de savon ou gel hydroalcoolique"),
+    ("PLUMBING & HARDWARE", "mamelon laiton m m 20 27 15 21", "mamelon"),
+    ("PLUMBING & HARDWARE", "mitigeur evier premier", "mitigeur"),
+    ("PLUMBING & HARDWARE", "presse etoupe pg 16", "presse etoupe"),
+    ("PLUMBING & HARDWARE", "raccord gaz mm20x150", "raccord"),
+)
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Character trigrams of each normalized word, padded with spaces."""
+    grams = set()
+    for word in normalize_designation(text).split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _cosine(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / math.sqrt(len(a) * len(b))
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / LLM_CHARS_PER_TOKEN)
+
+
+class PromptBuilder:
+    """
+    Builds the arbitration system prompt from the core block, the selected
+    category sections and the nearest examples of EXAMPLE_BANK.
+    """
+
+    def __init__(self,
+                 few_shot_k: int = PROMPT_FEW_SHOT_K,
+                 min_examples: int = PROMPT_MIN_EXAMPLES,
+                 max_sections: int = PROMPT_MAX_SECTIONS,
+                 min_similarity: float = PROMPT_MIN_SIMILARITY):
+        self.few_shot_k = few_shot_k
+        self.min_examples = min_examples
+        self.max_sections = max_sections
+        self.min_similarity = min_similarity
+        self._example_grams = [trigrams(raw) | trigrams(label) for _, raw, label in EXAMPLE_BANK]
+        self._lock = threading.Lock()
+        self._section_uses: Counter = Counter()
+        self._full = {packed: self._render(list(CATEGORY_SECTIONS), range(len(EXAMPLE_BANK)), packed)
+                      for packed in (False, True)}
+
+    def full_prompt(self, packed: bool = False) -> str:
+        """Every section and example (the prompt before slicing)."""
+        return self._full[packed]
+
+    def select(self, queries: Sequence[str]) -> Tuple[List[str], List[int]]:
+        """Category sections and example indices (bank order) relevant to any of the queries."""
+        section_scores: Dict[str, float] = {}
+        example_scores: Dict[int, float] = {}
+        for query in queries:
+            grams = trigrams(query)
+            words = set(normalize_designation(query).split())
+            scored = sorted(
+                ((_cosine(grams, example), i) for i, example in enumerate(self._example_grams)),
+                key=lambda x: (-x[0], x[1]),
+            )
+            # Nearest examples above the floor, at least min_examples of them
+            for rank, (score, i) in enumerate(scored[:self.few_shot_k]):
+                if score >= self.min_similarity or rank < self.min_examples:
+                    example_scores[i] = max(example_scores.get(i, 0.0), score)
+            for name, (_, keywords) in CATEGORY_SECTIONS.items():
+                score = 1.0 if words.intersection(keywords) else max(
+                    (s for s, i in scored if EXAMPLE_BANK[i][0] == name), default=0.0
+                )
+                if score >= self.min_similarity:
+                    section_scores[name] = max(section_scores.get(name, 0.0), score)
+
+        limit_sections = self.max_sections * max(len(queries), 1)
+        sections = sorted(section_scores, key=lambda n: -section_scores[n])[:limit_sections]
+        limit_examples = self.few_shot_k * max(len(queries), 1)
+        examples = sorted(example_scores, key=lambda i: -example_scores[i])[:limit_examples]
+        # Render in declaration order so equal selections give byte-identical prompts
+        return [n for n in CATEGORY_SECTIONS if n in sections], sorted(examples)
+
+    def build(self, queries: Sequence[str], packed: bool = False) -> str:
+        sections, examples = self.select(queries)
+        with self._lock:
+            self._section_uses.update(sections)
+            self._section_uses["_prompts"] += 1
+        return self._render(sections, examples, packed)
+
+    @staticmethod
+    def _render(sections: Sequence[str], examples: Sequence[int], packed: bool) -> str:
+        parts = [PROMPT_HEAD]
+        if sections:
+            parts.append("CATEGORY-SPECIFIC RULES:\n\n" + "\n\n".join(
+                f"{name}:\n{CATEGORY_SECTIONS[name][0]}" for name in sections
+            ))
+        if examples:
+            groups: Dict[str, List[str]] = {}
+            for i in examples:
+                group, raw, label = EXAMPLE_BANK[i]
+                groups.setdefault(group, []).append(f'"{raw}" → "{label}"')
+            parts.append("TRANSFORMATION EXAMPLES:\n\n" + "\n\n".join(
+                f"{group}:\n" + "\n".join(lines) for group, lines in groups.items()
+            ))
+        parts.append(PROMPT_TAIL)
+        parts.append(PACKED_ANSWER if packed else SINGLE_ANSWER)
+        return "\n\n".join(parts)
+
+    def section_uses(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._section_uses)
+
+
+class PromptTokenAccountant:
+    """Prompt size of every LLM call: estimated system/user tokens and billed prompt tokens."""
+
+    def __init__(self, full_prompt_tokens: int, window: int = 1000):
+        self.full_prompt_tokens = full_prompt_tokens
+        self._recent: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._totals = {
+            "calls": 0,
+            "system_tokens_est": 0,
+            "user_tokens_est": 0,
+            "prompt_tokens": 0,
+            "saved_tokens_est": 0,
+        }
+
+    def record(self, system_prompt: str, user_content: str, usage: Optional[Dict] = None) -> None:
+        system_tokens = estimate_tokens(system_prompt)
+        user_tokens = estimate_tokens(user_content)
+        prompt_tokens = (usage or {}).get("prompt_tokens") or system_tokens + user_tokens
+        with self._lock:
+            self._totals["calls"] += 1
+            self._totals["system_tokens_est"] += system_tokens
+            self._totals["user_tokens_est"] += user_tokens
+            self._totals["prompt_tokens"] += prompt_tokens
+            self._totals["saved_tokens_est"] += max(self.full_prompt_tokens - system_tokens, 0)
+            self._recent.append(prompt_tokens)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            totals = dict(self._totals)
+
+        def pct(p: float) -> int:
+            return recent[min(len(recent) - 1, int(round(p / 100 * (len(recent) - 1))))] if recent else 0
+
+        calls = totals["calls"] or 1
+        return {
+            **totals,
+            "full_system_prompt_tokens_est": self.full_prompt_tokens,
+            "mean_system_tokens_est": round(totals["system_tokens_est"] / calls, 1),
+            "mean_prompt_tokens": round(totals["prompt_tokens"] / calls, 1),
+            "prompt_tokens_p50": pct(50),
+            "prompt_tokens_p95": pct(95),
+        }
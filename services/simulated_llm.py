@@ -0,0 +1,285 @@
+"""
+Local stand-in for the Groq chat model, for offline and repeatable tests of
+the LLM stage (LLM_BACKEND=simulated).
+
+It answers like the arbitrator would without calling anything: the top
+suggestion when its score reaches `suggestion_threshold`, otherwise the T5
+guess, otherwise the normalized description. Packed prompts get the JSON
+object keyed by item id. Responses carry Groq-shaped `token_usage` (prompt
+tokens estimated from the text, completion tokens for the label plus
+simulated reasoning) and timings. `stream` / `astream` send the reasoning
+then the answer token by token, ending with the usage; `max_tokens` cuts the
+completion like the provider does. Latency, 503 errors, 429 rate limits and
+answers followed by an explanation line are injected as configured; the
+draws are seeded from the request content, so a run gives the same
+latencies and errors whatever the concurrency.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from langchain_core.messages import AIMessage, AIMessageChunk
+from utils.text_normalization import normalize_designation
+from utils.config_validator import (
+    SIM_LLM_LATENCY_DIST,
+    SIM_LLM_LATENCY_MEAN_MS,
+    SIM_LLM_LATENCY_STD_MS,
+    SIM_LLM_TOKENS_PER_SECOND,
+    SIM_LLM_REASONING_TOKENS,
+    SIM_LLM_ERROR_RATE,
+    SIM_LLM_RATE_LIMIT_RATE,
+    SIM_LLM_CHATTY_RATE,
+    SIM_LLM_SEED,
+    LLM_CHARS_PER_TOKEN,
+)
+
+_ITEM_RE = re.compile(r"^\[(\d+)\]\s*$", re.MULTILINE)
+_SUGGESTION_RE = re.compile(r"^(.*?)\s*\((\d+(?:\.\d+)?)\)$")
+# What a chatty model appends after its label, despite the prompt
+_EXPLANATION = (
+    "\nExplication : la désignation correspond à ce libellé normalisé d'après les "
+    "suggestions de la base et la prédiction T5, sans marque, poids ni conditionnement."
+)
+
+
+class SimulatedResponse:
+    """Minimal httpx-like response carried by the injected errors."""
+
+    def __init__(self, status_code: int, headers: Dict[str, str]):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class SimulatedAPIError(Exception):
+    """Injected provider error, shaped like the Groq SDK errors (status_code, response.headers)."""
+
+    def __init__(self, status_code: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        self.response = SimulatedResponse(status_code, headers or {})
+
+
+def parse_item(content: str) -> Tuple[str, List[Tuple[str, float]], str]:
+    """(description, [(suggestion, score)], t5 guess) from one item's user content."""
+    description, suggestions, t5 = "", [], ""
+    for line in content.splitlines():
+        if line.startswith("Description:"):
+            description = line[len("Description:"):].strip()
+        elif line.startswith("Suggestions:"):
+            for part in line[len("Suggestions:"):].split(" | "):
+                match = _SUGGESTION_RE.match(part.strip())
+                if match and match.group(1):
+                    suggestions.append((match.group(1), float(match.group(2))))
+        elif line.startswith("T5:"):
+            match = _SUGGESTION_RE.match(line[len("T5:"):].strip())
+            t5 = match.group(1) if match else ""
+    return description, suggestions, t5
+
+
+class SimulatedChatModel:
+    """
+    Drop-in for ChatGroq in OrchestratorService: `invoke` / `ainvoke` take the
+    messages and return an AIMessage with `response_metadata["token_usage"]`.
+    """
+
+    def __init__(self,
+                 latency_dist: str = SIM_LLM_LATENCY_DIST,
+                 latency_mean_ms: float = SIM_LLM_LATENCY_MEAN_MS,
+                 latency_std_ms: float = SIM_LLM_LATENCY_STD_MS,
+                 tokens_per_second: float = SIM_LLM_TOKENS_PER_SECOND,
+                 reasoning_tokens: int = SIM_LLM_REASONING_TOKENS,
+                 error_rate: float = SIM_LLM_ERROR_RATE,
+                 rate_limit_rate: float = SIM_LLM_RATE_LIMIT_RATE,
+                 chatty_rate: float = SIM_LLM_CHATTY_RATE,
+                 suggestion_threshold: float = 0.82,
+                 seed: int = SIM_LLM_SEED,
+                 model_name: str = "simulated"):
+        self.latency_dist = latency_dist
+        self.latency_mean_ms = latency_mean_ms
+        self.latency_std_ms = latency_std_ms
+        self.tokens_per_second = tokens_per_second
+        self.reasoning_tokens = reasoning_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chatty_rate = chatty_rate
+        self.suggestion_threshold = suggestion_threshold
+        self.seed = seed
+        self.model_name = model_name
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors_injected": 0, "rate_limits_injected": 0}
+
+    # ---------- answers ----------
+
+    def decide(self, content: str) -> str:
+        """Label for one item: confident suggestion, else T5 guess, else the description."""
+        description, suggestions, t5 = parse_item(content)
+        if suggestions and suggestions[0][1] >= self.suggestion_threshold:
+            return suggestions[0][0]
+        if t5 and t5 != "None":
+            return t5
+        if suggestions:
+            return suggestions[0][0]
+        return normalize_designation(description) or "Produit non identifie"
+
+    def answer(self, user_content: str) -> str:
+        """Single label, or the JSON object of a packed request."""
+        positions = list(_ITEM_RE.finditer(user_content))
+        if not positions:
+            return self.decide(user_content)
+        labels = {}
+        for n, match in enumerate(positions):
+            end = positions[n + 1].start() if n + 1 < len(positions) else len(user_content)
+            labels[match.group(1)] = self.decide(user_content[match.end():end])
+        return json.dumps(labels, ensure_ascii=False)
+
+    # ---------- simulation ----------
+
+    def _rng(self, messages: list) -> random.Random:
+        """RNG seeded by the request and its attempt number (retries draw again)."""
+        digest = hashlib.sha256("\x1f".join(m.content for m in messages).encode("utf-8")).hexdigest()
+        with self._lock:
+            if len(self._attempts) > 100_000:
+                self._attempts.clear()
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.stats["calls"] += 1
+        return random.Random(f"{self.seed}:{digest}:{attempt}")
+
+    def _latency_ms(self, rng: random.Random) -> float:
+        mean, std = self.latency_mean_ms, self.latency_std_ms
+        if self.latency_dist == "uniform":
+            latency = rng.uniform(max(0.0, mean - std), mean + std)
+        elif self.latency_dist == "normal":
+            latency = rng.gauss(mean, std)
+        elif self.latency_dist == "lognormal" and mean > 0:
+            # Parameters chosen so the distribution has the requested mean and std
+            sigma2 = math.log(1 + (std / mean) ** 2)
+            latency = rng.lognormvariate(math.log(mean) - sigma2 / 2, sigma2 ** 0.5)
+        else:
+            latency = mean
+        return max(0.0, latency)
+
+    def _simulate(self, messages: list,
+                  max_tokens: Optional[int] = None) -> Tuple[float, Optional[Exception], Optional[Dict]]:
+        """Time to first token in seconds and either the injected error or the completion."""
+        rng = self._rng(messages)
+        draw = rng.random()
+        first_token_ms = self._latency_ms(rng)
+        if draw < self.rate_limit_rate:
+            with self._lock:
+                self.stats["rate_limits_injected"] += 1
+            retry_after = round(rng.uniform(0.5, 2.0), 2)
+            return first_token_ms / 1000, SimulatedAPIError(
+                429, "rate_limit_exceeded", {"retry-after": str(retry_after)}
+            ), None
+        if draw < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.stats["errors_injected"] += 1
+            return first_token_ms / 1000, SimulatedAPIError(503, "service_unavailable"), None
+
+        text = self.answer(messages[-1].content)
+        reasoning = int(rng.uniform(0.5, 1.5) * self.reasoning_tokens)
+        if rng.random() < self.chatty_rate:
+            text += _EXPLANATION
+        # Visible answer in ~LLM_CHARS_PER_TOKEN-character tokens
+        size = max(int(LLM_CHARS_PER_TOKEN), 1)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        finish_reason = "stop"
+        if max_tokens is not None and reasoning + len(pieces) > max_tokens:
+            # Reasoning comes first and may use the whole allowance
+            reasoning = min(reasoning, max_tokens)
+            pieces = pieces[:max_tokens - reasoning]
+            finish_reason = "length"
+        return first_token_ms / 1000, None, {
+            "prompt_tokens": int(sum(len(m.content) for m in messages) / LLM_CHARS_PER_TOKEN) + 4 * len(messages),
+            "reasoning_tokens": reasoning,
+            "pieces": pieces,
+            "finish_reason": finish_reason,
+        }
+
+    def _token_usage(self, completion: Dict, first_token_s: float) -> Dict:
+        completion_tokens = completion["reasoning_tokens"] + len(completion["pieces"])
+        completion_s = completion_tokens / max(self.tokens_per_second, 1.0)
+        return {
+            "prompt_tokens": completion["prompt_tokens"],
+            "completion_tokens": completion_tokens,
+            "total_tokens": completion["prompt_tokens"] + completion_tokens,
+            "queue_time": 0.0,
+            "prompt_time": round(first_token_s, 4),
+            "completion_time": round(completion_s, 4),
+            "total_time": round(first_token_s + completion_s, 4),
+        }
+
+    def _response(self, completion: Dict, first_token_s: float) -> AIMessage:
+        return AIMessage(
+            content="".join(completion["pieces"]),
+            response_metadata={
+                "token_usage": self._token_usage(completion, first_token_s),
+                "model_name": self.model_name,
+                "finish_reason": completion["finish_reason"],
+            },
+        )
+
+    def _chunks(self, completion: Dict, first_token_s: float) -> Iterator[AIMessageChunk]:
+        """Reasoning tokens, answer tokens, then the usage (as langchain streams from Groq)."""
+        for _ in range(completion["reasoning_tokens"]):
+            yield AIMessageChunk(content="", additional_kwargs={"reasoning_content": "…"})
+        for piece in completion["pieces"]:
+            yield AIMessageChunk(content=piece)
+        usage = self._token_usage(completion, first_token_s)
+        yield AIMessageChunk(
+            content="",
+            usage_metadata={
+                "input_tokens": usage["prompt_tokens"],
+                "output_tokens": usage["completion_tokens"],
+                "total_tokens": usage["total_tokens"],
+            },
+            response_metadata={"finish_reason": completion["finish_reason"], "model_name": self.model_name},
+        )
+
+    def invoke(self, messages: list, max_tokens: Optional[int] = None, **kwargs) -> AIMessage:
+        first_token_s, error, completion = self._simulate(messages, max_tokens)
+        if error is not None:
+            time.sleep(first_token_s)
+            raise error
+        response = self._response(completion, first_token_s)
+        time.sleep(response.response_metadata["token_usage"]["total_time"])
+        return response
+
+    async def ainvoke(self, messages: list, max_tokens: Optional[int] = None, **kwargs) -> AIMessage:
+        first_token_s, error, completion = self._simulate(messages, max_tokens)
+        if error is not None:
+            await asyncio.sleep(first_token_s)
+            raise error
+        response = self._response(completion, first_token_s)
+        await asyncio.sleep(response.response_metadata["token_usage"]["total_time"])
+        return response
+
+    def stream(self, messages: list, max_tokens: Optional[int] = None, **kwargs) -> Iterator[AIMessageChunk]:
+        first_token_s, error, completion = self._simulate(messages, max_tokens)
+        time.sleep(first_token_s)
+        if error is not None:
+            raise error
+        token_s = 1 / max(self.tokens_per_second, 1.0)
+        for n, chunk in enumerate(self._chunks(completion, first_token_s)):
+            if n:
+                time.sleep(token_s)
+            yield chunk
+
+    async def astream(self, messages: list, max_tokens: Optional[int] = None,
+                      **kwargs) -> AsyncIterator[AIMessageChunk]:
+        first_token_s, error, completion = self._simulate(messages, max_tokens)
+        await asyncio.sleep(first_token_s)
+        if error is not None:
+            raise error
+        token_s = 1 / max(self.tokens_per_second, 1.0)
+        for n, chunk in enumerate(self._chunks(completion, first_token_s)):
+            if n:
+                await asyncio.sleep(token_s)
+            yield chunk
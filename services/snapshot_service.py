@@ -0,0 +1,413 @@
+"""
+Versioned snapshots of the local lookup structures.
+
+The offline builder streams the labeled CSV in chunks (two passes: statistics,
+then encoding) and writes one directory per version:
+
+    <root>/<version>/manifest.json   sources, counts, components, build time
+    <root>/<version>/documents/      labels + descriptions string tables (label id per description)
+    <root>/<version>/exact/          exact-match catalog tables (see catalog_table)
+    <root>/<version>/ngram/          idf + CSR matrix of the n-gram index, raw arrays
+    <root>/<version>/vector/         embedder + quantized vector index (optional)
+    <root>/CURRENT                   name of the version to serve
+
+A version is written under a temporary name and renamed when complete, and
+CURRENT is replaced with os.replace, so readers never see a partial snapshot.
+The service opens every array with mmap: startup cost does not depend on the
+catalog size (the fuzzy matcher still normalizes its choices once).
+`switch_to_current()` swaps the loaded indexes and the fuzzy matcher for the
+version CURRENT points to.
+
+    python -m services.snapshot_service build --labeled labeled_products_filtered.csv --out snapshots
+    python -m services.snapshot_service list --out snapshots
+    python -m services.snapshot_service activate <version> --out snapshots
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from services.catalog_table import StringTableWriter, add_key_votes, write_catalog_tables
+from utils.config_validator import SNAPSHOT_ROOT
+from utils.text_normalization import normalize_series
+
+SNAPSHOT_FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+
+_switch_lock = threading.Lock()
+_active = {"version": None, "switched_at": None}
+
+
+# ----- reading -----
+
+def current_version(root: str = SNAPSHOT_ROOT) -> Optional[str]:
+    """Version CURRENT points to, or None without snapshots."""
+    if not root:
+        return None
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version if version and os.path.isdir(os.path.join(root, version)) else None
+
+
+def read_manifest(snapshot_dir: str) -> Dict:
+    with open(os.path.join(snapshot_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format in {snapshot_dir}: {manifest.get('format_version')}")
+    return manifest
+
+
+def current_snapshot_dir(component: str, root: str = SNAPSHOT_ROOT) -> Optional[str]:
+    """Directory of the current snapshot when it contains `component`, else None."""
+    version = current_version(root)
+    if version is None:
+        return None
+    snapshot_dir = os.path.join(root, version)
+    try:
+        manifest = read_manifest(snapshot_dir)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Snapshot {version} unusable: {e}")
+        return None
+    return snapshot_dir if component in manifest["components"] else None
+
+
+def list_snapshots(root: str = SNAPSHOT_ROOT) -> List[Dict]:
+    """Manifests of the complete snapshots under root, oldest first."""
+    snapshots = []
+    for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isfile(os.path.join(path, "manifest.json")):
+            continue
+        snapshots.append(read_manifest(path))
+    return snapshots
+
+
+# ----- switching -----
+
+def activate(version: str, root: str = SNAPSHOT_ROOT) -> None:
+    """Point CURRENT to `version` (atomic replace)."""
+    read_manifest(os.path.join(root, version))
+    # Per process and thread, so concurrent activations never share the temporary file
+    tmp_path = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}.{threading.get_ident()}")
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def switch_to_current() -> Dict:
+    """
+    Load the version CURRENT points to and swap it in. Each index is fully
+    opened before its singleton is replaced, so requests keep using the old
+    one until the assignment; indexes never loaded stay lazy.
+    """
+    from services.exact_match_service import ExactMatchIndex
+    from services.fuzzy_service import FuzzyLabelMatcher
+    from services.local_index_service import LocalSuggestionIndex
+    from services.vector_index_service import VectorSuggestionIndex
+
+    with _switch_lock:
+        version = current_version()
+        if version is None or version == _active["version"]:
+            return snapshot_status()
+
+        print(f"🔄 Switching to snapshot {version}...")
+        if ExactMatchIndex._instance is not None:
+            ExactMatchIndex._instance.reload()
+        for cls, component in (
+            (FuzzyLabelMatcher, "documents"),
+            (LocalSuggestionIndex, "ngram"),
+            (VectorSuggestionIndex, "vector"),
+        ):
+            old = cls._instance
+            if old is None:
+                continue
+            snapshot_dir = current_snapshot_dir(component)
+            if snapshot_dir is None:
+                continue
+            cls._instance = cls(snapshot_dir=snapshot_dir)
+            old.close()
+        _active.update(version=version, switched_at=time.time())
+        print(f"✅ Snapshot {version} active")
+        return snapshot_status()
+
+
+def mark_active(version: Optional[str]) -> None:
+    """Record the version loaded at startup."""
+    if version is not None and _active["version"] is None:
+        _active.update(version=version, switched_at=time.time())
+
+
+def snapshot_status() -> Dict:
+    return {
+        "root": SNAPSHOT_ROOT,
+        "current": current_version(),
+        "active": _active["version"],
+        "switched_at": _active["switched_at"],
+    }
+
+
+# ----- building -----
+
+def _file_fingerprint(path: str) -> Dict:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "bytes": stat.st_size, "mtime": stat.st_mtime, "sha256": digest.hexdigest()}
+
+
+def _read_chunks(path: str, chunk_size: int):
+    """Labeled rows in chunks, with empty descriptions / labels dropped."""
+    for chunk in pd.read_csv(path, usecols=["description_cleaned", "nature_product"], chunksize=chunk_size):
+        chunk = chunk.dropna()
+        chunk = chunk[(chunk["description_cleaned"].str.strip() != "") & (chunk["nature_product"].str.strip() != "")]
+        if len(chunk):
+            yield chunk
+
+
+class _RawArrayWriter:
+    """Append-only raw array file, opened later with np.memmap."""
+
+    def __init__(self, path: str, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._file = open(path, "wb")
+
+    def append(self, values: np.ndarray) -> None:
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self._file.write(values.tobytes())
+        self.length += len(values)
+
+    def close(self) -> Dict:
+        self._file.close()
+        return {"file": os.path.basename(self.path), "dtype": self.dtype.str, "length": self.length}
+
+
+def _claim_version(root: str) -> Tuple[str, str]:
+    """
+    Name of a new version (UTC time to the microsecond) and its temporary
+    directory. The directory is created exclusively, so concurrent builds
+    never share a version even within the same microsecond.
+    """
+    os.makedirs(root, exist_ok=True)
+    while True:
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        tmp_dir = os.path.join(root, f".tmp-{version}")
+        if os.path.exists(os.path.join(root, version)):
+            continue
+        try:
+            os.makedirs(tmp_dir)
+        except FileExistsError:
+            continue
+        return version, tmp_dir
+
+
+def build_snapshot(labeled_path: str,
+                   root: str,
+                   nature_path: Optional[str] = None,
+                   chunk_size: int = 100_000,
+                   with_vector: bool = False,
+                   activate_when_done: bool = True) -> str:
+    """Build a new snapshot version under root; returns its directory."""
+    from services.local_index_service import LocalSuggestionIndex
+    from services.vector_index_service import TextEmbedder, QuantizedVectorIndex
+    from utils.config_validator import (
+        VECTOR_INDEX_QUANTIZATION,
+        VECTOR_INDEX_NLIST,
+        VECTOR_INDEX_NPROBE,
+        VECTOR_INDEX_PQ_SUBSPACES,
+        VECTOR_INDEX_RERANK,
+    )
+
+    started = time.perf_counter()
+    version, tmp_dir = _claim_version(root)
+    for sub in ("documents", "exact", "ngram"):
+        os.makedirs(os.path.join(tmp_dir, sub))
+
+    vectorizer = LocalSuggestionIndex.make_vectorizer()
+    n_features = LocalSuggestionIndex.N_FEATURES
+    embedder = TextEmbedder() if with_vector else None
+    rng = np.random.default_rng(0)
+    sample_size = 200_000
+
+    # Pass 1: label set, exact-match votes, document frequencies, embedder sample
+    labels = set()
+    if nature_path:
+        labels.update(pd.read_csv(nature_path, usecols=["nature_product"])["nature_product"].dropna())
+    votes = defaultdict(Counter)
+    document_frequency = np.zeros(n_features, dtype=np.int64)
+    embedder_frequency = np.zeros(TextEmbedder.N_FEATURES, dtype=np.int64) if with_vector else None
+    embedder_sample: List[str] = []
+    n_rows = 0
+    for chunk in _read_chunks(labeled_path, chunk_size):
+        keys = normalize_series(chunk["description_cleaned"])
+        add_key_votes(votes, keys, chunk["nature_product"])
+        labels.update(chunk["nature_product"])
+        counts = vectorizer.transform(keys)
+        document_frequency += np.bincount(counts.indices, minlength=n_features)
+        if with_vector:
+            descriptions = chunk["description_cleaned"].tolist()
+            embedder_frequency += embedder.document_frequency(descriptions)
+            # Reservoir sample for the SVD fit
+            for description in descriptions:
+                n_rows += 1
+                if len(embedder_sample) < sample_size:
+                    embedder_sample.append(description)
+                else:
+                    slot = rng.integers(0, n_rows)
+                    if slot < sample_size:
+                        embedder_sample[slot] = description
+        else:
+            n_rows += len(chunk)
+
+    # Labels are keys of themselves and documents of their own
+    label_list = sorted(labels)
+    label_ids = {label: i for i, label in enumerate(label_list)}
+    label_keys = normalize_series(pd.Series(label_list, dtype=object))
+    add_key_votes(votes, label_keys, label_list)
+    exact_meta = write_catalog_tables(votes, label_list, os.path.join(tmp_dir, "exact"))
+    del votes
+    label_counts = vectorizer.transform(label_keys)
+    document_frequency += np.bincount(label_counts.indices, minlength=n_features)
+    n_documents = n_rows + len(label_list)
+    idf = (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+    np.save(os.path.join(tmp_dir, "ngram", "idf.npy"), idf)
+
+    if with_vector:
+        embedder_frequency += embedder.document_frequency(label_list)
+        embedder.fit(embedder_sample + label_list, document_frequency=embedder_frequency, n_documents=n_documents)
+        embedder.save(os.path.join(tmp_dir, "vector", "embedder"))
+        del embedder_sample
+        vector_store = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, "vector", "float.npy"), mode="w+", dtype=np.float32,
+            shape=(n_documents, embedder.dim),
+        )
+
+    # Pass 2: documents table, weighted CSR rows, embeddings
+    labels_writer = StringTableWriter(os.path.join(tmp_dir, "documents"), "labels")
+    labels_writer.append(label_list)
+    labels_writer.close()
+    descriptions_writer = StringTableWriter(os.path.join(tmp_dir, "documents"), "descriptions", index=False)
+    data_writer = _RawArrayWriter(os.path.join(tmp_dir, "ngram", "data.f32"), np.float32)
+    indices_writer = _RawArrayWriter(os.path.join(tmp_dir, "ngram", "indices.i32"), np.int32)
+    indptr = [np.zeros(1, dtype=np.int64)]
+    nnz = 0
+    row = 0
+
+    def add_documents(descriptions: List[str], keys: pd.Series, ids: List[int]) -> None:
+        nonlocal nnz, row
+        descriptions_writer.append(descriptions, ids)
+        weighted = LocalSuggestionIndex.weight_counts(vectorizer.transform(keys), idf)
+        data_writer.append(weighted.data)
+        indices_writer.append(weighted.indices)
+        indptr.append(weighted.indptr[1:].astype(np.int64) + nnz)
+        nnz += weighted.nnz
+        if with_vector:
+            vector_store[row:row + len(descriptions)] = embedder.transform(descriptions)
+        row += len(descriptions)
+
+    for chunk in _read_chunks(labeled_path, chunk_size):
+        add_documents(
+            chunk["description_cleaned"].tolist(),
+            normalize_series(chunk["description_cleaned"]),
+            [label_ids[label] for label in chunk["nature_product"]],
+        )
+    add_documents(label_list, label_keys, list(range(len(label_list))))
+    descriptions_writer.close()
+
+    # int32 indptr when possible: scipy would otherwise upcast (copy) the indices
+    indptr = np.concatenate(indptr)
+    indptr = indptr.astype(np.int32) if nnz < np.iinfo(np.int32).max else indptr
+    np.save(os.path.join(tmp_dir, "ngram", "indptr.npy"), indptr)
+    ngram_meta = {
+        "n_features": n_features,
+        "documents": row,
+        "nnz": nnz,
+        "data": data_writer.close(),
+        "indices": indices_writer.close(),
+    }
+    with open(os.path.join(tmp_dir, "ngram", "ngram.json"), "w") as f:
+        json.dump(ngram_meta, f, indent=2)
+
+    components = {
+        "documents": {"documents": row, "labels": len(label_list)},
+        "exact": exact_meta,
+        "ngram": {"nnz": nnz},
+    }
+    if with_vector:
+        vector_store.flush()
+        del vector_store
+        vectors = np.load(os.path.join(tmp_dir, "vector", "float.npy"), mmap_mode="r")
+        index = QuantizedVectorIndex(
+            quantization=VECTOR_INDEX_QUANTIZATION,
+            nlist=VECTOR_INDEX_NLIST,
+            nprobe=VECTOR_INDEX_NPROBE,
+            pq_subspaces=VECTOR_INDEX_PQ_SUBSPACES,
+            rerank=VECTOR_INDEX_RERANK,
+        ).build(vectors)
+        index.save(os.path.join(tmp_dir, "vector"))
+        components["vector"] = {"quantization": index.quantization, **index.memory_report()}
+
+    sources = [_file_fingerprint(labeled_path)] + ([_file_fingerprint(nature_path)] if nature_path else [])
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "build_seconds": round(time.perf_counter() - started, 1),
+        "sources": sources,
+        "rows": n_rows,
+        "components": components,
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    snapshot_dir = os.path.join(root, version)
+    os.rename(tmp_dir, snapshot_dir)
+    if activate_when_done:
+        activate(version, root)
+    print(f"✅ Snapshot {version} written to {snapshot_dir} ({manifest['build_seconds']}s)")
+    return snapshot_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and manage local index snapshots")
+    parser.add_argument("command", choices=["build", "list", "activate"])
+    parser.add_argument("version", nargs="?", help="Version to activate")
+    parser.add_argument("--out", default=SNAPSHOT_ROOT or "snapshots", help="Snapshot root directory")
+    parser.add_argument("--labeled", default="labeled_products_filtered.csv")
+    parser.add_argument("--nature", default=None, help="Optional nature_product.csv with extra labels")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--vector", action="store_true", help="Also build the quantized vector index")
+    parser.add_argument("--no-activate", action="store_true", help="Do not point CURRENT to the new version")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_snapshot(args.labeled, args.out, args.nature, args.chunk_size, args.vector, not args.no_activate)
+    elif args.command == "list":
+        current = current_version(args.out)
+        for manifest in list_snapshots(args.out):
+            marker = "*" if manifest["version"] == current else " "
+            print(f"{marker} {manifest['version']}  rows={manifest['rows']}  "
+                  f"components={','.join(manifest['components'])}  built in {manifest['build_seconds']}s")
+    else:
+        if not args.version:
+            parser.error("activate needs a version")
+        activate(args.version, args.out)
+        print(f"CURRENT -> {args.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from utils.text_normalization import normalize_designation
+from utils.config_validator import (
+    ENABLE_WEB_CONTEXT,
+    LLM_SPECULATIVE_REASK_T5_CONF,
+    LLM_SPECULATIVE_WORKERS,
+)
+
+# Speculations nobody claimed (request failed or ended elsewhere) are dropped after this
+_MAX_AGE_S = 300.0
+
+
+class SpeculativeArbitrator:
+    """
+    Early LLM arbitration for designations the database barely matched.
+
+    `launch` starts the arbitration in a worker thread right after the
+    database stage, without the T5 guess, so it runs while T5 generates.
+    When T5 is then confident the speculation is discarded (`discard`); when
+    the request reaches the orchestrator, `claim` returns the speculative
+    decision unless T5 brought a new, fairly confident label, in which case
+    the caller asks again with it. Discarded and re-asked calls are counted,
+    with their cost, as wasted.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=LLM_SPECULATIVE_WORKERS, thread_name_prefix="speculative_llm")
+        # normalized designation -> (future, launch time)
+        self._pending: Dict[str, Tuple[Future, float]] = {}
+        self._pending_lock = threading.Lock()
+        self._counters_lock = threading.Lock()
+        self._counters = {
+            "launched": 0,
+            "reused": 0,
+            "reasked": 0,
+            "discarded": 0,
+            "failed": 0,
+            "expired": 0,
+            "wasted_calls": 0,
+            "wasted_cost_usd": 0.0,
+        }
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _count(self, name: str, cost: float = 0.0) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+            if name in ("discarded", "reasked"):
+                self._counters["wasted_calls"] += 1
+                self._counters["wasted_cost_usd"] += cost
+
+    @staticmethod
+    def _arbitrate(description: str, api_suggestions: List[Dict]) -> Tuple[str, dict]:
+        # Lazy imports to avoid circular imports
+        from services.llm_service import OrchestratorService
+        web_context = None
+        if ENABLE_WEB_CONTEXT:
+            from services.web_context_service import WebContextService
+            web_context = WebContextService.get_instance().get(description)
+        return OrchestratorService.get_instance().arbitrate(
+            description=description,
+            t5_suggestion=None,
+            t5_confidence=0.0,
+            api_suggestions=api_suggestions,
+            web_context=web_context,
+        )
+
+    def launch(self, description: str, api_suggestions: List[Dict]) -> bool:
+        """Start the early arbitration; False if one is already running for this designation."""
+        key = normalize_designation(description)
+        if not key:
+            return False
+        now = time.monotonic()
+        with self._pending_lock:
+            for stale in [k for k, (_, t) in self._pending.items() if now - t > _MAX_AGE_S]:
+                self._pending.pop(stale)
+                self._count("expired")
+            if key in self._pending:
+                return False
+            future = self._executor.submit(self._arbitrate, description, list(api_suggestions or []))
+            self._pending[key] = (future, now)
+        self._count("launched")
+        return True
+
+    def _take(self, description: str) -> Optional[Future]:
+        with self._pending_lock:
+            entry = self._pending.pop(normalize_designation(description), None)
+        return entry[0] if entry else None
+
+    def discard(self, description: str) -> bool:
+        """T5 settled the item: drop its speculation (its cost is counted as wasted once known)."""
+        future = self._take(description)
+        if future is None:
+            return False
+        # Still queued: cancelled for free. Running: it cannot be recalled, book its cost when it lands
+        future.cancel()
+        future.add_done_callback(lambda f: self._count("discarded", self._cost_of(f)))
+        return True
+
+    @staticmethod
+    def _cost_of(future: Future) -> float:
+        if future.cancelled() or future.exception() is not None:
+            return 0.0
+        _, cost_info = future.result()
+        return (cost_info or {}).get("total_cost_usd", 0.0)
+
+    @staticmethod
+    def changes_picture(speculative_label: str, api_suggestions: List[Dict],
+                        t5_prediction: Optional[str], t5_confidence: Optional[float]) -> bool:
+        """
+        Whether the T5 guess is news to the speculative answer: a label that is
+        neither that answer nor one of the suggestions it saw, with at least
+        LLM_SPECULATIVE_REASK_T5_CONF confidence.
+        """
+        if not t5_prediction or (t5_confidence or 0.0) < LLM_SPECULATIVE_REASK_T5_CONF:
+            return False
+        seen = {normalize_designation(s.get("nature_product")) for s in (api_suggestions or [])[:3]}
+        seen.add(normalize_designation(speculative_label))
+        return normalize_designation(t5_prediction) not in seen
+
+    def _settle(self, future: Future, state: Dict) -> Tuple[str, Optional[Tuple[str, dict]]]:
+        """('reused' | 'reasked', speculative decision) or ('failed', None) for a finished speculation."""
+        try:
+            label, cost_info = future.result()
+        except Exception as e:
+            print(f"⚠️ Speculative arbitration failed: {e}")
+            self._count("failed")
+            return "failed", None
+        if self.changes_picture(label, state.get("api_suggestions"),
+                                state.get("t5_prediction"), state.get("t5_confidence")):
+            self._count("reasked", (cost_info or {}).get("total_cost_usd", 0.0))
+            return "reasked", (label, cost_info)
+        self._count("reused")
+        return "reused", (label, cost_info)
+
+    def claim(self, state: Dict) -> Tuple[Optional[str], Optional[Tuple[str, dict]]]:
+        """
+        Outcome of the speculation for this request (waits for it): (None, None)
+        when none was launched, else _settle's outcome. On 'reasked' the
+        decision is returned only so that its cost can be reported.
+        """
+        future = self._take(state["description"])
+        if future is None:
+            return None, None
+        return self._settle(future, state)
+
+    async def aclaim(self, state: Dict) -> Tuple[Optional[str], Optional[Tuple[str, dict]]]:
+        """Async claim: waits on the event loop."""
+        future = self._take(state["description"])
+        if future is None:
+            return None, None
+        try:
+            await asyncio.wrap_future(future)
+        except Exception:
+            pass
+        return self._settle(future, state)
+
+    def stats(self) -> Dict:
+        with self._pending_lock:
+            pending = len(self._pending)
+        with self._counters_lock:
+            counters = dict(self._counters)
+        counters["wasted_cost_usd"] = round(counters["wasted_cost_usd"], 6)
+        return {**counters, "pending": pending}
@@ -2,9 +2,10 @@ import torch
 import os
 import threading
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from transformers.modeling_outputs import BaseModelOutput
 from peft import PeftModel
 from huggingface_hub import HfFolder
-from typing import Tuple
+from typing import List, Tuple
 import config as _cfg
 
 
@@ -86,6 +87,7 @@ class T5ModelService:
             raise
 
         self.prefix = "Extraire nom canonique (Food/Nettoyage) :"
+        self._inference_lock = threading.Lock()
         self._initialized = True
         print("✅ T5 Model loaded and ready for inference!")
 
@@ -104,8 +106,8 @@ class T5ModelService:
         if not hasattr(self, 'model') or self.model is None:
             raise RuntimeError("Model not initialized. Call get_instance() first.")
         
-        # Thread-safe prediction with lock to avoid concurrent conflicts
-        with threading.Lock():
+        # One inference at a time on the shared model (score_candidates uses the same lock)
+        with self._inference_lock:
             input_text = f"{self.prefix}{description}"
             inputs = self.tokenizer(input_text, return_tensors="pt").to(self.device)
 
@@ -132,4 +134,51 @@ class T5ModelService:
         gathered_probs = torch.gather(probs, 2, token_ids).squeeze(-1)
         confidence = gathered_probs.mean().item()
         
-        return prediction, confidence
\ No newline at end of file
+        return prediction, confidence
+
+    def score_candidates(self, description: str, candidates: List[str]) -> List[float]:
+        """
+        Score candidate labels with teacher-forced log-likelihood.
+
+        The description is encoded once and every candidate is decoded in a
+        single batched forward pass. Returns the mean per-token log-likelihood
+        of each candidate followed by EOS (appended here, so a label does not
+        score like the longer labels it is a prefix of), in the order of
+        `candidates`.
+        """
+        if not hasattr(self, 'model') or self.model is None:
+            raise RuntimeError("Model not initialized. Call get_instance() first.")
+        if not candidates:
+            return []
+
+        input_text = f"{self.prefix}{description}"
+        inputs = self.tokenizer(input_text, return_tensors="pt").to(self.device)
+        # EOS appended explicitly: it is what sets a label apart from its own prefixes
+        eos = self.tokenizer.eos_token_id
+        sequences = [
+            ids + ([eos] if eos is not None else [])
+            for ids in self.tokenizer(text_target=candidates, add_special_tokens=False).input_ids
+        ]
+        lengths = torch.tensor([len(ids) for ids in sequences])
+        labels = torch.full((len(sequences), int(lengths.max())), self.tokenizer.pad_token_id, dtype=torch.long)
+        for row, ids in enumerate(sequences):
+            labels[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        labels = labels.to(self.device)
+        label_mask = (torch.arange(labels.shape[1]) < lengths.unsqueeze(1)).to(self.device)
+
+        with self._inference_lock, torch.no_grad():
+            encoder_outputs = self.model.get_encoder()(**inputs)
+            batch_size = labels.shape[0]
+            hidden = encoder_outputs.last_hidden_state.expand(batch_size, -1, -1)
+            outputs = self.model(
+                encoder_outputs=BaseModelOutput(last_hidden_state=hidden),
+                attention_mask=inputs["attention_mask"].expand(batch_size, -1),
+                labels=labels.masked_fill(~label_mask, -100)
+            )
+
+        log_probs = torch.log_softmax(outputs.logits.float(), dim=-1)
+        token_log_probs = torch.gather(log_probs, 2, labels.unsqueeze(-1)).squeeze(-1)
+        token_log_probs = token_log_probs * label_mask
+        mean_log_probs = token_log_probs.sum(dim=1) / label_mask.sum(dim=1).clamp(min=1)
+
+        return mean_log_probs.tolist()
@@ -0,0 +1,558 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from typing import Dict, List, Optional, Tuple
+from utils.config_validator import (
+    LOCAL_INDEX_DATA_PATH,
+    LOCAL_INDEX_TOP_K,
+    ENABLE_LABEL_WRITEBACK,
+    VECTOR_INDEX_DIM,
+    VECTOR_INDEX_QUANTIZATION,
+    VECTOR_INDEX_NLIST,
+    VECTOR_INDEX_NPROBE,
+    VECTOR_INDEX_PQ_SUBSPACES,
+    VECTOR_INDEX_RERANK,
+    VECTOR_INDEX_FLOAT_STORE,
+)
+from utils.text_normalization import normalize_many
+from services.snapshot_service import current_snapshot_dir
+
+QUANTIZATIONS = ("float", "int8", "pq")
+
+
+class QuantizedVectorIndex:
+    """
+    Approximate inner-product search over L2-normalized float32 vectors.
+
+    - IVF: vectors are partitioned by spherical k-means into `nlist` lists; a
+      query only scans the `nprobe` lists whose centroids are closest.
+    - Codes: "float" (4 bytes/dim), "int8" scalar quantization (1 byte/dim,
+      one scale per dimension) or "pq" product quantization (1 byte per
+      subspace, 256 centroids each, scored with lookup tables).
+    - Rerank: the `rerank` best approximate candidates are rescored exactly
+      against the float vectors, which may live in a memory-mapped file so
+      only the shortlisted rows are paged in.
+    """
+
+    def __init__(self,
+                 quantization: str = "int8",
+                 nlist: int = 0,
+                 nprobe: int = 8,
+                 pq_subspaces: int = 16,
+                 rerank: int = 100,
+                 seed: int = 0):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+        self.quantization = quantization
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_subspaces = pq_subspaces
+        self.rerank = rerank
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None     # (nlist, d) normalized
+        self.list_offsets: Optional[np.ndarray] = None  # (nlist + 1,) into ids / codes
+        self.ids: Optional[np.ndarray] = None           # (n,) row of the vector stored at each position
+        self.codes: Optional[np.ndarray] = None         # (n, d) float32 / int8, or (n, m) uint8
+        self.scale: Optional[np.ndarray] = None         # int8: (d,) per-dimension scale
+        self.pq_codebooks: Optional[np.ndarray] = None  # pq: (m, 256, d / m)
+        self.pq_centroids = 256                         # pq: trained centroids per subspace (< 256 on tiny sets)
+        self.float_vectors: Optional[np.ndarray] = None  # (n, d) exact vectors, in row order
+
+    # ----- build -----
+
+    def build(self,
+              vectors: np.ndarray,
+              float_store_path: Optional[str] = None,
+              chunk_size: int = 65536,
+              sample_size: int = 100_000) -> "QuantizedVectorIndex":
+        """
+        Partition and encode `vectors` (rows L2-normalized). A memory-mapped
+        input is read chunk by chunk: only the codes are materialized.
+        """
+        n, dim = vectors.shape
+        if n == 0:
+            raise ValueError("Cannot build a vector index without vectors")
+        if not isinstance(vectors, np.memmap):
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if float_store_path:
+            store = np.lib.format.open_memmap(float_store_path, mode="w+", dtype=np.float32, shape=(n, dim))
+            for start in range(0, n, chunk_size):
+                store[start:start + chunk_size] = vectors[start:start + chunk_size]
+            store.flush()
+            del store
+            vectors = np.load(float_store_path, mmap_mode="r")
+        self.float_vectors = vectors
+
+        # Centroids and codebooks are trained on a sample
+        rng = np.random.default_rng(self.seed)
+        sample_rows = np.arange(n) if n <= sample_size else np.sort(rng.choice(n, sample_size, replace=False))
+        sample = np.ascontiguousarray(vectors[sample_rows], dtype=np.float32)
+
+        nlist = min(self.nlist or max(1, int(np.sqrt(n))), n)
+        if nlist > 1:
+            self.centroids = self._kmeans(sample, min(nlist, len(sample)), spherical=True)
+            assignments = self._assign(vectors, self.centroids, chunk_size)
+        else:
+            self.centroids = normalize(sample.mean(axis=0, keepdims=True)).astype(np.float32)
+            assignments = np.zeros(n, dtype=np.int64)
+        self.ids = np.argsort(assignments, kind="stable").astype(np.int64)
+        self.list_offsets = np.searchsorted(
+            assignments[self.ids], np.arange(len(self.centroids) + 1)
+        ).astype(np.int64)
+        position_of_row = np.empty(n, dtype=np.int64)
+        position_of_row[self.ids] = np.arange(n)
+
+        if self.quantization == "int8":
+            abs_max = np.zeros(dim, dtype=np.float32)
+            for start in range(0, n, chunk_size):
+                abs_max = np.maximum(abs_max, np.abs(vectors[start:start + chunk_size]).max(axis=0))
+            self.scale = (abs_max / 127).astype(np.float32)
+            self.scale[self.scale == 0] = 1.0
+        elif self.quantization == "pq":
+            self._train_pq(sample)
+
+        width = self.pq_subspaces if self.quantization == "pq" else dim
+        dtype = {"float": np.float32, "int8": np.int8, "pq": np.uint8}[self.quantization]
+        self.codes = np.empty((n, width), dtype=dtype)
+        # Codes are stored list by list, so a probed list is one contiguous block
+        for start in range(0, n, chunk_size):
+            block = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+            self.codes[position_of_row[start:start + len(block)]] = self._encode(block)
+        return self
+
+    def _encode(self, block: np.ndarray) -> np.ndarray:
+        if self.quantization == "float":
+            return block
+        if self.quantization == "int8":
+            return np.clip(np.rint(block / self.scale), -127, 127).astype(np.int8)
+        return self._pq_encode(block)
+
+    def _kmeans(self, vectors: np.ndarray, n_clusters: int, spherical: bool) -> np.ndarray:
+        """k-means centers of `vectors` (callers pass a sample)."""
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            random_state=self.seed,
+            batch_size=max(1024, 4 * n_clusters),
+            n_init=3,
+        ).fit(vectors)
+        centers = kmeans.cluster_centers_.astype(np.float32)
+        return normalize(centers) if spherical else centers
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        return np.concatenate([
+            (np.asarray(vectors[start:start + chunk_size]) @ centroids.T).argmax(axis=1)
+            for start in range(0, len(vectors), chunk_size)
+        ])
+
+    def _train_pq(self, vectors: np.ndarray) -> None:
+        dim = vectors.shape[1]
+        if dim % self.pq_subspaces:
+            raise ValueError(f"Dimension {dim} is not divisible by {self.pq_subspaces} PQ subspaces")
+        sub_dim = dim // self.pq_subspaces
+        n_centroids = min(256, len(vectors))
+        self.pq_centroids = n_centroids
+        codebooks = np.zeros((self.pq_subspaces, 256, sub_dim), dtype=np.float32)
+        for m in range(self.pq_subspaces):
+            sub = np.ascontiguousarray(vectors[:, m * sub_dim:(m + 1) * sub_dim])
+            codebooks[m, :n_centroids] = self._kmeans(sub, n_centroids, spherical=False)
+        self.pq_codebooks = codebooks
+
+    def _pq_encode(self, vectors: np.ndarray) -> np.ndarray:
+        n_sub, _, sub_dim = self.pq_codebooks.shape
+        codes = np.empty((len(vectors), n_sub), dtype=np.uint8)
+        for m in range(n_sub):
+            sub = vectors[:, m * sub_dim:(m + 1) * sub_dim]
+            book = self.pq_codebooks[m, :self.pq_centroids]
+            # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+            scores = sub @ book.T - 0.5 * (book ** 2).sum(axis=1)
+            codes[:, m] = scores.argmax(axis=1)
+        return codes
+
+    # ----- search -----
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        """Positions (into ids / codes) of the vectors in the nprobe closest lists."""
+        nprobe = min(self.nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        ranges = [np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in lists]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def _approximate_scores(self, query: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        codes = self.codes[positions]
+        if self.quantization == "float":
+            return codes @ query
+        if self.quantization == "int8":
+            # q . (codes * scale) == (q * scale) . codes
+            return codes.astype(np.float32) @ (query * self.scale)
+        n_sub, _, sub_dim = self.pq_codebooks.shape
+        tables = np.einsum("mkd,md->mk", self.pq_codebooks, query.reshape(n_sub, sub_dim))
+        return tables[np.arange(n_sub), codes].sum(axis=1)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids and exact scores of the k best vectors for one normalized query."""
+        query = np.asarray(query, dtype=np.float32)
+        positions = self._candidates(query)
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        approx = self._approximate_scores(query, positions)
+
+        shortlist_size = min(len(positions), max(k, self.rerank))
+        best = np.argpartition(-approx, shortlist_size - 1)[:shortlist_size]
+        # Sorted rows keep the reads of a memory-mapped float store sequential
+        rows = np.sort(self.ids[positions[best]])
+        exact = np.asarray(self.float_vectors[rows]) @ query
+        top = np.argsort(-exact)[:k]
+        return rows[top], exact[top]
+
+    def search_many(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        return [self.search(q, k) for q in queries]
+
+    # ----- persistence -----
+
+    _ARRAYS = ("centroids", "list_offsets", "ids", "codes", "scale", "pq_codebooks")
+
+    def save(self, directory: str) -> None:
+        """Write the index as .npy files (float vectors as float.npy unless already stored there)."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(os.path.join(directory, f"{name}.npy"), array)
+        float_path = os.path.join(directory, "float.npy")
+        if getattr(self.float_vectors, "filename", None) != os.path.abspath(float_path):
+            np.save(float_path, self.float_vectors)
+        params = {
+            "quantization": self.quantization,
+            "nprobe": self.nprobe,
+            "pq_subspaces": self.pq_subspaces,
+            "pq_centroids": self.pq_centroids,
+            "rerank": self.rerank,
+            "seed": self.seed,
+        }
+        with open(os.path.join(directory, "index.json"), "w") as f:
+            json.dump(params, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, nprobe: Optional[int] = None, rerank: Optional[int] = None) -> "QuantizedVectorIndex":
+        """Open a saved index; codes and float vectors are memory-mapped."""
+        with open(os.path.join(directory, "index.json")) as f:
+            params = json.load(f)
+        index = cls(
+            quantization=params["quantization"],
+            nprobe=nprobe or params["nprobe"],
+            pq_subspaces=params["pq_subspaces"],
+            rerank=rerank or params["rerank"],
+            seed=params["seed"],
+        )
+        index.pq_centroids = params["pq_centroids"]
+        for name in cls._ARRAYS:
+            path = os.path.join(directory, f"{name}.npy")
+            if os.path.exists(path):
+                setattr(index, name, np.load(path, mmap_mode="r" if name in ("codes", "ids") else None))
+        index.float_vectors = np.load(os.path.join(directory, "float.npy"), mmap_mode="r")
+        index.nlist = len(index.centroids)
+        return index
+
+    # ----- reports -----
+
+    def memory_report(self) -> Dict[str, int]:
+        """Bytes held by the search structures, and by the float vectors used for reranking."""
+        index_bytes = self.codes.nbytes + self.centroids.nbytes + self.ids.nbytes + self.list_offsets.nbytes
+        if self.scale is not None:
+            index_bytes += self.scale.nbytes
+        if self.pq_codebooks is not None:
+            index_bytes += self.pq_codebooks.nbytes
+        return {
+            "index_bytes": int(index_bytes),
+            "float_store_bytes": int(self.float_vectors.nbytes),
+            "float_store_mmapped": isinstance(self.float_vectors, np.memmap),
+        }
+
+    def exact_search(self, queries: np.ndarray, k: int, chunk_size: int = 65536) -> np.ndarray:
+        """Brute-force top-k row ids over the float vectors (the reference for recall)."""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.float_vectors), chunk_size):
+            block = np.asarray(self.float_vectors[start:start + chunk_size])
+            scores = np.hstack([best_scores, queries @ block.T])
+            ids = np.hstack([best_ids, np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))])
+            keep = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_ids = np.take_along_axis(ids, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_ids, order, axis=1)
+
+    def evaluate(self, queries: np.ndarray, k: int = 10) -> Dict:
+        """Recall@k against the exact float search, and per-query latency."""
+        queries = np.asarray(queries, dtype=np.float32)
+        exact = self.exact_search(queries, k)
+        latencies_ms, hits = [], 0
+        for query, reference in zip(queries, exact):
+            start = time.perf_counter()
+            ids, _ = self.search(query, k)
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+            hits += len(np.intersect1d(ids, reference))
+        return {
+            "quantization": self.quantization,
+            "nlist": len(self.centroids),
+            "nprobe": self.nprobe,
+            "rerank": self.rerank,
+            "k": k,
+            "queries": len(queries),
+            f"recall_at_{k}": round(hits / max(1, len(queries) * k), 4),
+            "latency_p50_ms": round(float(np.percentile(latencies_ms, 50)), 3) if latencies_ms else 0.0,
+            "latency_p95_ms": round(float(np.percentile(latencies_ms, 95)), 3) if latencies_ms else 0.0,
+            **self.memory_report(),
+        }
+
+
+class TextEmbedder:
+    """
+    Dense embeddings for designations: TF-IDF over hashed character n-grams of
+    the normalized text, reduced with truncated SVD (LSA) and L2-normalized.
+    """
+
+    N_FEATURES = 2 ** 18
+
+    def __init__(self, dim: int = VECTOR_INDEX_DIM, seed: int = 0):
+        self.dim = dim
+        self.seed = seed
+        self.vectorizer = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=(2, 4),
+            n_features=self.N_FEATURES,
+            alternate_sign=False,
+            norm=None,
+            lowercase=False,
+        )
+        self.idf: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None  # (dim, N_FEATURES) SVD basis
+
+    def _tfidf(self, normalized: List[str]) -> sparse.csr_matrix:
+        counts = self.vectorizer.transform(normalized)
+        return normalize(counts.multiply(self.idf).tocsr().astype(np.float32), norm="l2", copy=False)
+
+    def document_frequency(self, texts: List[str]) -> np.ndarray:
+        """Per-feature document counts of a chunk (summed over chunks by streaming builders)."""
+        counts = self.vectorizer.transform(normalize_many(texts))
+        return np.bincount(counts.indices, minlength=self.N_FEATURES)
+
+    def fit(self,
+            texts: List[str],
+            sample_size: int = 200_000,
+            document_frequency: Optional[np.ndarray] = None,
+            n_documents: Optional[int] = None) -> "TextEmbedder":
+        """
+        Fit idf and the SVD basis. `texts` may be a sample of the corpus when the
+        corpus-wide document_frequency / n_documents are given.
+        """
+        if document_frequency is None:
+            document_frequency, n_documents = self.document_frequency(texts), len(texts)
+        self.idf = (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        rng = np.random.default_rng(self.seed)
+        sample = list(texts) if len(texts) <= sample_size else [
+            texts[i] for i in rng.choice(len(texts), sample_size, replace=False)
+        ]
+        svd = TruncatedSVD(n_components=self.dim, random_state=self.seed).fit(self._tfidf(normalize_many(sample)))
+        self.components = svd.components_.astype(np.float32)
+        return self
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "idf.npy"), self.idf)
+        np.save(os.path.join(directory, "components.npy"), self.components)
+        with open(os.path.join(directory, "embedder.json"), "w") as f:
+            json.dump({"dim": self.dim, "seed": self.seed, "n_features": self.N_FEATURES}, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str) -> "TextEmbedder":
+        """Open a saved embedder; the SVD basis is memory-mapped."""
+        with open(os.path.join(directory, "embedder.json")) as f:
+            params = json.load(f)
+        if params["n_features"] != cls.N_FEATURES:
+            raise ValueError(f"Embedder in {directory} uses {params['n_features']} features, expected {cls.N_FEATURES}")
+        embedder = cls(dim=params["dim"], seed=params["seed"])
+        embedder.idf = np.load(os.path.join(directory, "idf.npy"))
+        embedder.components = np.load(os.path.join(directory, "components.npy"), mmap_mode="r")
+        return embedder
+
+    def transform(self, texts: List[str], chunk_size: int = 50_000) -> np.ndarray:
+        chunks = []
+        for start in range(0, len(texts), chunk_size):
+            normalized = normalize_many(texts[start:start + chunk_size])
+            chunks.append(np.asarray(self._tfidf(normalized) @ self.components.T, dtype=np.float32))
+        if not chunks:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return normalize(np.vstack(chunks)).astype(np.float32)
+
+
+class VectorSuggestionIndex:
+    """
+    Embedding-based local suggestions, in the find_suggestions format.
+
+    Same documents as LocalSuggestionIndex (labeled descriptions plus the
+    labels themselves), stored in a QuantizedVectorIndex so the footprint per
+    designation is d bytes (int8) or VECTOR_INDEX_PQ_SUBSPACES bytes (pq)
+    instead of 4 * d. Learned labels go to a small exact float delta.
+    A snapshot's vector component is memory-mapped instead of rebuilt.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, data_path: str = LOCAL_INDEX_DATA_PATH, snapshot_dir: Optional[str] = None):
+        if snapshot_dir:
+            self._load_snapshot(snapshot_dir)
+        else:
+            self._build(data_path)
+
+        self._delta_lock = threading.Lock()
+        self.delta_vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.delta_labels: List[str] = []
+        self.delta_descriptions: List[str] = []
+        self._learned_callback = None
+        if ENABLE_LABEL_WRITEBACK:
+            self._attach_learned_labels()
+        print(f"✅ Vector index ready: {len(self.labels)} documents, {self.index.memory_report()}")
+
+    def _build(self, data_path: str) -> None:
+        print(f"🔄 Building vector index ({VECTOR_INDEX_QUANTIZATION}) from {data_path}...")
+        df = pd.read_csv(data_path, usecols=["description_cleaned", "nature_product"]).dropna()
+        df = df[(df["description_cleaned"].str.strip() != "") & (df["nature_product"].str.strip() != "")]
+        labels = df["nature_product"].drop_duplicates()
+        documents = pd.concat([df["description_cleaned"], labels], ignore_index=True).tolist()
+        document_labels = pd.concat([df["nature_product"], labels], ignore_index=True).tolist()
+
+        self.embedder = TextEmbedder().fit(documents)
+        # Rerank vectors always memory-mapped, from a temporary file when no store is configured
+        if VECTOR_INDEX_FLOAT_STORE:
+            float_store = VECTOR_INDEX_FLOAT_STORE
+            os.makedirs(os.path.dirname(float_store) or ".", exist_ok=True)
+        else:
+            fd, float_store = tempfile.mkstemp(prefix="vector_float_", suffix=".npy")
+            os.close(fd)
+        self.index = QuantizedVectorIndex(
+            quantization=VECTOR_INDEX_QUANTIZATION,
+            nlist=VECTOR_INDEX_NLIST,
+            nprobe=VECTOR_INDEX_NPROBE,
+            pq_subspaces=VECTOR_INDEX_PQ_SUBSPACES,
+            rerank=VECTOR_INDEX_RERANK,
+        ).build(self.embedder.transform(documents), float_store_path=float_store)
+        if not VECTOR_INDEX_FLOAT_STORE:
+            # The mapping outlives the name: nothing is left behind on exit
+            try:
+                os.unlink(float_store)
+            except OSError as e:
+                print(f"⚠️ Temporary float store kept at {float_store}: {e}")
+        self.labels = np.asarray(document_labels, dtype=object)
+        self.descriptions = np.asarray(documents, dtype=object)
+
+    def _load_snapshot(self, snapshot_dir: str) -> None:
+        """Open the vector component of a snapshot (codes and float vectors memory-mapped)."""
+        from services.catalog_table import LabeledColumn, StringTable
+
+        vector_dir = os.path.join(snapshot_dir, "vector")
+        self.embedder = TextEmbedder.load(os.path.join(vector_dir, "embedder"))
+        self.index = QuantizedVectorIndex.load(vector_dir, nprobe=VECTOR_INDEX_NPROBE, rerank=VECTOR_INDEX_RERANK)
+        labels_table = StringTable(os.path.join(snapshot_dir, "documents"), "labels")
+        descriptions_table = StringTable(os.path.join(snapshot_dir, "documents"), "descriptions")
+        self.labels = LabeledColumn(labels_table, descriptions_table.values)
+        self.descriptions = descriptions_table
+        print(f"📦 Vector index mapped from snapshot {snapshot_dir}")
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(snapshot_dir=current_snapshot_dir("vector"))
+        return cls._instance
+
+    def _attach_learned_labels(self) -> None:
+        """Index stored LLM decisions and follow new ones."""
+        from services.label_store import LearnedLabelStore
+
+        try:
+            store = LearnedLabelStore.get_instance()
+        except Exception as e:
+            print(f"⚠️ Learned labels unavailable for the vector index: {e}")
+            return
+        entries = [e for e in store.entries() if store.is_servable(e)]
+        if entries:
+            self.add_documents([e["designation"] for e in entries], [e["label"] for e in entries])
+        self._learned_callback = (
+            lambda e: self.add_documents([e["designation"]], [e["label"]]) if store.is_servable(e) else None
+        )
+        store.subscribe(self._learned_callback)
+
+    def close(self) -> None:
+        """Stop following learned labels (the index is being replaced)."""
+        if self._learned_callback is not None:
+            from services.label_store import LearnedLabelStore
+            LearnedLabelStore.get_instance().unsubscribe(self._learned_callback)
+            self._learned_callback = None
+
+    def add_documents(self, descriptions: List[str], labels: List[str]) -> None:
+        """Make new (description, label) pairs searchable without a rebuild."""
+        vectors = self.embedder.transform(list(descriptions))
+        with self._delta_lock:
+            self.delta_vectors = np.vstack([self.delta_vectors, vectors])
+            self.delta_labels = self.delta_labels + list(labels)
+            self.delta_descriptions = self.delta_descriptions + list(descriptions)
+
+    def query_many(self, designations: List[str], top_k: Optional[int] = None) -> List[List[Dict]]:
+        """Top-k suggestions for each designation (best score per nature_product)."""
+        top_k = top_k or LOCAL_INDEX_TOP_K
+        if not designations:
+            return []
+        queries = self.embedder.transform(list(designations))
+        with self._delta_lock:
+            delta_vectors = self.delta_vectors
+            delta_labels = self.delta_labels
+            delta_descriptions = self.delta_descriptions
+
+        results = []
+        for query in queries:
+            # Several documents can share a label: look a bit deeper than top_k
+            ids, scores = self.index.search(query, top_k * 10)
+            candidates = [(float(s), self.labels[i], self.descriptions[i]) for i, s in zip(ids, scores)]
+            if len(delta_vectors):
+                delta_scores = delta_vectors @ query
+                candidates += [
+                    (float(s), delta_labels[i], delta_descriptions[i]) for i, s in enumerate(delta_scores)
+                ]
+            candidates.sort(key=lambda c: c[0], reverse=True)
+
+            suggestions, seen = [], set()
+            for score, label, description in candidates:
+                if score <= 0:
+                    break
+                if label in seen:
+                    continue
+                seen.add(label)
+                suggestions.append({
+                    "nature_product": label,
+                    "similarity_score": round(score, 4),
+                    "matched_description": description,
+                })
+                if len(suggestions) == top_k:
+                    break
+            results.append(suggestions)
+        return results
+
+    def query(self, designation: str, top_k: Optional[int] = None) -> List[Dict]:
+        """Top-k suggestions for a single designation."""
+        return self.query_many([designation], top_k)[0]
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Tuple
+from utils.ttl_cache import TTLCache, FRESH
+from utils.text_normalization import normalize_designation
+from utils.config_validator import (
+    WEB_CONTEXT_BUDGET_MS,
+    WEB_CONTEXT_MAX_TOKENS,
+    WEB_CONTEXT_CACHE_SIZE,
+    WEB_CONTEXT_CACHE_TTL,
+    WEB_CONTEXT_WORKERS,
+    LLM_CHARS_PER_TOKEN,
+)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to ~max_tokens (LLM_CHARS_PER_TOKEN characters each), on a word boundary."""
+    max_chars = int(max_tokens * LLM_CHARS_PER_TOKEN)
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > max_chars // 2 else cut).rstrip() + " …"
+
+
+class WebContextService:
+    """
+    Web-search enrichment for the arbitration prompt, kept off the critical path.
+
+    `prefetch` starts the search in a worker thread as soon as the database
+    stage misses, so it runs while T5 generates. The orchestrator then waits
+    for it with `get` / `aget`, at most until WEB_CONTEXT_BUDGET_MS after the
+    launch; a late search keeps running and fills the cache for the next
+    request. Results are cached per normalized designation (TTL) and
+    truncated to WEB_CONTEXT_MAX_TOKENS.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self,
+                 budget_ms: float = WEB_CONTEXT_BUDGET_MS,
+                 max_tokens: int = WEB_CONTEXT_MAX_TOKENS):
+        self.budget_ms = budget_ms
+        self.max_tokens = max_tokens
+        self._cache = TTLCache(
+            maxsize=WEB_CONTEXT_CACHE_SIZE,
+            ttl=WEB_CONTEXT_CACHE_TTL,
+            negative_ttl=600,
+            name="web_context",
+        )
+        self._executor = ThreadPoolExecutor(max_workers=WEB_CONTEXT_WORKERS, thread_name_prefix="web_context")
+        # normalized designation -> (future, launch time)
+        self._inflight: Dict[str, Tuple[Future, float]] = {}
+        self._inflight_lock = threading.Lock()
+        self._search = None
+        self._counters_lock = threading.Lock()
+        self._counters = {
+            "launched": 0,
+            "cache_hits": 0,
+            "used": 0,
+            "over_budget": 0,
+            "errors": 0,
+            "unavailable": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    @classmethod
+    def get_instance(cls):
+        """Double-checked locking pattern pour thread-safety."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _search_fn(self):
+        """OrchestratorService.search_web when web search is configured, else None."""
+        if self._search is None:
+            # Lazy import to avoid circular imports
+            from services.llm_service import OrchestratorService
+            try:
+                service = OrchestratorService.get_instance()
+            except Exception:
+                return None
+            if service.search_tool is None:
+                return None
+            self._search = service.search_web
+        return self._search
+
+    def _run(self, key: str, description: str) -> str:
+        try:
+            search = self._search_fn()
+            if search is None:
+                self._count("unavailable")
+                self._cache.set(key, "")
+                return ""
+            context = truncate_to_tokens(search(description), self.max_tokens)
+            self._cache.set(key, context)
+            return context
+        except Exception as e:
+            self._count("errors")
+            print(f"⚠️ Web context search failed: {e}")
+            return ""
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def prefetch(self, description: str) -> None:
+        """Start the search for description unless it is cached or already running."""
+        key = normalize_designation(description)
+        if not key:
+            return
+        state, _ = self._cache.lookup(key)
+        if state == FRESH:
+            return
+        with self._inflight_lock:
+            if key in self._inflight:
+                return
+            self._count("launched")
+            self._inflight[key] = (self._executor.submit(self._run, key, description), time.monotonic())
+
+    def _pending(self, description: str) -> Tuple[Optional[str], Optional[Future], float]:
+        """(cached context, running future, seconds left in the budget)."""
+        key = normalize_designation(description)
+        state, value = self._cache.lookup(key)
+        if state == FRESH:
+            self._count("cache_hits")
+            return value, None, 0.0
+        with self._inflight_lock:
+            entry = self._inflight.get(key)
+        if entry is None:
+            return None, None, 0.0
+        future, launched_at = entry
+        remaining = self.budget_ms / 1000 - (time.monotonic() - launched_at)
+        return None, future, remaining
+
+    def _result(self, context: Optional[str]) -> Optional[str]:
+        if context:
+            self._count("used")
+            return context
+        return None
+
+    def get(self, description: str) -> Optional[str]:
+        """Context for description if it is ready within the budget, else None (blocking)."""
+        context, future, remaining = self._pending(description)
+        if future is None:
+            return self._result(context)
+        try:
+            return self._result(future.result(timeout=max(remaining, 0.0)))
+        except FutureTimeoutError:
+            self._count("over_budget")
+            return None
+
+    async def aget(self, description: str) -> Optional[str]:
+        """Async get: waits on the event loop, never past the budget."""
+        context, future, remaining = self._pending(description)
+        if future is None:
+            return self._result(context)
+        try:
+            # shield: the search must keep running to fill the cache
+            return self._result(await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout=max(remaining, 0.0)
+            ))
+        except asyncio.TimeoutError:
+            self._count("over_budget")
+            return None
+
+    def stats(self) -> Dict:
+        with self._inflight_lock:
+            inflight = len(self._inflight)
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {**counters, "inflight": inflight, "cache": self._cache.stats()}
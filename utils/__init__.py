@@ -16,11 +16,15 @@ from .exceptions import (
     ConfigurationError,
     ModelLoadError,
     APIConnectionError,
+    CircuitOpenError,
     LLMProcessingError,
     ValidationError,
     ServiceInitializationError
 )
 from .logging_service import LLMLoggingService
+from .ttl_cache import TTLCache
+from .circuit_breaker import CircuitBreaker, LatencyTracker
+from .text_normalization import normalize_designation, normalize_series, normalize_many
 
 __all__ = [
     # Base classes
@@ -43,10 +47,23 @@ __all__ = [
     "ConfigurationError",
     "ModelLoadError", 
     "APIConnectionError",
+    "CircuitOpenError",
     "LLMProcessingError",
     "ValidationError",
     "ServiceInitializationError",
     
     # Logging
-    "LLMLoggingService"
+    "LLMLoggingService",
+    
+    # Caching
+    "TTLCache",
+    
+    # Resilience
+    "CircuitBreaker",
+    "LatencyTracker",
+    
+    # Text normalization
+    "normalize_designation",
+    "normalize_series",
+    "normalize_many"
 ]
\ No newline at end of file
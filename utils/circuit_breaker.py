@@ -0,0 +1,176 @@
+"""
+Circuit breaker and rolling latency tracking for external dependencies.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LatencyTracker:
+    """Rolling window of call latencies with percentile queries."""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency_ms: float) -> None:
+        with self._lock:
+            self._samples.append(latency_ms)
+
+    def percentile(self, pct: float, default: float = 0.0) -> float:
+        """Latency at percentile pct (0-100), or default without samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return default
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Three-state circuit breaker.
+
+    CLOSED -> OPEN after `failure_threshold` consecutive failures, or
+    `slow_call_threshold` consecutive calls slower than `slow_call_ms`.
+    OPEN -> HALF_OPEN once `open_duration_s` has elapsed; a single probe call
+    is then let through: success closes the circuit, failure re-opens it.
+
+    `allow_request` returns a permit (the state epoch, bumped at every
+    transition) that the caller hands back with its verdict. While half-open,
+    only the probe's permit may change the state: a call admitted before the
+    circuit opened is counted but cannot close (or re-open) it.
+    """
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 5,
+                 slow_call_ms: float = 3000.0,
+                 slow_call_threshold: int = 5,
+                 open_duration_s: float = 30.0,
+                 max_transitions_kept: int = 20):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_threshold = slow_call_threshold
+        self.open_duration_s = open_duration_s
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._epoch = 1
+        self._consecutive_failures = 0
+        self._consecutive_slow = 0
+        self._lock = threading.Lock()
+        self._transitions: deque = deque(maxlen=max_transitions_kept)
+        self._counters = {
+            "successes": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "opened": 0,
+        }
+
+    def _transition(self, new_state: str, reason: str) -> None:
+        """Change state (caller holds the lock)."""
+        if new_state == self._state:
+            return
+        self._transitions.append({
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "from": self._state,
+            "to": new_state,
+            "reason": reason,
+        })
+        print(f"Circuit breaker '{self.name}': {self._state} -> {new_state} ({reason})")
+        self._state = new_state
+        self._epoch += 1
+        if new_state == OPEN:
+            self._opened_at = time.monotonic()
+            self._counters["opened"] += 1
+        if new_state != HALF_OPEN:
+            self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_duration_s:
+                self._transition(HALF_OPEN, "open duration elapsed")
+            return self._state
+
+    def allow_request(self) -> Optional[int]:
+        """
+        Permit for a call that may go through now (reserves the probe when
+        half-open), or None when it is rejected. Permits are always truthy.
+        """
+        state = self.state
+        with self._lock:
+            if state == CLOSED:
+                return self._epoch
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return self._epoch
+            self._counters["rejected"] += 1
+            return None
+
+    def _is_stale(self, permit: Optional[int]) -> bool:
+        """A verdict that must not move a half-open breaker (caller holds the lock)."""
+        return self._state == HALF_OPEN and permit is not None and permit != self._epoch
+
+    def record_success(self, latency_ms: float, permit: Optional[int] = None) -> None:
+        with self._lock:
+            self._counters["successes"] += 1
+            self._consecutive_failures = 0
+            if latency_ms >= self.slow_call_ms:
+                self._counters["slow_calls"] += 1
+                self._consecutive_slow += 1
+            else:
+                self._consecutive_slow = 0
+
+            if self._is_stale(permit):
+                return
+            if self._state == HALF_OPEN:
+                if self._consecutive_slow:
+                    self._transition(OPEN, f"slow probe ({latency_ms:.0f} ms)")
+                else:
+                    self._transition(CLOSED, "probe succeeded")
+            elif self._state == CLOSED and self._consecutive_slow >= self.slow_call_threshold:
+                self._transition(OPEN, f"{self._consecutive_slow} consecutive slow calls")
+
+    def record_failure(self, permit: Optional[int] = None) -> None:
+        with self._lock:
+            self._counters["failures"] += 1
+            self._consecutive_failures += 1
+            if self._is_stale(permit):
+                return
+            if self._state == HALF_OPEN:
+                self._transition(OPEN, "probe failed")
+            elif self._state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._transition(OPEN, f"{self._consecutive_failures} consecutive failures")
+
+    def release(self, permit: Optional[int] = None) -> None:
+        """
+        The call let through was abandoned (cancelled) without a verdict: free
+        the half-open probe slot so that the next call can probe instead.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and not self._is_stale(permit):
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["state"] = state
+            stats["consecutive_failures"] = self._consecutive_failures
+            stats["consecutive_slow_calls"] = self._consecutive_slow
+            transitions: List[Dict] = list(self._transitions)
+        stats["transitions"] = transitions
+        return stats
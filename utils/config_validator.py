@@ -44,8 +44,11 @@ class ConfigValidator:
         config = {}
         errors = []
         
-        # Check required variables
-        for var_name, description in cls.REQUIRED_VARS.items():
+        # Check required variables (the simulated LLM backend needs no provider key)
+        required = dict(cls.REQUIRED_VARS)
+        if os.getenv("LLM_BACKEND", "groq").lower() == "simulated":
+            required.pop("GROQ_API_KEY", None)
+        for var_name, description in required.items():
             value = os.getenv(var_name)
             if not value:
                 errors.append(f"Missing required environment variable: {var_name} ({description})")
@@ -82,12 +85,189 @@ except ConfigurationError as e:
 
 # ==================== API KEYS ====================
 OPENAI_API_KEY = validated_config.get("OPENAI_API_KEY")
-GROQ_API_KEY = validated_config["GROQ_API_KEY"]
+GROQ_API_KEY = validated_config.get("GROQ_API_KEY")
 TAVILY_API_KEY = validated_config.get("TAVILY_API_KEY")
 HF_TOKEN = validated_config.get("HUGGINGFACE_TOKEN")
 
-# External API endpoint
-API_URL = "http://178.33.46.169:8012/find_suggestions"
+# External API endpoint (override to point at find_suggestions_stub.py for offline tests)
+API_URL = os.getenv("API_URL", "http://178.33.46.169:8012/find_suggestions")
+
+# find_suggestions HTTP client (pooled keep-alive session)
+DB_POOL_SIZE = 8             # Max kept-alive connections, >= number of worker threads
+DB_CONNECT_TIMEOUT = 2.0     # Seconds to establish the TCP connection
+DB_READ_TIMEOUT = 8.0        # Seconds to wait for the response
+DB_MAX_RETRIES = 2           # Extra attempts on connection errors / 502-504
+DB_RETRY_BACKOFF = 0.2       # Base backoff in seconds (full jitter, exponential)
+DB_RETRY_MAX_BACKOFF = 2.0   # Upper bound for a single backoff sleep
+DB_ASYNC_MAX_CONCURRENCY = 64  # In-flight async lookups per event loop (not shared across loops)
+DB_ASYNC_LIMIT_PER_HOST = 8    # Sockets the async client may open to API_URL
+
+# Suggestions backend: "remote" (find_suggestions API), "local" (in-process
+# character n-gram index) or "local_then_remote" (remote only when local is unsure)
+DB_BACKEND = os.getenv("DB_BACKEND", "remote").lower()
+LOCAL_INDEX_DATA_PATH = os.getenv("LOCAL_INDEX_DATA_PATH", "labeled_products_filtered.csv")
+LOCAL_INDEX_TOP_K = 5
+LOCAL_INDEX_ACCEPT_SCORE = 0.94  # local_then_remote: skip the remote call above this score
+# Local index implementation: "ngram" (sparse TF-IDF) or "vector" (quantized LSA embeddings)
+LOCAL_INDEX_KIND = os.getenv("LOCAL_INDEX_KIND", "ngram").lower()
+
+# Quantized vector index (LOCAL_INDEX_KIND=vector)
+VECTOR_INDEX_DIM = 128
+VECTOR_INDEX_QUANTIZATION = os.getenv("VECTOR_INDEX_QUANTIZATION", "int8").lower()  # float | int8 | pq
+VECTOR_INDEX_NLIST = 0                # IVF lists, 0 = sqrt(number of documents)
+VECTOR_INDEX_NPROBE = 8               # lists scanned per query
+VECTOR_INDEX_PQ_SUBSPACES = 16        # pq: bytes per vector (must divide VECTOR_INDEX_DIM)
+VECTOR_INDEX_RERANK = 100             # approximate candidates rescored with the float vectors
+# Float vectors used for reranking are memory-mapped from this file; "" maps a temporary
+# file (unlinked once mapped), so they never sit in RAM next to the quantized codes
+VECTOR_INDEX_FLOAT_STORE = os.getenv("VECTOR_INDEX_FLOAT_STORE", "")
+
+# Exact-match stage: normalized designation -> label map, first stage of the graph
+ENABLE_EXACT_MATCH = os.getenv("ENABLE_EXACT_MATCH", "true").lower() == "true"
+EXACT_MATCH_DATA_PATH = LOCAL_INDEX_DATA_PATH
+EXACT_MATCH_MIN_AGREEMENT = 0.8  # share of the majority label needed to keep a key
+# Memory-mapped catalog built by `python -m services.catalog_table`; when set, the
+# exact-match stage reads it instead of loading the CSV into a dict
+CATALOG_TABLE_DIR = os.getenv("CATALOG_TABLE_DIR", "")
+
+# Versioned snapshots built by `python -m services.snapshot_service build`: when set,
+# local indexes are memory-mapped from <SNAPSHOT_ROOT>/<CURRENT> instead of built from CSV
+SNAPSHOT_ROOT = os.getenv("SNAPSHOT_ROOT", "")
+SNAPSHOT_POLL_SECONDS = int(os.getenv("SNAPSHOT_POLL_SECONDS", "0"))  # 0 = switch only via the admin endpoint
+
+# Write-back of LLM decisions into the local lookup layers (SQLite, survives restarts)
+ENABLE_LABEL_WRITEBACK = os.getenv("ENABLE_LABEL_WRITEBACK", "true").lower() == "true"
+LEARNED_LABELS_DB_PATH = os.getenv("LEARNED_LABELS_DB_PATH", "learned_labels.db")
+# Labels the LLM created (not among the DB suggestions / T5 guess) are flagged for review
+# and only served once reviewed, unless this is "true"
+LEARNED_LABELS_SERVE_UNREVIEWED = os.getenv("LEARNED_LABELS_SERVE_UNREVIEWED", "false").lower() == "true"
+
+# RapidFuzz fast path (before any backend) and reranking of remote suggestions
+ENABLE_FUZZY_FAST_PATH = os.getenv("ENABLE_FUZZY_FAST_PATH", "true").lower() == "true"
+ENABLE_FUZZY_RERANK = os.getenv("ENABLE_FUZZY_RERANK", "true").lower() == "true"
+FUZZY_DATA_PATH = LOCAL_INDEX_DATA_PATH
+FUZZY_FAST_PATH_CUTOFF = 95    # fuzz.ratio (0-100) needed to answer locally
+# Similarity (ratio / 100) at which a fast-path hit settles the item (fuzzy_fast_path_match);
+# weaker hits go on to T5 like any uncertain DB answer. Separate from THRESHOLD_DATABASE
+FUZZY_FAST_PATH_ACCEPT_SCORE = float(os.getenv("FUZZY_FAST_PATH_ACCEPT_SCORE", "0.95"))
+FUZZY_RERANK_WEIGHT = 0.3      # weight of token_set_ratio vs similarity_score
+
+# Cache of remote find_suggestions answers (normalized designation -> suggestions)
+SUGGESTION_CACHE_ENABLED = os.getenv("SUGGESTION_CACHE_ENABLED", "true").lower() == "true"
+SUGGESTION_CACHE_SIZE = 50_000
+SUGGESTION_CACHE_TTL = 6 * 3600          # seconds
+SUGGESTION_CACHE_NEGATIVE_TTL = 10 * 60  # empty answers expire sooner
+SUGGESTION_CACHE_STALE_TTL = 24 * 3600   # expired entries served while refreshing
+
+# Circuit breaker on find_suggestions
+DB_BREAKER_FAILURE_THRESHOLD = 5      # consecutive failed lookups before opening
+DB_BREAKER_SLOW_CALL_MS = 3000        # a lookup slower than this counts as slow
+DB_BREAKER_SLOW_CALL_THRESHOLD = 5    # consecutive slow lookups before opening
+DB_BREAKER_OPEN_SECONDS = 30          # time before a half-open probe is allowed
+# While open: "local" answers from the local n-gram index, "skip" returns no suggestions
+DB_DEGRADED_POLICY = os.getenv("DB_DEGRADED_POLICY", "local").lower()
+
+# Hedged requests: a second attempt fires if the first is slower than the observed p95
+DB_HEDGE_ENABLED = os.getenv("DB_HEDGE_ENABLED", "false").lower() == "true"
+DB_HEDGE_PERCENTILE = 95
+DB_HEDGE_MIN_DELAY_MS = 50
+DB_HEDGE_MIN_SAMPLES = 20             # no hedging until enough latencies are observed
+DB_HEDGE_POOL_SIZE = 4                # connections of the hedge session, apart from DB_POOL_SIZE
+
+# Batched lookups: "auto" asks the server (GET DB_CAPABILITIES_URL) whether it has a
+# batch endpoint, "on" assumes it, "off" always uses single calls
+DB_BATCH_MODE = os.getenv("DB_BATCH_MODE", "auto").lower()
+DB_BATCH_URL = os.getenv("DB_BATCH_URL", API_URL.rstrip("/") + "_batch")
+DB_CAPABILITIES_URL = os.getenv("DB_CAPABILITIES_URL", API_URL.rsplit("/", 1)[0] + "/capabilities")
+DB_CAPABILITIES_TTL = 600             # seconds before the capabilities are asked again
+DB_BATCH_SIZE = 100                   # designations per batch request (capped by the server)
+DB_BATCH_FALLBACK_CONCURRENCY = 16    # concurrent single calls when batching is unavailable
+
+# LLM backend: "groq" or "simulated" (services/simulated_llm.py: deterministic labels,
+# Groq-shaped token_usage, injected latency and errors; no key or network needed)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq").lower()
+SIM_LLM_LATENCY_DIST = os.getenv("SIM_LLM_LATENCY_DIST", "lognormal")  # constant | uniform | normal | lognormal
+SIM_LLM_LATENCY_MEAN_MS = float(os.getenv("SIM_LLM_LATENCY_MEAN_MS", "300"))  # time to first token
+SIM_LLM_LATENCY_STD_MS = float(os.getenv("SIM_LLM_LATENCY_STD_MS", "150"))
+SIM_LLM_TOKENS_PER_SECOND = float(os.getenv("SIM_LLM_TOKENS_PER_SECOND", "500"))  # generation speed
+SIM_LLM_REASONING_TOKENS = int(os.getenv("SIM_LLM_REASONING_TOKENS", "120"))  # mean hidden completion tokens
+SIM_LLM_ERROR_RATE = float(os.getenv("SIM_LLM_ERROR_RATE", "0"))  # share of calls failing with 503
+SIM_LLM_RATE_LIMIT_RATE = float(os.getenv("SIM_LLM_RATE_LIMIT_RATE", "0"))  # share failing with 429 + retry-after
+SIM_LLM_CHATTY_RATE = float(os.getenv("SIM_LLM_CHATTY_RATE", "0"))  # share of labels followed by an explanation
+SIM_LLM_SEED = int(os.getenv("SIM_LLM_SEED", "0"))
+
+# LLM orchestrator: after a failed initialization (e.g. missing key), callers get the
+# cached error and initialization is not retried before this many seconds
+ORCHESTRATOR_INIT_RETRY_SECONDS = 300
+
+# Provider quota for the arbitration calls: requests and tokens per minute. Calls over
+# the quota wait their turn; the provider's rate-limit headers override the estimate
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "8000"))
+LLM_RATE_LIMIT_BURST = 0.1            # share of the minute quota that may go out at once
+LLM_RATE_LIMIT_MAX_RETRIES = 4        # 429 retries (after retry-after) before giving up
+LLM_CHARS_PER_TOKEN = 4.0             # prompt token estimate before the call
+LLM_COMPLETION_TOKENS_ESTIMATE = 256  # reserved for the answer, settled with the real usage
+
+# Streamed arbitration: reading stops as soon as the label line (packed: the JSON object)
+# is complete. Completions are capped at LLM_MAX_TOKENS, reasoning tokens included, so the
+# cap must leave room for the reasoning trace; a cap hit before any answer is a failure
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
+LLM_REASONING_EFFORT = os.getenv("LLM_REASONING_EFFORT", "low")  # low / medium / high, empty = provider default
+LLM_PACKED_MAX_TOKENS_PER_ITEM = 24   # added to LLM_MAX_TOKENS for each packed item
+
+# Packed arbitration: /classify/batch sends the items T5 could not settle to the LLM
+# together, up to LLM_PACK_SIZE per call (one system prompt, JSON answer keyed by id)
+LLM_PACKED_ARBITRATION = os.getenv("LLM_PACKED_ARBITRATION", "true").lower() == "true"
+LLM_PACK_SIZE = 20
+
+# Persistent cache of LLM decisions (temperature 0), keyed by model, system prompt
+# hash and normalized user content; least recently used entries evicted past the bound
+LLM_DECISION_CACHE_ENABLED = os.getenv("LLM_DECISION_CACHE_ENABLED", "true").lower() == "true"
+LLM_DECISION_CACHE_PATH = os.getenv("LLM_DECISION_CACHE_PATH", "llm_decisions.db")
+LLM_DECISION_CACHE_MAX_ENTRIES = 200_000
+
+# Dynamic arbitration prompt: core rules + the category sections and examples nearest
+# to the item (character-trigram similarity); "false" sends every section and example
+ENABLE_DYNAMIC_PROMPT = os.getenv("ENABLE_DYNAMIC_PROMPT", "true").lower() == "true"
+PROMPT_FEW_SHOT_K = 6            # nearest examples kept per item
+PROMPT_MIN_EXAMPLES = 2          # kept even below PROMPT_MIN_SIMILARITY, to show the format
+PROMPT_MAX_SECTIONS = 2          # category rule sections per item
+PROMPT_MIN_SIMILARITY = 0.2      # trigram cosine needed for an example or section
+
+# Web-search context for the arbitration (needs TAVILY_API_KEY): started when the DB
+# stage misses, in parallel with T5; arbitration waits for it at most until the budget
+# (counted from the launch) has elapsed, then proceeds without it
+ENABLE_WEB_CONTEXT = os.getenv("ENABLE_WEB_CONTEXT", "false").lower() == "true"
+WEB_CONTEXT_BUDGET_MS = int(os.getenv("WEB_CONTEXT_BUDGET_MS", "1500"))
+WEB_CONTEXT_MAX_TOKENS = 300           # context truncated to this many tokens (estimated)
+WEB_CONTEXT_CACHE_SIZE = 10_000        # normalized designations kept
+WEB_CONTEXT_CACHE_TTL = 24 * 3600      # seconds (empty results: 10 min)
+WEB_CONTEXT_WORKERS = 4                # concurrent searches
+
+# Speculative arbitration: below this DB score the LLM call starts in parallel with T5.
+# It is discarded if T5 is confident, and asked again (with the T5 guess) only when T5
+# proposes a new label with at least LLM_SPECULATIVE_REASK_T5_CONF confidence
+ENABLE_SPECULATIVE_ARBITRATION = os.getenv("ENABLE_SPECULATIVE_ARBITRATION", "false").lower() == "true"
+LLM_SPECULATIVE_DB_FLOOR = float(os.getenv("LLM_SPECULATIVE_DB_FLOOR", "0.5"))
+LLM_SPECULATIVE_REASK_T5_CONF = 0.5
+LLM_SPECULATIVE_WORKERS = 8            # concurrent speculative calls
+
+# Rolling LLM spend budgets in USD (0 = no limit) over the last minute / hour / day, for the
+# process and, for requests carrying a client_id, per client. Past LLM_BUDGET_SOFT_RATIO of
+# a budget only items with weak local answers (below the LLM_BUDGET_RESTRICTED_* confidences)
+# reach the LLM; a spent budget answers every item locally until the window rolls over
+LLM_BUDGET_PER_MINUTE_USD = float(os.getenv("LLM_BUDGET_PER_MINUTE_USD", "0"))
+LLM_BUDGET_PER_HOUR_USD = float(os.getenv("LLM_BUDGET_PER_HOUR_USD", "0"))
+LLM_BUDGET_PER_DAY_USD = float(os.getenv("LLM_BUDGET_PER_DAY_USD", "0"))
+LLM_CLIENT_BUDGET_PER_MINUTE_USD = float(os.getenv("LLM_CLIENT_BUDGET_PER_MINUTE_USD", "0"))
+LLM_CLIENT_BUDGET_PER_HOUR_USD = float(os.getenv("LLM_CLIENT_BUDGET_PER_HOUR_USD", "0"))
+LLM_CLIENT_BUDGET_PER_DAY_USD = float(os.getenv("LLM_CLIENT_BUDGET_PER_DAY_USD", "0"))
+LLM_BUDGET_SOFT_RATIO = 0.8
+LLM_BUDGET_RESTRICTED_T5_CONF = 0.7     # restricted: T5 answer kept from this confidence
+LLM_BUDGET_RESTRICTED_DB_CONF = 0.85    # restricted: top DB suggestion kept from this score
+LLM_BUDGET_MAX_CLIENTS = 10_000         # clients idle for a day are dropped past this
 
 # ==================== MODEL CONFIGURATION ====================
 MODEL_PATH = "./checkpoint-11004"
@@ -97,6 +277,14 @@ BASE_MODEL_ID = "google/t5gemma-b-b-prefixlm"
 THRESHOLD_DATABASE = 0.94
 THRESHOLD_T5_CONF = 0.95
 
+# ==================== T5 CANDIDATE SCORING ====================
+# Teacher-forced scoring of the top database suggestions under T5, run when the
+# database score is below THRESHOLD_DATABASE. The threshold is a mean per-token
+# log-likelihood (-0.10 ~ geometric mean token probability of 0.90).
+ENABLE_T5_CANDIDATE_SCORING = True
+T5_CANDIDATE_TOP_K = 3
+THRESHOLD_T5_CANDIDATE_LOGPROB = -0.10
+
 # ==================== LOGGING CONFIGURATION ====================
 ENABLE_LLM_PROMPT_LOGGING = validated_config["ENABLE_LLM_PROMPT_LOGGING"]
 MAX_PROMPT_LOG_LENGTH = validated_config["MAX_PROMPT_LOG_LENGTH"]
@@ -121,9 +309,11 @@ def get_config_summary() -> Dict[str, Any]:
             "model_path": MODEL_PATH,
             "base_model_id": BASE_MODEL_ID
         },
+        "database_backend": DB_BACKEND,
         "thresholds": {
             "database": THRESHOLD_DATABASE,
-            "t5_confidence": THRESHOLD_T5_CONF
+            "t5_confidence": THRESHOLD_T5_CONF,
+            "t5_candidate_logprob": THRESHOLD_T5_CANDIDATE_LOGPROB
         },
         "logging": {
             "enabled": ENABLE_LLM_PROMPT_LOGGING,
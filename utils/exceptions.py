@@ -50,6 +50,14 @@ class APIConnectionError(ProductMatchAPIError):
         )
 
 
+class CircuitOpenError(APIConnectionError):
+    """Raised when a call is short-circuited because the circuit breaker is open."""
+    
+    def __init__(self, message: str, api_name: str = None):
+        super().__init__(message=message, api_name=api_name)
+        self.error_code = "CIRCUIT_OPEN"
+
+
 class LLMProcessingError(ProductMatchAPIError):
     """Raised when LLM processing fails."""
     
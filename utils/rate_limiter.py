@@ -0,0 +1,178 @@
+"""
+Request and token rate limiting for the LLM provider.
+
+Groq enforces requests-per-minute and tokens-per-minute limits. Each call
+reserves one request and its estimated tokens from two token buckets; when a
+bucket runs short the reservation still succeeds but goes into debt, and the
+caller sleeps until its turn instead of being rejected. Reservations are
+therefore served in arrival order, and the actual token usage is settled
+once the response is known.
+
+The provider's rate-limit headers take precedence over the local estimate:
+a lower `x-ratelimit-remaining-tokens` shrinks the bucket, and a 429
+`retry-after` pauses every caller until that time.
+"""
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit reset header ('7.66s', '2m59.56s', '120ms' or plain seconds)."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class _Bucket:
+    """Token bucket whose level may go negative (queued reservations)."""
+
+    def __init__(self, limit_per_minute: float, burst_fraction: float):
+        # capacity + refill over any 60 s window never exceeds the limit
+        self.capacity = max(1.0, limit_per_minute * burst_fraction)
+        self.rate = max(limit_per_minute - self.capacity, 1.0) / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, amount: float) -> float:
+        """Remove amount and return the seconds until the level is back to zero."""
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter, shared by sync and async callers.
+
+    `reserve(tokens)` returns the delay the caller must wait; `acquire` /
+    `aacquire` reserve and wait. After the call, `settle` corrects the token
+    estimate with the real usage and `observe_headers` / `pause` apply the
+    provider's view of the quota.
+    """
+
+    def __init__(self,
+                 name: str,
+                 requests_per_minute: float,
+                 tokens_per_minute: float,
+                 burst_fraction: float = 0.1):
+        self.name = name
+        self._requests = _Bucket(requests_per_minute, burst_fraction)
+        self._tokens = _Bucket(tokens_per_minute, burst_fraction)
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._counters = {
+            "reservations": 0,
+            "queued": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "rate_limited": 0,
+            "tokens_estimated": 0,
+            "tokens_used": 0,
+        }
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request and `tokens` tokens; returns the seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            wait = max(
+                self._requests.take(1),
+                self._tokens.take(tokens),
+                self._blocked_until - now,
+            )
+            self._counters["reservations"] += 1
+            self._counters["tokens_estimated"] += tokens
+            if wait > 0:
+                self._counters["queued"] += 1
+                self._counters["total_wait_s"] += wait
+                self._counters["max_wait_s"] = max(self._counters["max_wait_s"], wait)
+            return wait
+
+    def acquire(self, tokens: int) -> float:
+        """Blocking reserve-and-wait (worker threads)."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int) -> float:
+        """Non-blocking reserve-and-wait (event loop)."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, estimated_tokens: int, used_tokens: int) -> None:
+        """Give back (or charge) the difference between estimated and actual usage."""
+        with self._lock:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + estimated_tokens - used_tokens)
+            self._counters["tokens_used"] += used_tokens
+
+    def pause(self, seconds: float) -> None:
+        """Hold every new reservation for `seconds` (429 retry-after)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._counters["rate_limited"] += 1
+
+    def observe_headers(self, headers: Optional[Mapping[str, Any]]) -> Optional[float]:
+        """
+        Align the buckets with the provider's rate-limit headers.
+        Returns the retry-after delay in seconds when the headers carry one.
+        """
+        if not headers:
+            return None
+        headers = {str(k).lower(): v for k, v in headers.items()}
+        retry_after = parse_reset_duration(headers.get("retry-after"))
+
+        with self._lock:
+            now = time.monotonic()
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None:
+                try:
+                    self._tokens.refill(now)
+                    self._tokens.level = min(self._tokens.level, float(remaining_tokens))
+                except ValueError:
+                    pass
+            # Quota exhausted: nothing goes out before the announced reset
+            for remaining_key, reset_key in (
+                ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+                ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+            ):
+                reset = parse_reset_duration(headers.get(reset_key))
+                if reset is not None and str(headers.get(remaining_key, "")).strip() in ("0", "0.0"):
+                    self._blocked_until = max(self._blocked_until, now + reset)
+
+        if retry_after is not None:
+            self.pause(retry_after)
+        return retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return {
+                "name": self.name,
+                "requests_available": round(self._requests.level, 2),
+                "tokens_available": round(self._tokens.level, 1),
+                "blocked_for_s": round(max(0.0, self._blocked_until - now), 3),
+                **{k: round(v, 3) if isinstance(v, float) else v for k, v in self._counters.items()},
+            }
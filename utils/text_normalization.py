@@ -0,0 +1,97 @@
+"""
+Shared designation normalization.
+
+Every stage that keys on a designation (suggestion cache, exact match,
+learned labels, fuzzy and n-gram indexes) normalizes it here, so the same
+product always produces the same key:
+
+    "Coca-Cola  33 CL"  -> "coca cola 330ml"
+    "Bière de l'Abbaye 0,75L" -> "biere l abbaye 750ml"
+    "Coca 6x33cl"          -> "coca 6 x 330ml"
+
+Steps: lowercase, accent folding, pack-format splitting ("6x33cl" ->
+"6 x 33cl"), unit/volume canonicalization (volumes in ml, masses in g),
+punctuation and whitespace collapsing, stop-article removal.
+
+`normalize_designation` is the single-string path (memoized);
+`normalize_series` is the vectorized path for pandas Series / arrays and
+returns exactly the same strings.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List, Union
+import pandas as pd
+
+# Combining marks left by NFKD decomposition (é -> e + U+0301)
+_COMBINING_RE = re.compile(r"[\u0300-\u036f]")
+_DECIMAL_COMMA_RE = re.compile(r"(?<=\d),(?=\d)")
+
+_UNIT_FACTORS = {
+    "ml": ("ml", 1), "millilitre": ("ml", 1), "millilitres": ("ml", 1),
+    "cl": ("ml", 10), "centilitre": ("ml", 10), "centilitres": ("ml", 10),
+    "dl": ("ml", 100),
+    "l": ("ml", 1000), "lt": ("ml", 1000), "ltr": ("ml", 1000),
+    "litre": ("ml", 1000), "litres": ("ml", 1000), "liter": ("ml", 1000), "liters": ("ml", 1000),
+    "mg": ("g", 0.001),
+    "g": ("g", 1), "gr": ("g", 1), "grs": ("g", 1),
+    "gramme": ("g", 1), "grammes": ("g", 1), "gram": ("g", 1), "grams": ("g", 1),
+    "kg": ("g", 1000), "kilo": ("g", 1000), "kilos": ("g", 1000),
+}
+# "6x33cl", "6 X 33 cl": count, then the unit size on its own
+_PACK_RE = re.compile(r"\b(\d+)\s*x\s*(?=\d)")
+_UNIT_RE = re.compile(
+    r"\b(\d+(?:\.\d+)?)\s*(" + "|".join(sorted(_UNIT_FACTORS, key=len, reverse=True)) + r")\b"
+)
+# Anything that is not a word character, except a dot between two digits
+_PUNCTUATION_RE = re.compile(r"(?:[^\w.]|(?<!\d)\.|\.(?!\d))+")
+# Matched after accent folding: "the" is left out since it would also drop "thé", and
+# single letters other than "d" since they carry meaning ("vitamine a", "type l")
+_STOP_ARTICLES = ("le", "la", "les", "des", "de", "du", "d")
+_STOP_ARTICLES_RE = re.compile(r"\b(?:" + "|".join(_STOP_ARTICLES) + r")\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _canonical_unit(match: "re.Match") -> str:
+    """'33 cl' -> '330ml', '1,5 kg' (after decimal fix) -> '1500g'."""
+    unit, factor = _UNIT_FACTORS[match.group(2)]
+    value = round(float(match.group(1)) * factor, 3)
+    number = str(int(value)) if value.is_integer() else f"{value:.3f}".rstrip("0")
+    return f"{number}{unit}"
+
+
+@lru_cache(maxsize=65536)
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = _COMBINING_RE.sub("", text)
+    text = _DECIMAL_COMMA_RE.sub(".", text)
+    text = _PACK_RE.sub(r"\1 x ", text)
+    text = _UNIT_RE.sub(_canonical_unit, text)
+    text = _PUNCTUATION_RE.sub(" ", text)
+    text = _STOP_ARTICLES_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def normalize_designation(designation) -> str:
+    """Normalized key of one designation ("" for None/NaN)."""
+    if designation is None or (isinstance(designation, float) and designation != designation):
+        return ""
+    return _normalize(str(designation))
+
+
+def normalize_series(designations: Union[pd.Series, Iterable[str]]) -> pd.Series:
+    """Vectorized normalize_designation over a Series or any iterable (index preserved)."""
+    series = designations if isinstance(designations, pd.Series) else pd.Series(list(designations), dtype=object)
+    text = series.fillna("").astype(str).str.lower().str.normalize("NFKD")
+    text = text.str.replace(_COMBINING_RE, "", regex=True)
+    text = text.str.replace(_DECIMAL_COMMA_RE, ".", regex=True)
+    text = text.str.replace(_PACK_RE, r"\1 x ", regex=True)
+    text = text.str.replace(_UNIT_RE, _canonical_unit, regex=True)
+    text = text.str.replace(_PUNCTUATION_RE, " ", regex=True)
+    text = text.str.replace(_STOP_ARTICLES_RE, " ", regex=True)
+    return text.str.replace(_WHITESPACE_RE, " ", regex=True).str.strip()
+
+
+def normalize_many(designations: Iterable[str]) -> List[str]:
+    """List version of normalize_series."""
+    return normalize_series(designations).tolist()
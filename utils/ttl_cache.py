@@ -0,0 +1,169 @@
+"""
+Thread-safe bounded TTL cache with negative caching and stale-while-revalidate.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class TTLCache:
+    """
+    LRU-bounded cache whose entries expire after a TTL.
+
+    - Empty values ([], {}, None, "") are "negative" entries and use a
+      shorter TTL, so a missing answer is not re-requested on every call
+      but is not remembered for long either.
+    - Within `stale_ttl` seconds after expiry an entry is still served
+      (stale-while-revalidate) while a single background refresh runs.
+    """
+
+    def __init__(self,
+                 maxsize: int,
+                 ttl: float,
+                 negative_ttl: Optional[float] = None,
+                 stale_ttl: float = 0.0,
+                 name: str = "cache",
+                 refresh_workers: int = 2):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries (least recently used are evicted)
+            ttl: Lifetime of an entry in seconds
+            negative_ttl: Lifetime of an empty entry (defaults to ttl)
+            stale_ttl: Seconds after expiry during which a stale entry is served
+            name: Name used for the background refresh threads
+            refresh_workers: Threads available for background refreshes
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix=f"{name}_refresh")
+        self._stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "stale_age_s_total": 0.0,
+            "stale_age_s_max": 0.0,
+        }
+
+    @staticmethod
+    def _is_negative(value: Any) -> bool:
+        return value is None or (hasattr(value, "__len__") and len(value) == 0)
+
+    def lookup(self, key: Hashable) -> Tuple[str, Any]:
+        """Return (FRESH | STALE | MISS, value) without loading anything."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return MISS, None
+            value, expires_at = entry
+            if now < expires_at:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                if self._is_negative(value):
+                    self._stats["negative_hits"] += 1
+                return FRESH, value
+            age = now - expires_at
+            if age < self.stale_ttl:
+                self._data.move_to_end(key)
+                self._stats["stale_hits"] += 1
+                self._stats["stale_age_s_total"] += age
+                self._stats["stale_age_s_max"] = max(self._stats["stale_age_s_max"], age)
+                return STALE, value
+            self._stats["misses"] += 1
+            return MISS, value
+
+    def peek(self, key: Hashable) -> Any:
+        """Value stored for key, expired or not (no statistics, no LRU update)."""
+        with self._lock:
+            entry = self._data.get(key)
+        return entry[0] if entry else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value with the TTL matching its kind (positive or negative)."""
+        ttl = self.negative_ttl if self._is_negative(value) else self.ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def refresh_in_background(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        """Reload key in a worker thread unless a refresh is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                self.set(key, loader())
+                with self._lock:
+                    self._stats["refreshes"] += 1
+            except Exception:
+                with self._lock:
+                    self._stats["refresh_errors"] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(_refresh)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Cached value for key, loading it synchronously on a miss.
+        If the load fails and an expired value is still stored, it is served
+        instead of raising.
+        """
+        state, value = self.lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self.refresh_in_background(key, loader)
+            return value
+        try:
+            value = loader()
+        except Exception:
+            expired = self.peek(key)
+            if expired is not None:
+                return expired
+            raise
+        self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, hit ratio and staleness of served entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._data)
+            stats["refreshing"] = len(self._refreshing)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        stats["stale_age_s_avg"] = (
+            round(stats["stale_age_s_total"] / stats["stale_hits"], 2) if stats["stale_hits"] else 0.0
+        )
+        return stats